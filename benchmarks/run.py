@@ -0,0 +1,293 @@
+"""
+End-to-end benchmarks for zev, run against the local mock server so they need no network or API key.
+
+    python benchmarks/run.py                                  # print results as JSON
+    python benchmarks/run.py --output results.json --compare benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+
+Every result is a median over several runs (lower is better, except for throughput). With --compare, results
+that are more than --tolerance worse than the baseline are reported and the exit code is 1, so it can gate CI.
+Baselines are only comparable on the same machine, so regenerate yours before comparing.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from zev.mock_server import MockLLMServer, parse_latency  # noqa: E402
+
+ENTRY_PATHS = {
+    "version": ["--version"],
+    "help": ["--help"],
+    "recent": ["--recent"],
+    "query": ["list files"],
+}
+HISTORY_SIZES = (100, 10_000, 100_000)
+BATCH_CONCURRENCY_LEVELS = (1, 4, 16, 64)
+BATCH_QUERIES = 128
+BATCH_LATENCY = "50"
+# roughly what fast hosted models generate at (~200 tokens/s), so that the response formats' latency differs by the
+# time their output takes to generate
+RESPONSE_FORMAT_TOKEN_LATENCY_MS = 5
+RESPONSE_FORMAT_QUERY = "find large files"
+# a typical answer, replayed by the mock server in whichever format is asked for
+RESPONSE_FORMAT_ANSWER = {
+    "commands": [
+        {
+            "command": "find . -type f -size +100M",
+            "short_explanation": "Find files over 100 MB below this directory",
+            "is_dangerous": False,
+            "dangerous_explanation": None,
+        },
+        {
+            "command": "du -ah . | sort -rh | head -n 20",
+            "short_explanation": "Show the 20 largest files and directories",
+            "is_dangerous": False,
+            "dangerous_explanation": None,
+        },
+        {
+            "command": "find . -type f -size +100M -delete",
+            "short_explanation": "Delete files over 100 MB below this directory",
+            "is_dangerous": True,
+            "dangerous_explanation": "Deletes the files for good",
+        },
+    ],
+    "is_valid": True,
+    "explanation_if_not_valid": None,
+}
+
+# the selection menu needs a terminal, so the query path stops just before showing it. Only the query path gets
+# this, since importing the menu would hide what the other entry paths import.
+NO_MENU = "import zev.command_selector; zev.command_selector.show_options = lambda commands: None; "
+
+
+def write_zevrc(home: Path, server_url: str) -> None:
+    (home / ".zevrc").write_text(
+        f"LLM_PROVIDER=openai\nOPENAI_API_KEY=sk-benchmark\nOPENAI_BASE_URL={server_url}/v1\n", encoding="utf-8"
+    )
+
+
+def summarize(samples: list, unit: str, higher_is_better: bool = False) -> dict:
+    samples = sorted(samples)
+    return {
+        "median": round(statistics.median(samples), 3),
+        # nearest-rank, like `zev --profile-stats`
+        "p95": round(samples[max(-(-len(samples) * 95 // 100), 1) - 1], 3),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+        "samples": len(samples),
+    }
+
+
+def timed_ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_cold_start(home: Path, repeats: int) -> dict:
+    """Wall time of a fresh `zev ...` process per entry path, interpreter startup included."""
+    env = {**os.environ, "HOME": str(home), "PYTHONPATH": str(SRC_DIR)}
+    results = {}
+    for name, argv in ENTRY_PATHS.items():
+        samples = []
+        for i in range(repeats):
+            if name == "query":
+                # a different query each time, so it always misses the response cache
+                args, setup = [f"{argv[0]} {i}"], NO_MENU
+            else:
+                args, setup = argv, ""
+            code = f"import sys; sys.argv = ['zev'] + {args!r}; {setup}from zev.main import app; app()"
+            samples.append(
+                timed_ms(
+                    lambda: subprocess.run(
+                        [sys.executable, "-c", code], env=env, capture_output=True, check=True, timeout=60
+                    )
+                )
+            )
+        results[f"cold_start.{name}"] = summarize(samples, "ms")
+    return results
+
+
+def bench_get_options(repeats: int) -> dict:
+    """zev.main.get_options in a warm process, from the query to the menu, with and without a cached response."""
+    import zev.command_selector
+    from zev import main
+
+    zev.command_selector.show_options = lambda commands: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.get_options("warm up the client")
+        miss = [timed_ms(lambda i=i: main.get_options(f"find large files {i}")) for i in range(repeats)]
+        hit = [timed_ms(lambda i=i: main.get_options(f"find large files {i}")) for i in range(repeats)]
+    return {"get_options.cache_miss": summarize(miss, "ms"), "get_options.cache_hit": summarize(hit, "ms")}
+
+
+def bench_history(home: Path, sizes: tuple, repeats: int) -> dict:
+    from zev.command_history import CommandHistory, CommandHistoryEntry
+    from zev.llms.types import Command, OptionsResponse
+
+    response = OptionsResponse(
+        commands=[Command(command="ls -la", short_explanation="List all files", is_dangerous=False)], is_valid=True
+    )
+    results = {}
+    for size in sizes:
+        history = CommandHistory()
+        history.path = home / f".zevhistory-{size}"
+        history.max_entries = size
+        line = CommandHistoryEntry(query="list files", response=response).model_dump_json() + "\n"
+
+        saves = []
+        for _ in range(repeats):
+            # the log is at 2 * size entries, the most it holds, so each save compacts it back down to size; that
+            # worst case is what's being measured
+            history.path.write_text(line * (2 * size), encoding="utf-8")
+            history.count_path.write_text(str(2 * size), encoding="utf-8")
+            saves.append(timed_ms(lambda: history.save_options("list files", response)))
+        loads = [timed_ms(history.get_history) for _ in range(repeats)]
+        recent = [timed_ms(lambda: list(zip(range(6), history.iter_history_reverse()))) for _ in range(repeats)]
+        results[f"history.save.{size}"] = summarize(saves, "ms")
+        results[f"history.load.{size}"] = summarize(loads, "ms")
+        results[f"history.recent.{size}"] = summarize(recent, "ms")
+    return results
+
+
+def bench_batch(server: MockLLMServer, levels: tuple, queries: int) -> dict:
+    """Queries per second through zev.batch, against a server that takes BATCH_LATENCY ms per request."""
+    from zev.batch import run_queries
+    from zev.llms.llm import get_inference_provider
+
+    results = {}
+    latency, server.latency = server.latency, parse_latency(BATCH_LATENCY)
+    with contextlib.redirect_stdout(io.StringIO()):
+        provider = get_inference_provider()
+        batch = [(i, f"show disk usage {i}") for i in range(queries)]
+        for concurrency in levels:
+            start = time.perf_counter()
+            asyncio.run(run_queries(provider, "", batch, concurrency, io.StringIO()))
+            results[f"batch.throughput.c{concurrency}"] = summarize(
+                [queries / (time.perf_counter() - start)], "queries/s", higher_is_better=True
+            )
+    server.latency = latency
+    return results
+
+
+def bench_response_format(server: MockLLMServer, repeats: int) -> dict:
+    """
+    Output tokens and latency of a query in the full and the compact response format (COMPACT_SCHEMA), with the
+    server taking RESPONSE_FORMAT_TOKEN_LATENCY_MS per output token. Both carry the same answer, so only the
+    keys differ; a model asked for the compact format also writes shorter explanations, which this leaves out.
+    """
+    from zev.llms.openai.provider import OpenAIProvider
+    from zev.llms.response_format import ResponseFormat
+
+    results = {}
+    cassette, server.cassette = server.cassette, [(RESPONSE_FORMAT_QUERY, RESPONSE_FORMAT_ANSWER)]
+    token_latency, server.token_latency = server.token_latency, RESPONSE_FORMAT_TOKEN_LATENCY_MS / 1000
+    for name, response_format in (("full", ResponseFormat()), ("compact", ResponseFormat(compact=True))):
+        provider = OpenAIProvider(response_format=response_format)
+        provider.get_options(RESPONSE_FORMAT_QUERY, "")  # connects
+        tokens_before = server.stats["completion_tokens"]
+        latencies = [timed_ms(lambda: provider.get_options(RESPONSE_FORMAT_QUERY, "")) for _ in range(repeats)]
+        tokens = (server.stats["completion_tokens"] - tokens_before) / repeats
+        results[f"response_format.{name}.latency"] = summarize(latencies, "ms")
+        results[f"response_format.{name}.output_tokens"] = summarize([tokens], "tokens")
+    server.cassette, server.token_latency = cassette, token_latency
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Lines describing each result against the baseline, and whether it regressed."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base["median"]:
+            rows.append((name, result["median"], None, "", False))
+            continue
+        change = (result["median"] - base["median"]) / base["median"]
+        worse = -change if result["higher_is_better"] else change
+        rows.append((name, result["median"], base["median"], f"{change:+.0%}", worse > tolerance))
+    return rows
+
+
+def print_comparison(rows: list, units: dict) -> None:
+    print(f"{'Benchmark':<34} {'median':>12} {'baseline':>12} {'change':>8}", file=sys.stderr)
+    for name, median, base, change, regressed in rows:
+        base_text = f"{base:.2f}" if base is not None else "-"
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<34} {median:>12.2f} {base_text:>12} {change:>8}{flag}  {units[name]}", file=sys.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run zev's benchmarks against a local mock server")
+    parser.add_argument("--repeats", type=int, default=10, help="runs per benchmark")
+    parser.add_argument("--quick", action="store_true", help="fewer runs and smaller histories, for a smoke test")
+    parser.add_argument("--latency", default="0", help="mock server latency spec (see zev.mock_server)")
+    parser.add_argument("--output", type=Path, help="write results to this file instead of stdout")
+    parser.add_argument("--compare", type=Path, help="baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", type=Path, help="write results as the new baseline")
+    args = parser.parse_args()
+
+    repeats = 3 if args.quick else args.repeats
+    history_sizes = HISTORY_SIZES[:1] if args.quick else HISTORY_SIZES
+    batch_levels = BATCH_CONCURRENCY_LEVELS[:2] if args.quick else BATCH_CONCURRENCY_LEVELS
+    batch_queries = 16 if args.quick else BATCH_QUERIES
+
+    with tempfile.TemporaryDirectory() as home_dir, MockLLMServer(latency=args.latency) as server:
+        home = Path(home_dir)
+        write_zevrc(home, server.url)
+        # before zev is imported, since its config and history files live in the home directory
+        os.environ["HOME"] = home_dir
+
+        results = {}
+        results.update(bench_cold_start(home, repeats))
+        results.update(bench_get_options(repeats))
+        results.update(bench_history(home, history_sizes, repeats))
+        results.update(bench_batch(server, batch_levels, batch_queries))
+        results.update(bench_response_format(server, repeats))
+
+    report = {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mock_latency": args.latency,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.save_baseline:
+        args.save_baseline.write_text(text + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))["results"]
+        rows = compare(results, baseline, args.tolerance)
+        print_comparison(rows, {name: result["unit"] for name, result in results.items()})
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            summary = f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}"
+            print(summary, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
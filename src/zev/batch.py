@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from zev.danger import check_response
+from zev.reporting import reports_to
+
+
+def read_queries(source: str) -> list[str]:
+    """One query per line from a file, or from stdin if source is `-`. Blank lines are skipped."""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(source).read_text(encoding="utf-8").splitlines()
+    # same as a query given on the command line
+    return [line.strip().rstrip("?") for line in lines if line.strip()]
+
+
+def load_checkpoint(output_path: Path) -> set[tuple[int, str]]:
+    """(index, query) of every query that already has a successful result in the output file."""
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short when the previous run was killed
+            if record.get("error") is None:
+                done.add((record["index"], record["query"]))
+    return done
+
+
+def open_output(output_path: Path):
+    out = open(output_path, "a", encoding="utf-8")
+    if out.tell() > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")  # finish a line cut short when the previous run was killed
+    return out
+
+
+async def run_query(provider, context: str, index: int, query: str) -> dict:
+    # what the provider reports goes into this query's `error` rather than interleaved with the JSONL output
+    reports = []
+    start = time.perf_counter()
+    with reports_to(reports.append):
+        try:
+            response, error = check_response(await provider.aget_options(query, context)), None
+        except Exception as e:
+            response, error = None, f"{type(e).__name__}: {e}"
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    if response is None and error is None:
+        error = "\n".join(reports) or "No response from provider"
+    return {
+        "index": index,
+        "query": query,
+        "response": response.model_dump() if response is not None else None,
+        "latency_ms": round(latency_ms, 1),
+        "error": error,
+    }
+
+
+async def run_queries(provider, context: str, queries: list[tuple[int, str]], concurrency: int, out) -> list[dict]:
+    """Runs the queries with at most `concurrency` in flight, writing each result as soon as it completes."""
+    remaining = iter(queries)
+    results = []
+
+    async def worker() -> None:
+        # workers share one iterator, so each query is picked up exactly once
+        for index, query in remaining:
+            record = await run_query(provider, context, index, query)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            results.append(record)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(queries))))))
+    return results
+
+
+def run_batch(source: str, concurrency: int, output_path: Optional[str] = None) -> None:
+    # pylint: disable=import-outside-toplevel
+    from zev.env_context import get_env_context
+    from zev.llms.llm import get_inference_provider
+
+    queries = list(enumerate(read_queries(source)))
+    done = load_checkpoint(Path(output_path)) if output_path else set()
+    pending = [(index, query) for index, query in queries if (index, query) not in done]
+
+    provider = get_inference_provider()
+    context = get_env_context()
+
+    out = open_output(Path(output_path)) if output_path else sys.stdout
+    try:
+        results = asyncio.run(run_queries(provider, context, pending, concurrency, out))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    failed = sum(1 for record in results if record["error"] is not None)
+    summary = f"Batch complete: {len(results) - failed} succeeded, {failed} failed"
+    if done:
+        summary += f", {len(queries) - len(pending)} already done"
+    print(summary, file=sys.stderr)
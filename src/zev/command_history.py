@@ -1,52 +1,206 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import questionary
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
-from zev.command_selector import show_options
-from zev.constants import HISTORY_FILE_NAME
+from zev.config import config
+from zev.constants import HISTORY_FILE_NAME, HistoryBackends
 from zev.llms.types import OptionsResponse
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows, where saves from concurrent zev processes aren't synchronized
+
+QUERY_PREFIX = '{"query":'
+RESPONSE_PREFIX = ',"response":'
+READ_BLOCK_SIZE = 8192
+_json_decoder = json.JSONDecoder()
+
 
 class CommandHistoryEntry(BaseModel):
     query: str
     response: OptionsResponse
 
 
+class HistoryRecord:
+    """
+    A history entry read for the --recent menu. Only the query is decoded up front; the response is
+    validated the first time it's accessed, i.e. only for the entry the user picks.
+    """
+
+    def __init__(self, query: str, raw_response: str) -> None:
+        self.query = query
+        self.raw_response = raw_response
+
+    @cached_property
+    def response(self) -> OptionsResponse:
+        return OptionsResponse.model_validate_json(self.raw_response)
+
+    @classmethod
+    def from_line(cls, line: str) -> "HistoryRecord":
+        # entries are written by model_dump_json as {"query":...,"response":{...}}, so the query can be
+        # decoded on its own and the response sliced out without parsing it
+        if line.startswith(QUERY_PREFIX):
+            query, end = _json_decoder.raw_decode(line, len(QUERY_PREFIX))
+            if line.startswith(RESPONSE_PREFIX, end) and line.endswith("}"):
+                return cls(query, line[end + len(RESPONSE_PREFIX) : -1])
+        data = json.loads(line)
+        return cls(data["query"], json.dumps(data["response"]))
+
+
 class CommandHistory:
+    """
+    History is an append-only JSONL log. Saving an entry is a single append, and the log is only compacted
+    down to max_entries once it grows past twice that, so rewrites are amortized over many saves.
+
+    Several zev processes can save at once (e.g. in two terminals), so saves hold an exclusive lock on a file
+    next to the log, and compaction replaces the log atomically. Readers don't lock; they skip any line they
+    can't parse, such as one cut short by a crash, and compaction drops them.
+    """
+
     def __init__(self) -> None:
         self.path = Path.home() / HISTORY_FILE_NAME
-        self.max_entries = 100
+        self.max_entries = config.history_max_entries
         self.path.touch(exist_ok=True)
         self.encoding = "utf-8"
 
+    @property
+    def count_path(self) -> Path:
+        # number of lines in the log, kept next to it so saving doesn't have to read the whole file
+        return self.path.with_name(self.path.name + ".count")
+
+    @property
+    def lock_path(self) -> Path:
+        # a separate file, since compaction replaces the log and a lock on the old one would no longer count
+        return self.path.with_name(self.path.name + ".lock")
+
     def save_options(self, query: str, options: OptionsResponse) -> None:
         entry = CommandHistoryEntry(query=query, response=options)
         self._write_to_history_file(entry)
 
     def get_history(self) -> list[CommandHistoryEntry]:
-        with open(self.path, "r", encoding=self.encoding) as f:
-            entries = [CommandHistoryEntry.model_validate_json(line) for line in f if line.strip()]
+        with self._open_for_reading() as f:
+            entries = [entry for entry in map(_parse_entry, f) if entry is not None]
 
         if not entries:
             return None
 
-        return entries
+        # the log may hold up to twice max_entries between compactions
+        return entries[-self.max_entries :]
+
+    def iter_history_reverse(self) -> Iterator[HistoryRecord]:
+        """Newest entries first, reading the log backwards so that only its tail is touched."""
+        records = (_parse_record(line) for line in self._read_lines_reverse())
+        return islice((record for record in records if record is not None), self.max_entries)
+
+    def _read_lines_reverse(self, block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+        with open(self.path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                # the first line in a block may be cut off, so carry it over to the next (earlier) block
+                lines = (f.read(read_size) + remainder).split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield from self._decode(line)
+            if remainder.strip():
+                yield from self._decode(remainder)
+
+    def _decode(self, line: bytes) -> Iterator[str]:
+        try:
+            yield line.decode(self.encoding)
+        except UnicodeDecodeError:
+            pass  # e.g. a save that crashed partway through a multi-byte character
+
+    def _open_for_reading(self):
+        # a line cut short partway through a multi-byte character is decoded with a replacement character, so
+        # it fails validation and is skipped like any other corrupt line, rather than failing the whole read
+        return open(self.path, "r", encoding=self.encoding, errors="replace")
+
+    def search(self, terms: str) -> Optional[list[CommandHistoryEntry]]:
+        """Entries whose query or commands contain every one of the search terms, oldest first."""
+        words = terms.lower().split()
+        matches = []
+        for entry in self.get_history() or []:
+            text = " ".join([entry.query] + [cmd.command for cmd in entry.response.commands]).lower()
+            if all(word in text for word in words):
+                matches.append(entry)
+        return matches or None
 
     def _write_to_history_file(self, new_entry: CommandHistoryEntry) -> None:
-        with open(self.path, "a", encoding=self.encoding) as f:
-            f.write(new_entry.model_dump_json() + "\n")
+        line = (new_entry.model_dump_json() + "\n").encode(self.encoding)
+        with self._locked():
+            line_count = self._read_line_count() + 1
+            with open(self.path, "a+b") as f:
+                # a save that crashed mid-line leaves no newline, so start a new line rather than append to it
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                        line_count += 1
+                # appends always go to the end of the file, wherever the last read left off
+                f.write(line)
 
-        # If we've exceeded max entries, trim the file
-        with open(self.path, "r", encoding=self.encoding) as f:
-            lines = f.readlines()
-            if len(lines) > self.max_entries:
-                with open(self.path, "w", encoding=self.encoding) as f:
-                    f.writelines(lines[-self.max_entries :])
+            if line_count > 2 * self.max_entries:
+                line_count = self._compact()
+            self.count_path.write_text(str(line_count), encoding=self.encoding)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_line_count(self) -> int:
+        try:
+            return int(self.count_path.read_text(encoding=self.encoding))
+        except (FileNotFoundError, ValueError):
+            # missing or unreadable counter (e.g. history written by an older version), so count once
+            with self._open_for_reading() as f:
+                return sum(1 for _ in f)
+
+    def _compact(self) -> int:
+        # corrupt lines are dropped here, so they don't take up a place among the entries that are kept
+        with self._open_for_reading() as f:
+            lines = [line for line in f if _parse_entry(line) is not None][-self.max_entries :]
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                f.writelines(line if line.endswith("\n") else line + "\n" for line in lines)
+                # on disk before it replaces the log, so a crash can't leave an empty history behind
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(lines)
 
     def display_history_options(self, reverse_history_entries, show_limit=5) -> Optional[CommandHistoryEntry]:
-        if not reverse_history_entries:
+        # entries may be a lazy iterator, so only pull one more than we show to know if there's more
+        remaining_entries = iter(reverse_history_entries or [])
+        first_entries = list(islice(remaining_entries, show_limit + 1))
+        if not first_entries:
             print("No command history found")
             return None
 
@@ -58,9 +212,9 @@ class CommandHistory:
             ]
         )
 
-        query_options = [questionary.Choice(entry.query, value=entry) for entry in reverse_history_entries[:show_limit]]
+        query_options = [questionary.Choice(entry.query, value=entry) for entry in first_entries[:show_limit]]
 
-        if len(reverse_history_entries) > show_limit:
+        if len(first_entries) > show_limit:
             query_options.append(questionary.Choice("Show more...", value="show_more"))
 
         query_options.append(questionary.Separator())
@@ -71,7 +225,8 @@ class CommandHistory:
         ).ask()
 
         if selected == "show_more":
-            all_options = [questionary.Choice(entry.query, value=entry) for entry in reverse_history_entries]
+            all_entries = first_entries + list(remaining_entries)
+            all_options = [questionary.Choice(entry.query, value=entry) for entry in all_entries]
             all_options.append(questionary.Separator())
             all_options.append(questionary.Choice("Cancel"))
 
@@ -81,21 +236,58 @@ class CommandHistory:
 
         return selected
 
-    def show_history(self):
-        history_entries = self.get_history()
-        if not history_entries:
-            print("No command history found")
-            return
+    def show_history(self, search_terms: Optional[str] = None):
+        if search_terms:
+            matches = self.search(search_terms)
+            if not matches:
+                print(f"No command history found matching '{search_terms}'")
+                return
+            reverse_history_entries = reversed(matches)
+        else:
+            reverse_history_entries = self.iter_history_reverse()
 
-        selected_entry = self.display_history_options(list(reversed(history_entries)))
+        selected_entry = self.display_history_options(reverse_history_entries)
 
         if selected_entry in (None, "Cancel"):
             return
 
-        commands = selected_entry.response.commands
+        try:
+            commands = selected_entry.response.commands
+        except ValidationError:
+            # only the query is checked when the menu is read, so e.g. a line cut short right after a "}" shows up
+            print("This history entry is corrupt and can't be shown")
+            return None
 
         if not commands:
             print("No commands available")
             return None
 
+        from zev.command_selector import show_options  # pylint: disable=import-outside-toplevel
+
         show_options(commands)
+
+
+def _parse_entry(line: str) -> Optional[CommandHistoryEntry]:
+    if not line.strip():
+        return None
+    try:
+        return CommandHistoryEntry.model_validate_json(line)
+    except ValidationError:
+        return None  # e.g. cut short by a crash mid-save
+
+
+def _parse_record(line: str) -> Optional[HistoryRecord]:
+    if not line.strip():
+        return None
+    try:
+        return HistoryRecord.from_line(line.rstrip("\n"))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def create_command_history() -> CommandHistory:
+    if config.history_backend == HistoryBackends.SQLITE:
+        from zev.sqlite_history import SQLiteCommandHistory  # pylint: disable=import-outside-toplevel
+
+        return SQLiteCommandHistory()
+    return CommandHistory()
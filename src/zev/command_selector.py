@@ -1,19 +1,23 @@
 from subprocess import run as run_command
+from typing import TYPE_CHECKING
 
 import pyperclip
 import questionary
 from rich import print as rprint
 
-from zev.llms.types import Command
+from zev import profiling
 
+if TYPE_CHECKING:
+    from zev.llms.types import Command
 
-def show_options(commands: list[Command]):
+
+def show_options(commands: list["Command"]):
     options = assemble_options(commands)
     selected = display_options(options)
     handle_selected_option(selected)
 
 
-def assemble_options(commands: list[Command]):
+def assemble_options(commands: list["Command"]):
     options = [questionary.Choice(cmd.command, description=cmd.short_explanation, value=cmd) for cmd in commands]
     options.append(questionary.Choice("Cancel"))
     options.append(questionary.Separator())
@@ -21,7 +25,9 @@ def assemble_options(commands: list[Command]):
 
 
 def display_options(options: list[questionary.Choice]):
-    selected = questionary.select(
+    # from building the menu until it's first drawn, leaving out the time the user takes to pick
+    render_span = profiling.start("menu render")
+    question = questionary.select(
         "Select command:",
         choices=options,
         use_shortcuts=True,
@@ -32,7 +38,11 @@ def display_options(options: list[questionary.Choice]):
                 ("instruction", "fg:#98c379"),
             ]
         ),
-    ).ask()
+    )
+    if profiling.is_enabled():
+        question.application.after_render += lambda _: render_span.stop()
+    selected = question.ask()
+    render_span.stop()
     return selected
 
 
@@ -1,60 +1,349 @@
+import os
 from pathlib import Path
 
-from dotenv import dotenv_values
+from zev.config.schema import validate
+from zev.constants import (
+    BATCH_DEFAULT_CONCURRENCY,
+    CACHE_DEFAULT_MAX_ENTRIES,
+    CACHE_DEFAULT_TTL_SECONDS,
+    CONFIG_FILE_NAME,
+    CONFIG_SNAPSHOT_FILE_NAME,
+    CONFIG_SNAPSHOT_VERSION,
+    DEFAULT_CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+    DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_OPTIONS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_REQUEST_DEADLINE_SECONDS,
+    DEFAULT_RETRY_BASE_DELAY_SECONDS,
+    DEFAULT_RETRY_MAX_DELAY_SECONDS,
+    GEMINI_BASE_URL,
+    GEMINI_DEFAULT_MODEL,
+    HISTORY_DEFAULT_MAX_ENTRIES,
+    HISTORY_SQLITE_DEFAULT_MAX_ENTRIES,
+    LOCAL_ANSWER_DEFAULT_MIN_CONFIDENCE,
+    OPENAI_BASE_URL,
+    OPENAI_DEFAULT_MODEL,
+    PREFETCH_DEFAULT_DEBOUNCE_MS,
+    HistoryBackends,
+    LLMProviders,
+    RoutingTiers,
+)
 
 
 class Config:
+    """
+    Settings from ~/.zevrc, parsed once per process on first use. The parsed and validated values are kept in
+    a snapshot file keyed on the config file's mtime and size, so that runs after the first don't need to parse
+    it (or import dotenv) at all.
+    """
+
     def __init__(self):
-        self.config_path = Path.home() / ".zevrc"
-        self.vals = dotenv_values(self.config_path)
+        self.config_path = Path.home() / CONFIG_FILE_NAME
+        self.snapshot_path = Path.home() / CONFIG_SNAPSHOT_FILE_NAME
+        self._vals = None
+        self._settings = None
+
+    @property
+    def vals(self):
+        """The raw values, as written in .zevrc."""
+        if self._vals is None:
+            self._load()
+        return self._vals
+
+    @vals.setter
+    def vals(self, value):
+        self._vals = value
+        self._settings = None
+
+    @property
+    def settings(self):
+        """The values converted to their types (see zev.config.schema)."""
+        if self._settings is None:
+            self._settings = validate(self.vals)
+        return self._settings
+
+    def reload(self):
+        """Forgets the loaded values, e.g. after `zev --setup` rewrote the file."""
+        self._vals = None
+        self._settings = None
+
+    def export_to_environ(self):
+        """Sets every value as an environment variable, overriding existing ones, for SDKs and subprocesses."""
+        for key, value in self.vals.items():
+            if value is not None:
+                os.environ[key] = value
+
+    def _load(self):
+        try:
+            stat = self.config_path.stat()
+        except FileNotFoundError:
+            self._vals, self._settings = {}, {}
+            return
+
+        key = [CONFIG_SNAPSHOT_VERSION, stat.st_mtime_ns, stat.st_size]
+        snapshot = self._read_snapshot()
+        if snapshot.get("key") == key:
+            self._vals, self._settings = snapshot["vals"], snapshot["settings"]
+            return
+
+        from dotenv import dotenv_values  # pylint: disable=import-outside-toplevel
+
+        self._vals = dotenv_values(self.config_path)
+        try:
+            self._settings = validate(self._vals)
+        except ValueError:
+            # not snapshotted, and raised again when the settings are used; the raw values stay readable, so
+            # that `zev --setup` can fix the file
+            return
+        self._write_snapshot({"key": key, "vals": self._vals, "settings": self._settings})
+
+    def _read_snapshot(self):
+        import json  # pylint: disable=import-outside-toplevel
+
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return snapshot if isinstance(snapshot, dict) else {}
+
+    def _write_snapshot(self, snapshot):
+        # pylint: disable=import-outside-toplevel
+        import json
+        import tempfile
+
+        # mkstemp creates the file readable only by the user, which matters since it holds the API keys
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_path.parent, prefix=f"{self.snapshot_path.name}.")
+        except OSError:
+            return  # e.g. a read-only home directory; the file is just parsed again next time
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _get(self, key, default=None):
+        value = self.settings.get(key)
+        return default if value is None else value
+
+    def _get_url(self, key):
+        # .zevrc first, then the environment, so a server can also be swapped in for a single run
+        url = self.settings.get(key) or os.environ.get(key)
+        return url.rstrip("/") if url else None
 
     @property
     def llm_provider(self):
-        return self.vals.get("LLM_PROVIDER")
+        return self.settings.get("LLM_PROVIDER")
+
+    @property
+    def llm_model(self):
+        return self.model_for(self.llm_provider)
+
+    def model_for(self, provider):
+        """The model a provider will use, resolved without constructing the provider."""
+        if provider == LLMProviders.OPENAI:
+            return self.openai_model or OPENAI_DEFAULT_MODEL
+        if provider == LLMProviders.OLLAMA:
+            return self.ollama_model
+        if provider == LLMProviders.GEMINI:
+            return self.gemini_model or GEMINI_DEFAULT_MODEL
+        if provider == LLMProviders.AZURE_OPENAI:
+            return self.azure_openai_deployment
+        return None
+
+    # Racing
+    @property
+    def race_providers(self):
+        """Backends listed in RACE_PROVIDERS as `provider[:model]`, e.g. `openai:gpt-4o-mini,gemini`."""
+        entries = [entry.strip() for entry in self._get("RACE_PROVIDERS", "").split(",") if entry.strip()]
+        backends = []
+        for entry in entries:
+            provider, _, model = entry.partition(":")
+            backends.append((provider.strip(), model.strip() or self.model_for(provider.strip())))
+        return backends
+
+    @property
+    def race_hedge_delay_seconds(self):
+        return self._get("RACE_HEDGE_DELAY_MS", 0) / 1000
+
+    # Routing
+    @property
+    def routing_table(self):
+        """
+        Tiers listed in ROUTING_TABLE as `tier=provider[:model]`, e.g. `simple=openai:gpt-4o-mini,complex=gemini`,
+        as a dict of tier -> (provider, model).
+        """
+        entries = [entry.strip() for entry in self._get("ROUTING_TABLE", "").split(",") if entry.strip()]
+        table = {}
+        for entry in entries:
+            tier, _, backend = entry.partition("=")
+            provider, _, model = backend.partition(":")
+            tier, provider = tier.strip(), provider.strip()
+            if tier not in (RoutingTiers.SIMPLE, RoutingTiers.COMPLEX) or not provider:
+                raise ValueError(
+                    f"ROUTING_TABLE in ~/{CONFIG_FILE_NAME} must list `simple=provider[:model]` and optionally "
+                    f"`complex=provider[:model]`, not {entry!r}."
+                )
+            table[tier] = (provider, model.strip() or self.model_for(provider))
+        return table
+
+    @property
+    def stream_responses(self):
+        return self._get("STREAM_RESPONSES", False)
+
+    @property
+    def profile_log(self):
+        return self._get("PROFILE_LOG", False)
+
+    # HTTP
+    @property
+    def connect_timeout(self):
+        return self._get("CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT_SECONDS)
+
+    @property
+    def read_timeout(self):
+        return self._get("READ_TIMEOUT", DEFAULT_READ_TIMEOUT_SECONDS)
+
+    @property
+    def request_deadline(self):
+        return self._get("REQUEST_DEADLINE", DEFAULT_REQUEST_DEADLINE_SECONDS)
+
+    @property
+    def max_retries(self):
+        return self._get("MAX_RETRIES", DEFAULT_MAX_RETRIES)
+
+    @property
+    def retry_base_delay(self):
+        return self._get("RETRY_BASE_DELAY", DEFAULT_RETRY_BASE_DELAY_SECONDS)
+
+    @property
+    def retry_max_delay(self):
+        return self._get("RETRY_MAX_DELAY", DEFAULT_RETRY_MAX_DELAY_SECONDS)
+
+    @property
+    def circuit_breaker_threshold(self):
+        return self._get("CIRCUIT_BREAKER_THRESHOLD", DEFAULT_CIRCUIT_BREAKER_THRESHOLD)
+
+    @property
+    def circuit_breaker_cooldown(self):
+        return self._get("CIRCUIT_BREAKER_COOLDOWN", DEFAULT_CIRCUIT_BREAKER_COOLDOWN_SECONDS)
 
     # OpenAI
     @property
     def openai_api_key(self):
-        return self.vals.get("OPENAI_API_KEY")
+        return self.settings.get("OPENAI_API_KEY")
+
+    @property
+    def openai_base_url(self):
+        # can be pointed at a compatible server, e.g. `python -m zev.mock_server` for offline benchmarks
+        return self._get_url("OPENAI_BASE_URL") or OPENAI_BASE_URL
 
     @property
     def openai_model(self):
-        return self.vals.get("OPENAI_MODEL")
+        return self.settings.get("OPENAI_MODEL")
 
     # Ollama
     @property
     def ollama_base_url(self):
-        return self.vals.get("OLLAMA_BASE_URL")
+        return self._get_url("OLLAMA_BASE_URL")
 
     @property
     def ollama_model(self):
-        return self.vals.get("OLLAMA_MODEL")
+        return self.settings.get("OLLAMA_MODEL")
 
     # Gemini
+    @property
+    def gemini_base_url(self):
+        return self._get_url("GEMINI_BASE_URL") or GEMINI_BASE_URL
+
     @property
     def gemini_model(self):
-        return self.vals.get("GEMINI_MODEL")
+        return self.settings.get("GEMINI_MODEL")
 
     @property
     def gemini_api_key(self):
-        return self.vals.get("GEMINI_API_KEY")
+        return self.settings.get("GEMINI_API_KEY")
 
     # Azure OpenAI
     @property
     def azure_openai_account_name(self):
-        return self.vals.get("AZURE_OPENAI_ACCOUNT_NAME")
+        return self.settings.get("AZURE_OPENAI_ACCOUNT_NAME")
 
     @property
     def azure_openai_api_key(self):
-        return self.vals.get("AZURE_OPENAI_API_KEY")
+        return self.settings.get("AZURE_OPENAI_API_KEY")
 
     @property
     def azure_openai_deployment(self):
-        return self.vals.get("AZURE_OPENAI_DEPLOYMENT")
+        return self.settings.get("AZURE_OPENAI_DEPLOYMENT")
 
     @property
     def azure_openai_api_version(self):
-        return self.vals.get("AZURE_OPENAI_API_VERSION")
+        return self.settings.get("AZURE_OPENAI_API_VERSION")
+
+    # History
+    @property
+    def history_backend(self):
+        return self._get("HISTORY_BACKEND", HistoryBackends.JSONL)
+
+    @property
+    def history_max_entries(self):
+        if self.history_backend == HistoryBackends.SQLITE:
+            default = HISTORY_SQLITE_DEFAULT_MAX_ENTRIES
+        else:
+            default = HISTORY_DEFAULT_MAX_ENTRIES
+        return self._get("HISTORY_MAX_ENTRIES", default)
+
+    # Response cache
+    @property
+    def cache_ttl_seconds(self):
+        return self._get("CACHE_TTL_SECONDS", CACHE_DEFAULT_TTL_SECONDS)
+
+    @property
+    def cache_max_entries(self):
+        return self._get("CACHE_MAX_ENTRIES", CACHE_DEFAULT_MAX_ENTRIES)
+
+    # Local answers
+    @property
+    def local_answers(self):
+        return self._get("LOCAL_ANSWERS", True)
+
+    @property
+    def local_answer_min_confidence(self):
+        return self._get("LOCAL_ANSWER_MIN_CONFIDENCE", LOCAL_ANSWER_DEFAULT_MIN_CONFIDENCE)
+
+    # Danger check
+    @property
+    def local_danger_check(self):
+        return self._get("LOCAL_DANGER_CHECK", False)
+
+    # Response format
+    @property
+    def compact_schema(self):
+        return self._get("COMPACT_SCHEMA", False)
+
+    @property
+    def max_options(self):
+        return self._get("MAX_OPTIONS", DEFAULT_MAX_OPTIONS)
+
+    # Speculative prefetch
+    @property
+    def speculative_prefetch(self):
+        return self._get("SPECULATIVE_PREFETCH", False)
+
+    @property
+    def prefetch_debounce_seconds(self):
+        return self._get("PREFETCH_DEBOUNCE_MS", PREFETCH_DEFAULT_DEBOUNCE_MS) / 1000
+
+    # Batch mode
+    @property
+    def batch_concurrency(self):
+        return self._get("BATCH_CONCURRENCY", BATCH_DEFAULT_CONCURRENCY)
 
 
 config = Config()
@@ -0,0 +1,60 @@
+from zev.constants import CONFIG_FILE_NAME
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+
+# Settings that aren't plain strings. Anything else in .zevrc is kept as a string, including keys zev doesn't
+# know about.
+CONFIG_SCHEMA = {
+    "STREAM_RESPONSES": bool,
+    "PROFILE_LOG": bool,
+    "LOCAL_ANSWERS": bool,
+    "SPECULATIVE_PREFETCH": bool,
+    "LOCAL_DANGER_CHECK": bool,
+    "COMPACT_SCHEMA": bool,
+    "RACE_HEDGE_DELAY_MS": float,
+    "CONNECT_TIMEOUT": float,
+    "READ_TIMEOUT": float,
+    "REQUEST_DEADLINE": float,
+    "RETRY_BASE_DELAY": float,
+    "RETRY_MAX_DELAY": float,
+    "CIRCUIT_BREAKER_COOLDOWN": float,
+    "LOCAL_ANSWER_MIN_CONFIDENCE": float,
+    "PREFETCH_DEBOUNCE_MS": float,
+    "MAX_RETRIES": int,
+    "CIRCUIT_BREAKER_THRESHOLD": int,
+    "HISTORY_MAX_ENTRIES": int,
+    "CACHE_TTL_SECONDS": int,
+    "CACHE_MAX_ENTRIES": int,
+    "BATCH_CONCURRENCY": int,
+    "MAX_OPTIONS": int,
+}
+
+PARSERS = {bool: parse_bool, float: float, int: int}
+EXPECTED = {bool: "true or false", float: "a number", int: "a whole number"}
+
+
+def validate(vals: dict) -> dict:
+    """Typed settings from the raw .zevrc values. Empty values are left out, so they fall back to the defaults."""
+    settings = {}
+    for key, value in vals.items():
+        if value is None or not value.strip():
+            continue
+        kind = CONFIG_SCHEMA.get(key, str)
+        if kind is str:
+            settings[key] = value
+            continue
+        try:
+            settings[key] = PARSERS[kind](value.strip())
+        except ValueError:
+            raise ValueError(f"{key} in ~/{CONFIG_FILE_NAME} must be {EXPECTED[kind]}, not {value!r}.") from None
+    return settings
@@ -1,9 +1,8 @@
-from pathlib import Path
 from typing import Dict
 
 import questionary
-from dotenv import dotenv_values
 
+from zev.config import config
 from zev.config.types import (
     SetupQuestion,
     SetupQuestionSelect,
@@ -73,8 +72,8 @@ def prompt_question(question: SetupQuestion, answers: Dict[str, str]) -> Dict[st
 
 
 def run_setup():
-    config_path = Path.home() / ".zevrc"
-    answers = dotenv_values(config_path)  # load in current values and then override as necessary
+    config_path = config.config_path
+    answers = dict(config.vals)  # load in current values and then override as necessary
     for question in setup_questions:
         answers.update(prompt_question(question, answers))
 
@@ -84,3 +83,4 @@ def run_setup():
 
     with open(config_path, "w", encoding="utf-8") as f:
         f.write(new_file)
+    config.reload()
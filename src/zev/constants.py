@@ -7,19 +7,97 @@ class LLMProviders:
 
 DEFAULT_PROVIDER = LLMProviders.OPENAI
 
+
+class HistoryBackends:
+    JSONL = "jsonl"
+    SQLITE = "sqlite"
+
+
+# Model tiers that ROUTING_TABLE in .zevrc can name, see zev.llms.routing
+class RoutingTiers:
+    SIMPLE = "simple"
+    COMPLEX = "complex"
+
+
 # Default model names for each provider
 OPENAI_DEFAULT_MODEL = "gpt-4o-mini"
 GEMINI_DEFAULT_MODEL = "gemini-2.0-flash"
 GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
 
 OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# HTTP timeouts in seconds, overridable with CONNECT_TIMEOUT / READ_TIMEOUT in .zevrc
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_READ_TIMEOUT_SECONDS = 60.0
+
+# Retries of rate-limited (429) and failing (5xx) requests, overridable with REQUEST_DEADLINE / MAX_RETRIES /
+# RETRY_BASE_DELAY / RETRY_MAX_DELAY in .zevrc. No retry is started that would end past the deadline.
+DEFAULT_REQUEST_DEADLINE_SECONDS = 90.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BASE_DELAY_SECONDS = 0.5
+DEFAULT_RETRY_MAX_DELAY_SECONDS = 8.0
+
+# A provider is skipped for CIRCUIT_BREAKER_COOLDOWN seconds after CIRCUIT_BREAKER_THRESHOLD queries in a row
+# failed even after retrying
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 3
+DEFAULT_CIRCUIT_BREAKER_COOLDOWN_SECONDS = 60.0
 CONFIG_FILE_NAME = ".zevrc"
+# parsed .zevrc, reused while the file is unchanged; bump the version when the schema changes
+CONFIG_SNAPSHOT_FILE_NAME = ".zevrc.snapshot"
+CONFIG_SNAPSHOT_VERSION = 1
 HISTORY_FILE_NAME = ".zevhistory"
-
-
-PROMPT = """
+HISTORY_DB_FILE_NAME = ".zevhistory.db"
+CACHE_FILE_NAME = ".zevcache"
+DAEMON_SOCKET_NAME = ".zevd.sock"
+CIRCUIT_BREAKER_FILE_NAME = ".zevbreaker"
+PROFILE_LOG_FILE_NAME = ".zevprofile"
+ENV_CONTEXT_FILE_NAME = ".zevcontext"
+PATH_INDEX_FILE_NAME = ".zevpath"
+KNOWLEDGE_INDEX_FILE_NAME = ".zevindex"
+ROUTING_LOG_FILE_NAME = ".zevrouting"
+
+# Where `zev --build-index` looks for man pages when $MANPATH isn't set, and the sections it indexes (user
+# commands and system administration)
+MAN_PATH_DEFAULTS = ["/usr/share/man", "/usr/local/share/man", "/opt/homebrew/share/man"]
+MAN_PAGE_SECTIONS = ["man1", "man8"]
+
+# How much of a query (by word rarity) a local answer has to match before it's used instead of the LLM,
+# overridable with LOCAL_ANSWER_MIN_CONFIDENCE in .zevrc
+LOCAL_ANSWER_DEFAULT_MIN_CONFIDENCE = 0.9
+
+# Size past which ~/.zevrouting is rotated to ~/.zevrouting.1, replacing the one before, so the log of routed
+# queries takes up at most twice this
+ROUTING_LOG_MAX_BYTES = 1_000_000
+
+# Number of history entries kept, overridable with HISTORY_MAX_ENTRIES in .zevrc. The SQLite backend
+# (HISTORY_BACKEND=sqlite) searches through an index rather than parsing every entry, so it can keep far more.
+HISTORY_DEFAULT_MAX_ENTRIES = 100
+HISTORY_SQLITE_DEFAULT_MAX_ENTRIES = 50_000
+
+# Response cache defaults, overridable with CACHE_TTL_SECONDS / CACHE_MAX_ENTRIES in .zevrc
+CACHE_DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_DEFAULT_MAX_ENTRIES = 200
+
+# How long to wait for the per-query environment context (git repo, package manager, installed tools) before
+# sending the query without it
+ENV_CONTEXT_PROBE_BUDGET_SECONDS = 0.05
+
+# How long typing has to pause before the text so far is sent speculatively (SPECULATIVE_PREFETCH=true),
+# overridable with PREFETCH_DEBOUNCE_MS in .zevrc
+PREFETCH_DEFAULT_DEBOUNCE_MS = 400
+
+# Queries in flight at once in `zev --batch`, overridable with BATCH_CONCURRENCY in .zevrc or --concurrency
+BATCH_DEFAULT_CONCURRENCY = 8
+
+# Options asked for per query, overridable with MAX_OPTIONS in .zevrc
+DEFAULT_MAX_OPTIONS = 3
+# Longest short explanation the compact response format (COMPACT_SCHEMA=true) keeps, in characters
+COMPACT_MAX_EXPLANATION_CHARS = 60
+
+
+_PROMPT_INTRO = """
 You are a helpful assistant that helps users remember commands for the terminal. You 
-will return a JSON object with a list of at most three options.
+will return a JSON object with a list of at most {max_options} options.
 
 The options should be related to the prompt that the user provides (the prompt might
 either be desciptive or in the form of a question).
@@ -29,6 +107,9 @@ The options should be in the form of a command that can be run in a bash termina
 If the user prompt is not clear, return an empty list and set is_valid to false, and
 provide an explanation of why it is not clear in the explanation_if_not_valid field.
 
+"""
+
+_PROMPT_DANGER = """\
 If you provide an option that is likely to be dangerous, set is_dangerous to true for
 that option. For example, the command 'git reset --hard' is dangerous because it can
 delete all the user's local changes. 'rm -rf' is dangerous because it can delete all
@@ -36,10 +117,64 @@ the files in the user's directory. If something is marked as dangerous, provide
 short explanation of why it is dangerous in the dangerous_explanation field (leave
 this field empty if the option is not dangerous).
 
+"""
+
+_PROMPT_REST = """\
 Otherwise, set is_valid to true, leave explanation_if_not_valid empty, and provide the 
-commands in the commands field (remember, up to 3 options, and they all must be commands
+commands in the commands field (remember, up to {max_options} options, and they all must be commands
 that can be run in a bash terminal without changing anything). Each command should have
-a short explanation of what it does.
+a short explanation of what it does. If the context says which tools are installed, only
+suggest tools that are not listed as missing.
+
+Here is some context about the user's environment:
+
+============== 
+
+{context}
+
+============== 
+
+Here is the users prompt:
+
+============== 
+
+{prompt}
+"""
+
+PROMPT = _PROMPT_INTRO + _PROMPT_DANGER + _PROMPT_REST
+# with LOCAL_DANGER_CHECK=true, zev.danger decides which commands are dangerous, so the model isn't asked to
+PROMPT_WITHOUT_DANGER = _PROMPT_INTRO + _PROMPT_REST
+
+# The same, for the compact response format (COMPACT_SCHEMA=true, see zev.llms.response_format), whose keys
+# are a letter or two long, since the model writes them out again for every command
+_COMPACT_PROMPT_INTRO = """
+You are a helpful assistant that helps users remember commands for the terminal. You
+will return a compact JSON object with a list of at most {max_options} options.
+
+The options should be related to the prompt that the user provides (the prompt might
+either be desciptive or in the form of a question).
+
+The options should be in the form of a command that can be run in a bash terminal.
+
+If the user prompt is not clear, set "ok" to false, return an empty "o" list, and
+explain why it is not clear in "why".
+
+"""
+
+_COMPACT_PROMPT_DANGER = """\
+If you provide an option that is likely to be dangerous, set "d" to true for that
+option. For example, 'git reset --hard' is dangerous because it can delete all the
+user's local changes, and 'rm -rf' because it can delete all the files in the user's
+directory. If "d" is true, explain why in a few words in "w" (null otherwise).
+
+"""
+
+_COMPACT_PROMPT_REST = """\
+Otherwise, set "ok" to true and "why" to null, and list the options in "o" (remember,
+up to {max_options}, and they all must be commands that can be run in a bash terminal
+without changing anything). Each option has the command in "c" and what it does in "e",
+in at most {max_explanation_chars} characters. If the context says which tools are installed, only
+suggest tools that are not listed as missing.
 
 Here is some context about the user's environment:
 
@@ -55,3 +190,6 @@ Here is the users prompt:
 
 {prompt}
 """
+
+COMPACT_PROMPT = _COMPACT_PROMPT_INTRO + _COMPACT_PROMPT_DANGER + _COMPACT_PROMPT_REST
+COMPACT_PROMPT_WITHOUT_DANGER = _COMPACT_PROMPT_INTRO + _COMPACT_PROMPT_REST
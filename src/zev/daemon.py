@@ -0,0 +1,175 @@
+import json
+import os
+import socket
+import socketserver
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from zev.constants import DAEMON_SOCKET_NAME
+from zev.reporting import report, reports_to
+
+# how long the client waits to reach a daemon before falling back to running the query itself
+CONNECT_TIMEOUT_SECONDS = 0.5
+# how much longer than REQUEST_DEADLINE the client waits for an answer, so the daemon can report its own timeout
+RESPONSE_GRACE_SECONDS = 5
+# what connecting raises when there's no daemon: no socket file, one left behind by a daemon that's gone, or
+# one too busy to accept
+CONNECT_ERRORS = (FileNotFoundError, ConnectionRefusedError, socket.timeout)
+
+
+class DaemonUnavailable(Exception):
+    """No daemon could be reached, so the query should be run in-process."""
+
+
+def get_socket_path() -> Path:
+    return Path.home() / DAEMON_SOCKET_NAME
+
+
+def request_options(query: str, context: str, on_command: Optional[Callable] = None):
+    """
+    Run a query through a running daemon. Raises DaemonUnavailable when no daemon is listening, so callers
+    can fall back to running the query in-process. Once connected, errors are the daemon's to report.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable("Unix domain sockets are not supported on this platform")
+
+    # pylint: disable=import-outside-toplevel
+    from zev.config import config
+    from zev.llms.types import Command, OptionsResponse
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+        try:
+            sock.connect(str(get_socket_path()))
+        except CONNECT_ERRORS as e:
+            raise DaemonUnavailable(str(e)) from e
+
+        wait_seconds = config.request_deadline + RESPONSE_GRACE_SECONDS
+        deadline_at = time.monotonic() + wait_seconds
+        request = {"query": query, "context": context, "stream": on_command is not None}
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("r", encoding="utf-8") as f:
+                for message in _read_messages(sock, f, deadline_at):
+                    if "command" in message:
+                        on_command(Command(**message["command"]))
+                    elif "output" in message:
+                        report(message["output"])
+                    elif "error" in message:
+                        report(f"Error from zev daemon: {message['error']}")
+                        return None
+                    elif "response" in message:
+                        return OptionsResponse(**message["response"]) if message["response"] else None
+        except socket.timeout:
+            report(f"Error: zev daemon didn't answer within {wait_seconds:g}s")
+            return None
+        except OSError as e:
+            report(f"Error: lost the connection to zev daemon: {e}")
+            return None
+
+    report("Error: zev daemon closed the connection without a response")
+    return None
+
+
+def _read_messages(sock: socket.socket, f, deadline_at: float) -> Iterator[dict]:
+    # a socket timeout applies to each read, so it's set to the time left before every line
+    while True:
+        # never 0, which would make the socket non-blocking rather than time out
+        sock.settimeout(max(deadline_at - time.monotonic(), 0.001))
+        line = f.readline()
+        if not line:
+            return
+        yield json.loads(line)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return  # e.g. a connection that was closed without a request, as is_daemon_running does
+        if not isinstance(request, dict):
+            return
+        provider = self.server.provider
+
+        # what the provider reports belongs to the client that made the request, so it's sent back rather than
+        # printed in the daemon's terminal
+        reports = []
+        with reports_to(reports.append):
+            try:
+                if request.get("stream"):
+                    response = provider.stream_options(
+                        prompt=request["query"],
+                        context=request["context"],
+                        on_command=lambda cmd: self._send({"command": cmd.model_dump()}),
+                    )
+                else:
+                    response = provider.get_options(prompt=request["query"], context=request["context"])
+                message = {"response": response.model_dump() if response else None}
+            except Exception as e:
+                message = {"error": str(e)}
+
+        if reports:
+            self._send({"output": "\n".join(reports)})
+        self._send(message)
+
+    def _send(self, message: dict) -> None:
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting (e.g. Ctrl-C), so there's no one left to answer
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, provider) -> None:
+        self.provider = provider
+        # only the current user may talk to the daemon, since it answers with their API credentials
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), DaemonRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+
+def is_daemon_running(socket_path: Path) -> bool:
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except OSError:
+            return False
+
+
+def run_daemon() -> None:
+    # pylint: disable=import-outside-toplevel
+    from zev.config import config
+    from zev.llms.llm import get_inference_provider
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("zev daemon is not supported on this platform")
+        return
+
+    socket_path = get_socket_path()
+    if socket_path.exists():
+        if is_daemon_running(socket_path):
+            print(f"zev daemon is already running ({socket_path})")
+            return
+        socket_path.unlink()  # left behind by a daemon that didn't shut down cleanly
+
+    # the provider (and its HTTP client's connection pool) is built once and shared by every request
+    server = DaemonServer(socket_path, get_inference_provider())
+    print(f"zev daemon listening on {socket_path} (using {config.llm_provider} backend). Press Ctrl-C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+import os
+import re
+import shlex
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from zev.llms.types import Command, OptionsResponse
+
+# A rule-based check for commands that delete or overwrite data, or are otherwise hard to undo. It backs up
+# the model's own is_dangerous flag, and replaces it with LOCAL_DANGER_CHECK=true, where the model isn't asked
+# for one at all (saving the tokens it takes to reason about and explain it). Rules for subcommands (git,
+# docker, ...) match anywhere in the command, so they can also fire on an `echo` of one; for a warning, that's
+# the right side to err on.
+
+# where a program name starts a command: `rm` in `sudo rm -r x` or `xargs rm -f`, but not in `docker rm`
+_START = r"(?:^|[;&|(`]\s*|\$\(|\b(?:sudo|doas|xargs|exec|nohup|time|env)\s+)"
+_FLAGS = r"(?:\s+-{1,2}[\w=-]*)*"  # any options before the one a rule is looking for
+# the rest of the same command, which stops at a pipe or a separator: `sed -n 1p f | grep -i x` doesn't edit in place
+_ARGS = r"[^|;&]*"
+
+RULES = [
+    (
+        rf"{_START}rm{_FLAGS}\s+-(?:[a-zA-Z]*[rRf][a-zA-Z]*|-recursive|-force)\b",
+        "rm -r/-f deletes files and directories without asking, and they can't be recovered.",
+    ),
+    (rf"{_START}shred\b", "shred overwrites files so they can't be recovered."),
+    # the `\;` that ends an -exec doesn't end the find command
+    (r"\bfind\b(?:[^|;&]|\\;)*\s-(?:delete\b|exec(?:dir)?\s+rm\b)", "find deletes every file it matches."),
+    (rf"\bgit\s+reset\b{_ARGS}\s--hard\b", "git reset --hard discards all uncommitted changes."),
+    (rf"\bgit\s+clean\b{_ARGS}\s-[a-zA-Z]*f", "git clean -f deletes untracked files, which can't be recovered."),
+    (
+        rf"\bgit\s+(?:checkout\b{_ARGS}\s(?:--|\.)(?:\s|$)|restore\b(?!{_ARGS}--staged))",
+        "This discards uncommitted changes to the files, which can't be recovered.",
+    ),
+    (
+        rf"\bgit\s+push\b{_ARGS}\s(?:--force\b|--force-with-lease\b|-[a-zA-Z]*f)",
+        "A force push overwrites the remote branch, which can lose other people's commits.",
+    ),
+    (rf"\bgit\s+branch\b{_ARGS}\s-[a-zA-Z]*D", "git branch -D deletes the branch even if it hasn't been merged."),
+    (r"\bgit\s+stash\s+(?:drop|clear)\b", "This deletes stashed changes."),
+    (rf"{_START}dd\s{_ARGS}\bof=", "dd overwrites the output file or device, byte for byte."),
+    (rf"{_START}(?:mkfs(?:\.\w+)?|wipefs|fdisk|sfdisk|gdisk|sgdisk|parted)\b", "This erases or repartitions a disk."),
+    (r"\bdiskutil\s+(?:erase\w*|partitionDisk|zeroDisk|secureErase)\b", "This erases a disk."),
+    (
+        rf"{_START}(?:chmod|chown|chgrp){_FLAGS}\s+-(?:[a-zA-Z]*R[a-zA-Z]*|-recursive)\b",
+        "This changes the permissions or owner of every file below the directory, which is hard to undo.",
+    ),
+    (rf"\bchmod\b{_ARGS}\s[0-7]?777\b", "chmod 777 lets every user on the system modify the files."),
+    (rf"{_START}truncate\s", "truncate cuts files to the given size, losing whatever was beyond it."),
+    (rf"\brsync\b{_ARGS}\s--delete", "rsync --delete removes files from the destination that aren't in the source."),
+    (r"\b(?:curl|wget)\b[^|]*\|\s*(?:sudo\s+)?(?:ba|z|k)?sh\b", "This runs a script from the internet unreviewed."),
+    (
+        rf"{_START}(?:kill\s+(?:-9|-KILL|-SIGKILL)|killall|pkill)\b",
+        "This kills processes, which lose any unsaved work.",
+    ),
+    (rf"{_START}(?:shutdown|reboot|halt|poweroff)\b", "This shuts down or restarts the machine."),
+    (r"\bcrontab\s+-[a-zA-Z]*r", "crontab -r deletes all of your cron jobs."),
+    (r"\biptables\s+(?:-F|--flush)\b", "This removes all firewall rules."),
+    (
+        r"\b(?:docker|podman)\s+(?:system\s+prune|volume\s+(?:rm|prune)|rm\s+-[a-zA-Z]*f)",
+        "This deletes containers or volumes, and the data in them.",
+    ),
+    (r"\bkubectl\s+delete\b", "kubectl delete removes resources from the cluster."),
+    (r"(?i)\bdrop\s+(?:table|database|schema)\b", "This deletes the table or database and all of its data."),
+    (rf"\b(?:sed|perl)\b{_ARGS}\s-[a-zA-Z]*i", "This edits the files in place, without a backup."),
+    (r":\(\)\s*\{.*\};\s*:", "This is a fork bomb, which makes the system unresponsive."),
+]
+COMPILED_RULES = [(re.compile(pattern), explanation) for pattern, explanation in RULES]
+
+# Redirect targets that nothing is lost by writing to
+HARMLESS_TARGETS = frozenset(("/dev/null", "/dev/stdout", "/dev/stderr", "/dev/tty"))
+
+
+@lru_cache(maxsize=256)
+def classify(command: str) -> Optional[str]:
+    """Why the command is dangerous, or None if no rule matches."""
+    reasons = [explanation for pattern, explanation in COMPILED_RULES if pattern.search(command)]
+    overwritten = _overwritten_files(command)
+    if overwritten:
+        reasons.append(f"The > redirect overwrites {', '.join(overwritten)}, which already exists.")
+    return " ".join(dict.fromkeys(reasons)) or None
+
+
+def _overwritten_files(command: str) -> list[str]:
+    # `>` only counts outside of quotes, so tokenize rather than match, as zev.path_index does
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return []
+    files = []
+    for token, target in zip(tokens, tokens[1:]):
+        if token == ">" and target not in HARMLESS_TARGETS and os.path.isfile(os.path.expanduser(target)):
+            files.append(target)
+    return files
+
+
+def mark_dangerous(commands: list["Command"]) -> list["Command"]:
+    """The commands, with those the rules match marked as dangerous. A flag the model already set is kept."""
+    marked = []
+    for command in commands:
+        reason = classify(command.command)
+        if reason and not (command.is_dangerous and command.dangerous_explanation):
+            command = command.model_copy(update={"is_dangerous": True, "dangerous_explanation": reason})
+        marked.append(command)
+    return marked
+
+
+def check_response(response: Optional["OptionsResponse"]) -> Optional["OptionsResponse"]:
+    if response is None or not response.commands:
+        return response
+    return response.model_copy(update={"commands": mark_dangerous(response.commands)})
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from zev.constants import ENV_CONTEXT_FILE_NAME, ENV_CONTEXT_PROBE_BUDGET_SECONDS
+
+# Context sent with each query so the model can tailor commands to the user's system. The static part (OS
+# and shell) only changes on reboot, OS upgrade or shell change, so it's computed once and cached on disk.
+# The per-query part is probed in parallel while the rest of zev starts up, and whatever isn't ready within
+# the budget is left out rather than making the user wait.
+
+PACKAGE_MANAGERS = ("apt", "dnf", "yum", "pacman", "zypper", "apk", "brew", "port", "nix", "winget", "choco", "scoop")
+OS_RELEASE_FILES = ("/etc/os-release", "/System/Library/CoreServices/SystemVersion.plist")
+CWD_LABEL = "CWD"
+# the static part, which (unlike the cwd and the probes, which may or may not make the budget) is the same from one
+# query to the next
+STATIC_LABELS = ("OS", "SHELL")
+
+
+def _boot_id() -> Optional[str]:
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None  # not Linux; the OS release and shell still invalidate the cache
+
+
+def _os_release() -> list:
+    release = os.uname().release if hasattr(os, "uname") else str(sys.getwindowsversion())
+    # distro upgrades can leave the kernel release unchanged, so also watch the release files
+    mtimes = []
+    for path in OS_RELEASE_FILES:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return [release, mtimes]
+
+
+def _shell() -> Optional[str]:
+    return os.environ.get("SHELL") or os.environ.get("COMSPEC")
+
+
+def get_cache_path() -> Path:
+    return Path.home() / ENV_CONTEXT_FILE_NAME
+
+
+def get_static_context() -> dict:
+    """OS and shell, from the on-disk cache if it was computed since the last boot for the same OS and shell."""
+    key = [_boot_id(), _os_release(), _shell()]
+    path = get_cache_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["context"]
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    import platform  # pylint: disable=import-outside-toplevel
+
+    os_label, shell_label = STATIC_LABELS
+    context = {os_label: platform.platform(aliased=True)}
+    if key[2]:
+        context[shell_label] = key[2]
+    _write_cache(path, {"key": key, "context": context})
+    return context
+
+
+def _write_cache(path: Path, data: dict) -> None:
+    # write to a temp file and rename, so a crash mid-write can't leave a truncated file behind
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.")
+    except OSError:
+        return  # e.g. a read-only home directory; the context is just computed again next time
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _probe_git_repo(cwd: str) -> str:
+    # look for .git rather than running git, which would cost more than the whole budget
+    path = Path(cwd)
+    return "yes" if any((directory / ".git").exists() for directory in (path, *path.parents)) else "no"
+
+
+def _probe_package_manager() -> Optional[str]:
+    return next((name for name in PACKAGE_MANAGERS if shutil.which(name)), None)
+
+
+def _probe_tools() -> str:
+    from zev.path_index import available_tools_context, get_path_index  # pylint: disable=import-outside-toplevel
+
+    return available_tools_context(get_path_index())
+
+
+class ContextProbes:
+    """
+    Per-query context, probed in background threads. Start it as early as possible (before the slow imports)
+    and call result() when the context is needed; probes still running after the budget are left out.
+    """
+
+    def __init__(self, budget_seconds: float = ENV_CONTEXT_PROBE_BUDGET_SECONDS) -> None:
+        self.deadline = time.monotonic() + budget_seconds
+        self.cwd = os.getcwd()
+        self.results = {}
+        probes = {
+            "IN GIT REPO": (_probe_git_repo, self.cwd),
+            "PACKAGE MANAGER": (_probe_package_manager,),
+            "INSTALLED TOOLS": (_probe_tools,),
+        }
+        self.labels = list(probes)
+        # daemon threads, so a probe stuck on e.g. a hung network mount can't hold up zev's exit either
+        self.threads = [
+            threading.Thread(target=self._run, args=(label, *probe), daemon=True) for label, probe in probes.items()
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self, label: str, probe: Callable, *args) -> None:
+        try:
+            value = probe(*args)
+        except Exception:
+            return
+        if value:
+            self.results[label] = value
+
+    def result(self) -> dict:
+        for thread in self.threads:
+            thread.join(max(self.deadline - time.monotonic(), 0))
+        context = {CWD_LABEL: self.cwd}
+        context.update((label, self.results[label]) for label in self.labels if label in self.results)
+        return context
+
+
+def start_probes() -> ContextProbes:
+    return ContextProbes()
+
+
+def get_env_context(probes: Optional[ContextProbes] = None) -> str:
+    context = dict(get_static_context())
+    context.update((probes or start_probes()).result())
+    return "\n".join(f"{label}: {value}" for label, value in context.items())
+
+
+def static_part(context: str) -> str:
+    """
+    Just the OS and shell lines of the context, for the response cache key. The cwd would keep cached responses
+    from being shared across directories, and probes that only sometimes make the budget would split one query
+    across several keys.
+    """
+    prefixes = tuple(f"{label}: " for label in STATIC_LABELS)
+    return "\n".join(line for line in context.splitlines() if line.startswith(prefixes))
@@ -0,0 +1,434 @@
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from zev.constants import KNOWLEDGE_INDEX_FILE_NAME, MAN_PAGE_SECTIONS, MAN_PATH_DEFAULTS
+from zev.knowledge_corpus import CORPUS, CORPUS_VERSION
+
+# An offline answer engine for simple queries ("list open ports", "find big files"): an inverted index over
+# the bundled corpus and the NAME lines of installed man pages, ranked with BM25. A query is only answered
+# locally when the best matches cover (nearly) every word of it and it names something specific, otherwise it
+# goes to the LLM as usual.
+
+INDEX_VERSION = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_ANSWERS = 3
+# A query made up only of words this common, relative to the rarest possible word, matches many commands about
+# equally well ("show files"), so it goes to the LLM
+SPECIFIC_IDF = 0.5
+# tldr-style placeholder for a value the user has to fill in, e.g. "tail -f {{path/to/file}}". Commands with
+# one are indexed, but never given as an answer.
+PLACEHOLDER = "{{"
+
+STOPWORDS = frozenset(
+    "a an the in on of for to me my i how do does what is are with and can you please this that which by from "
+    "it its current currently using use all any some want need would like".split()
+)
+# queries like "list files except hidden ones" need more than keyword matching, so always go to the LLM
+NEGATIONS = frozenset(("not", "no", "without", "except", "excluding", "don't", "dont", "never", "but"))
+SYNONYMS = {
+    "big": "large",
+    "huge": "large",
+    "biggest": "large",
+    "largest": "large",
+    "folder": "directory",
+    "dir": "directory",
+    "display": "show",
+    "print": "show",
+    "view": "show",
+    "see": "show",
+    "check": "show",
+    "get": "show",
+    "ram": "memory",
+    "mem": "memory",
+    "proc": "process",
+    "program": "process",
+    "app": "process",
+    "listening": "listen",
+    "space": "usage",
+    "os": "operating",
+}
+TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+ROFF_FONT = re.compile(r"\\f(?:\[[^\]]*\]|\(..|.)")
+ROFF_ESCAPE = re.compile(r"\\(?:\(..|\[[^\]]*\]|.)")
+OPTIONAL_ARGUMENT = re.compile(r"\[[^\[\]]*\]")
+# mdoc macros for an argument or flag in a SYNOPSIS, which is required unless it's inside .Op or .Oo/.Oc
+MDOC_ARGUMENTS = frozenset(("Ar", "Fl", "Cm", "Ic", "Pa"))
+ALTERNATING_FONT_MACROS = frozenset((".RI", ".IR", ".BR", ".RB", ".BI", ".IB"))
+FONT_MACROS = ALTERNATING_FONT_MACROS | {".B", ".I", ".R", ".SB", ".SM"}
+
+
+def _stem(word: str) -> str:
+    # just enough to match "files"/"file" and "listing"/"list"; a real stemmer isn't worth the dependency
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed") and not word.endswith("eed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    terms = []
+    for word in TOKEN.findall(text.lower()):
+        word = SYNONYMS.get(word, word)
+        if word not in STOPWORDS:
+            terms.append(SYNONYMS.get(_stem(word), _stem(word)))
+    return terms
+
+
+def _clean_roff(text: str) -> str:
+    text = ROFF_FONT.sub("", text).replace("\\-", "-").replace("\\(em", "-").replace("\\(en", "-")
+    return " ".join(ROFF_ESCAPE.sub("", text).split())
+
+
+def parse_man_summary(text: str) -> Optional[str]:
+    """The one-line description from a man page's NAME section, e.g. "list directory contents" for ls(1)."""
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if re.match(r'^\.S[hH]\s+"?NAME"?\s*$', line):
+            break
+    else:
+        return None
+
+    name_lines = []
+    for line in lines[i + 1 :]:
+        if re.match(r"^\.S[hHsS]\b", line):
+            break
+        if line.startswith(".Nd "):  # mdoc: .Nm ls / .Nd list directory contents
+            return _clean_roff(line[4:]) or None
+        if line.startswith((".", "'")):
+            continue
+        name_lines.append(line)
+
+    name = _clean_roff(" ".join(name_lines))
+    _, separator, summary = name.partition(" - ")
+    return (summary.strip() or None) if separator else None
+
+
+def parse_man_usage(text: str, program: str) -> Optional[str]:
+    """
+    The command from a man page's SYNOPSIS that runs the program without arguments, e.g. "ls" for
+    `ls [OPTION]...` or "git status" for git-status(1), or None if every form needs some, as `cp [OPTION]...
+    SOURCE DEST` does. Pages whose synopsis can't be read count as needing arguments.
+    """
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if re.match(r'^\.S[hH]\s+"?SYNOPSIS"?\s*$', line):
+            break
+    else:
+        return None
+
+    section = []
+    for line in lines[i + 1 :]:
+        if re.match(r"^\.S[hH]\b", line):
+            break
+        section.append(line)
+    if any(line.startswith(".Nm") for line in section):
+        return program if _mdoc_runs_without_arguments(section) else None
+
+    # man(7): each form starts with the program's name, e.g. ".B cp" or "\fBtar\fR \fB\-A\fR ...", and
+    # ends at a macro other than a font change, such as .br or .PP
+    names = [[program], program.split("-")]  # git-status(1) is run as `git status`
+    forms, form = [], None
+    for line in section:
+        if line.startswith(("'", '.\\"')):
+            continue
+        macro, _, rest = line.partition(" ") if line.startswith(".") else ("", "", line)
+        text_line = _clean_roff(rest.replace('"', ""))
+        if macro in ALTERNATING_FONT_MACROS:
+            text_line = text_line.replace(" ", "")  # e.g. ".RI [ options ]"
+        name = next((name for name in names if text_line.split()[: len(name)] == name), None)
+        if name:
+            form = [text_line]
+            forms.append((name, form))
+        elif macro and macro not in FONT_MACROS:
+            form = None
+        elif form is not None:
+            form.append(text_line)
+    for name, form in forms:
+        usage = " ".join(form)
+        while OPTIONAL_ARGUMENT.search(usage):
+            usage = OPTIONAL_ARGUMENT.sub("", usage)
+        if usage.replace("...", " ").split() == name:
+            return " ".join(name)
+    return None
+
+
+def _mdoc_runs_without_arguments(section: list[str]) -> bool:
+    # forms start at each .Nm; .Op and .Oo/.Oc mark what's optional
+    required, depth, seen_form = False, 0, False
+    for line in section + [".Nm"]:
+        words = line[1:].split() if line.startswith(".") else []
+        if not words:
+            continue
+        if words[0] == "Nm":
+            if seen_form and not required:
+                return True
+            seen_form, required, depth = True, False, 0
+            words = words[1:]
+        for word in words:
+            if word == "Op":
+                break  # the rest of the line is optional
+            if word == "Oo":
+                depth += 1
+            elif word == "Oc":
+                depth = max(depth - 1, 0)
+            elif word in MDOC_ARGUMENTS and not depth:
+                required = True
+    return False
+
+
+def _read_man_page(path: str, program: str) -> tuple[Optional[str], Optional[str]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            head = f.read(16384)  # NAME and SYNOPSIS are right at the top
+    except (OSError, EOFError):
+        return None, None
+    if head.startswith(".so "):
+        return None, None  # an alias of another page, which is indexed under its own name
+    return parse_man_summary(head), parse_man_usage(head, program)
+
+
+def _program_name(file_name: str) -> str:
+    # "ls.1.gz" -> "ls", "git-log.1" -> "git-log"
+    base = file_name[:-3] if file_name.endswith(".gz") else file_name
+    return base.rsplit(".", 1)[0]
+
+
+def get_man_dirs() -> list[str]:
+    roots = [root for root in os.environ.get("MANPATH", "").split(os.pathsep) if root] or MAN_PATH_DEFAULTS
+    return [os.path.join(root, section) for root in roots for section in MAN_PAGE_SECTIONS]
+
+
+class KnowledgeIndex:
+    """
+    The index, stored in a single JSON file. Man pages are tracked by directory and file mtime, so that a
+    refresh after a package install only reads the pages that are new or changed.
+    """
+
+    def __init__(self) -> None:
+        self.path = Path.home() / KNOWLEDGE_INDEX_FILE_NAME
+        self.encoding = "utf-8"
+        self.data = None
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding=self.encoding) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION:
+            return False
+        self.data = data
+        return True
+
+    def build(self, include_man_pages: bool) -> None:
+        """Indexes the corpus, and man pages if asked to. Man pages that haven't changed are reused."""
+        old = self.data or {}
+        self.data = {
+            "version": INDEX_VERSION,
+            "corpus_version": CORPUS_VERSION,
+            "include_man_pages": include_man_pages,
+            "man_dirs": {},
+            "man_pages": {},
+        }
+        if include_man_pages:
+            self._index_man_pages(old.get("man_dirs", {}), old.get("man_pages", {}))
+        self._build_postings()
+        self._write()
+
+    def refresh(self) -> bool:
+        """Re-indexes whatever changed since the index was built. Returns whether anything did."""
+        stale = self.data["corpus_version"] != CORPUS_VERSION
+        if self.data["include_man_pages"]:
+            man_dirs = {directory: _mtime(directory) for directory in get_man_dirs()}
+            stale = stale or man_dirs != self.data["man_dirs"]
+        if stale:
+            self.build(self.data["include_man_pages"])
+        return stale
+
+    def search(self, query: str, min_confidence: float) -> list[tuple[str, str]]:
+        """(command, description) of the best matches that cover at least min_confidence of the query."""
+        terms = tokenize(query)
+        if not terms or NEGATIONS & set(query.lower().split()):
+            return []
+
+        postings = self.data["postings"]
+        doc_lengths = self.data["doc_lengths"]
+        doc_count = len(doc_lengths)
+        average_length = sum(doc_lengths) / doc_count if doc_count else 0
+        # words that appear nowhere count as much as the rarest word, so they sink the coverage
+        max_idf = math.log(1 + doc_count)
+
+        def idf(term: str) -> float:
+            matches = len(postings.get(term, ()))
+            return _idf(matches, doc_count) if matches else max_idf
+
+        if max(idf(term) for term in terms) < SPECIFIC_IDF * max_idf:
+            return []
+
+        scores, covered = {}, {}
+        for term in set(terms):
+            term_idf = idf(term)
+            for doc, frequency in postings.get(term, ()):
+                norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0) + term_idf * frequency * (BM25_K1 + 1) / norm
+                covered[doc] = covered.get(doc, 0) + term_idf
+
+        # Of the docs that match, those that say the least beyond the query come first: "list hidden files" is a
+        # worse answer to "list the files in a directory" than "list the files in a directory with details"
+        doc_weights = self.data["doc_weights"]
+        ranked = sorted(scores, key=lambda doc: scores[doc] * covered[doc] / doc_weights[doc], reverse=True)
+        total_idf = sum(idf(term) for term in set(terms))
+        results, seen = [], set()
+        for doc in ranked:
+            if covered[doc] / total_idf < min_confidence:
+                continue
+            command, description = self.data["docs"][doc]
+            if command not in seen:
+                seen.add(command)
+                results.append((command, description))
+        return results
+
+    def _index_man_pages(self, old_dirs: dict, old_pages: dict) -> None:
+        pages = self.data["man_pages"]
+        for directory in get_man_dirs():
+            mtime = _mtime(directory)
+            self.data["man_dirs"][directory] = mtime
+            if mtime is None:
+                continue
+            if old_dirs.get(directory) == mtime:
+                # package managers install pages by renaming them into place, which updates the directory's mtime
+                pages.update((path, page) for path, page in old_pages.items() if os.path.dirname(path) == directory)
+                continue
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    file_mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                old = old_pages.get(entry.path)
+                if old is not None and old[0] == file_mtime:
+                    pages[entry.path] = old
+                else:
+                    program = _program_name(entry.name)
+                    pages[entry.path] = [file_mtime, program, *_read_man_page(entry.path, program)]
+
+    def _build_postings(self) -> None:
+        docs, texts = [], []
+        for description, command, platform in CORPUS:
+            if platform is None or sys.platform.startswith(platform):
+                docs.append([command, description])
+                texts.append(description)
+        programs = set()
+        for _, program, summary, usage in self.data["man_pages"].values():
+            if summary and program not in programs:
+                programs.add(program)
+                # a program that needs arguments (`cp`) isn't an answer on its own
+                docs.append([usage or f"{program} {PLACEHOLDER}arguments}}}}", summary])
+                # man pages are matched on their name too, e.g. "uptime" or "git log"
+                texts.append(f"{program.replace('-', ' ')} {summary}")
+
+        postings, doc_lengths, doc_terms = {}, [], []
+        for doc, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths.append(len(terms))
+            doc_terms.append(set(terms))
+            for term in set(terms):
+                postings.setdefault(term, []).append([doc, terms.count(term)])
+        # the summed idf of each doc's words, against which search measures how much of a doc a query covers
+        doc_weights = [sum(_idf(len(postings[term]), len(docs)) for term in terms) for terms in doc_terms]
+        self.data.update(docs=docs, postings=postings, doc_lengths=doc_lengths, doc_weights=doc_weights)
+
+    def _write(self) -> None:
+        # write to a temp file and rename, so a crash mid-write can't leave a truncated index behind
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.")
+        except OSError:
+            return  # e.g. a read-only home directory; the index is just built again next time
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                json.dump(self.data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return  # e.g. the disk filled up partway through
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _idf(matches: int, doc_count: int) -> float:
+    return math.log(1 + (doc_count - matches + 0.5) / (matches + 0.5))
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def answer_locally(query: str, min_confidence: float):
+    """
+    An OptionsResponse from the local index when it can answer the query with confidence, or None to ask the
+    LLM. Only commands that can be run as they are (no placeholders) and whose programs are installed are
+    returned. Without an index (see `zev --build-index`), one is built from the corpus alone.
+    """
+    # pylint: disable=import-outside-toplevel
+    from zev.danger import classify
+    from zev.llms.types import Command, OptionsResponse
+    from zev.path_index import get_path_index
+
+    index = KnowledgeIndex()
+    if index.load():
+        index.refresh()
+    else:
+        index.build(include_man_pages=False)
+
+    path_index = get_path_index()
+    matches = []
+    for command, description in index.search(query, min_confidence):
+        if PLACEHOLDER in command:
+            break  # a closer match needs values from the user, which is a job for the LLM
+        if not path_index.missing_binaries(command):
+            matches.append((command, description))
+    matches = matches[:MAX_ANSWERS]
+    if not matches:
+        return None
+    commands = []
+    for command, description in matches:
+        # there's no model to flag dangerous commands, so it's all up to zev.danger's rules
+        reason = classify(command)
+        commands.append(
+            Command(
+                command=command,
+                short_explanation=description[:1].upper() + description[1:],
+                is_dangerous=reason is not None,
+                dangerous_explanation=reason,
+            )
+        )
+    return OptionsResponse(commands=commands, is_valid=True)
+
+
+def build_index() -> None:
+    index = KnowledgeIndex()
+    index.load()
+    index.build(include_man_pages=True)
+    pages = sum(1 for _, _, summary, _ in index.data["man_pages"].values() if summary)
+    print(f"Indexed {len(index.data['docs'])} commands ({pages} man pages) in {index.path}")
@@ -0,0 +1,91 @@
+# Common tasks and the commands for them, in the spirit of tldr pages, for answering simple queries offline
+# (see zev.knowledge). Each entry is (description, command, platform), where platform is a sys.platform
+# prefix or None for any. Values the user has to fill in are {{placeholders}}, as in tldr, and such commands are
+# never given as a local answer. Commands here only read state, never change it. Bump CORPUS_VERSION on any
+# change, so existing indexes pick it up.
+
+CORPUS_VERSION = 3
+
+CORPUS = [
+    # files and directories
+    ("List files in the current directory with details", "ls -la", None),
+    ("List hidden files", "ls -a", None),
+    ("List files sorted by size", "ls -lS", None),
+    ("List files sorted by modification time, newest first", "ls -lt", None),
+    ("Find large files bigger than 100 MB", "find . -type f -size +100M", None),
+    ("Find the largest files and directories", "du -ah . | sort -rh | head -n 20", None),
+    ("Find files by name", 'find . -name "{{*.txt}}"', None),
+    ("Find empty files", "find . -type f -empty", None),
+    ("Find empty directories", "find . -type d -empty", None),
+    ("Find files modified in the last day", "find . -type f -mtime -1", None),
+    ("Count files in a directory recursively", "find . -type f | wc -l", None),
+    ("Count lines in a file", "wc -l {{path/to/file}}", None),
+    ("Show the directory tree", "tree -L 2", None),
+    ("Show the size of each directory", "du -sh *", None),
+    ("Show the total size of a directory", "du -sh {{path/to/directory}}", None),
+    ("Show the current working directory", "pwd", None),
+    ("Show the type of a file", "file {{path/to/file}}", None),
+    ("Show the last lines of a file", "tail -n 50 {{path/to/file}}", None),
+    ("Follow a log file as it grows", "tail -f {{path/to/file}}", None),
+    ("Search for text in files recursively", 'grep -rn "{{text}}" .', None),
+    ("Search for text in files recursively with ripgrep", 'rg "{{text}}"', None),
+    # disks
+    ("Show disk usage and free space of mounted filesystems", "df -h", None),
+    ("List disks and partitions block devices", "lsblk", "linux"),
+    ("List disks and partitions", "diskutil list", "darwin"),
+    ("Show mounted filesystems", "findmnt", "linux"),
+    ("Show mounted filesystems", "mount", "darwin"),
+    # processes
+    ("List running processes", "ps aux", None),
+    ("Show processes using the most CPU", "ps aux --sort=-%cpu | head -n 10", "linux"),
+    ("Show processes using the most CPU", "ps aux -r | head -n 10", "darwin"),
+    ("Show processes using the most memory", "ps aux --sort=-%mem | head -n 10", "linux"),
+    ("Show processes using the most memory", "ps aux -m | head -n 10", "darwin"),
+    ("Find a process by name", "pgrep -fl {{name}}", None),
+    ("Monitor processes and resource usage interactively", "top", None),
+    ("List files opened by a process", "lsof -p {{pid}}", None),
+    # system
+    ("Show memory usage free RAM", "free -h", "linux"),
+    ("Show memory usage statistics", "vm_stat", "darwin"),
+    ("Show CPU information", "lscpu", "linux"),
+    ("Show CPU information", "sysctl -n machdep.cpu.brand_string", "darwin"),
+    ("Show system uptime and load average", "uptime", None),
+    ("Show the kernel version", "uname -r", None),
+    ("Show the operating system version", "cat /etc/os-release", "linux"),
+    ("Show the operating system version", "sw_vers", "darwin"),
+    ("Show the hostname", "hostname", None),
+    ("Show the current user", "whoami", None),
+    ("List logged in users", "who", None),
+    ("Show the current date and time", "date", None),
+    ("Show a calendar", "cal", None),
+    ("Show environment variables", "printenv", None),
+    ("Show the PATH variable", 'echo "$PATH"', None),
+    ("Show the current shell", 'echo "$SHELL"', None),
+    ("Show command history", "history", None),
+    ("Show battery status", "pmset -g batt", "darwin"),
+    # network
+    ("List open ports and listening sockets", "ss -tulpn", "linux"),
+    ("List open ports and listening sockets", "lsof -iTCP -sTCP:LISTEN -n -P", "darwin"),
+    ("List open network connections", "ss -tunap", "linux"),
+    ("List open network connections", "netstat -an", "darwin"),
+    ("Show which process is using a port", "lsof -i :{{port}}", None),
+    ("Show IP addresses of network interfaces", "ip addr", "linux"),
+    ("Show IP addresses of network interfaces", "ifconfig", "darwin"),
+    # local only: asking a web service for the public address would send a request the user didn't see coming
+    ("Show my IP address", "ip -brief addr", "linux"),
+    ("Show my IP address", "ifconfig", "darwin"),
+    ("Check internet connectivity with ping", "ping -c 4 8.8.8.8", None),
+    ("Look up DNS records of a domain", "dig {{example.com}}", None),
+    # git
+    ("Show git status of the working tree", "git status", None),
+    ("Show the current git branch", "git branch --show-current", None),
+    ("List git branches", "git branch -a", None),
+    ("Show git commit log history", "git log --oneline --graph", None),
+    ("Show unstaged git changes diff", "git diff", None),
+    ("List git remotes", "git remote -v", None),
+    # tools
+    ("List docker containers", "docker ps -a", None),
+    ("List docker images", "docker images", None),
+    ("List installed python packages", "pip list", None),
+    ("Show the python version", "python3 --version", None),
+]
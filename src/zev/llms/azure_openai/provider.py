@@ -1,16 +1,21 @@
-from openai import AzureOpenAI
+from functools import cached_property
+from typing import Optional
+
+from openai import AsyncAzureOpenAI, AzureOpenAI
 
 from zev.config import config
-from zev.llms.openai.provider import OpenAIProvider
+from zev.llms.openai.provider import OpenAIProvider, client_options
+from zev.llms.response_format import ResponseFormat
 
 
 class AzureOpenAIProvider(OpenAIProvider):
     AUTH_ERROR_MESSAGE = "Error: There was an error authenticating with Azure OpenAI. Check Azure credentials or run `zev --setup` again."
 
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, response_format: Optional[ResponseFormat] = None):
+        deployment = model or config.azure_openai_deployment
         required_vars = {
             "AZURE_OPENAI_ACCOUNT_NAME": config.azure_openai_account_name,
-            "AZURE_OPENAI_DEPLOYMENT": config.azure_openai_deployment,
+            "AZURE_OPENAI_DEPLOYMENT": deployment,
             "AZURE_OPENAI_API_VERSION": config.azure_openai_api_version,
         }
 
@@ -20,12 +25,13 @@ class AzureOpenAIProvider(OpenAIProvider):
 
         azure_openai_endpoint = f"https://{config.azure_openai_account_name}.openai.azure.com/"
 
+        self.client_kwargs = {
+            "azure_endpoint": azure_openai_endpoint,
+            "api_version": config.azure_openai_api_version,
+            **client_options(),
+        }
         if config.azure_openai_api_key:
-            self.client = AzureOpenAI(
-                api_key=config.azure_openai_api_key,
-                azure_endpoint=azure_openai_endpoint,
-                api_version=config.azure_openai_api_version,
-            )
+            self.client_kwargs["api_key"] = config.azure_openai_api_key
         else:
             try:
                 from azure.identity import (  # pylint: disable=import-outside-toplevel
@@ -34,13 +40,15 @@ class AzureOpenAIProvider(OpenAIProvider):
                 )
             except ImportError as exc:
                 raise ImportError("Missing required Azure packages. Run `pip install zev[azure]`") from exc
-            token_provider = get_bearer_token_provider(
+            self.client_kwargs["azure_ad_token_provider"] = get_bearer_token_provider(
                 DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
             )
-            self.client = AzureOpenAI(
-                azure_endpoint=azure_openai_endpoint,
-                api_version=config.azure_openai_api_version,
-                azure_ad_token_provider=token_provider,
-            )
+        self.client = AzureOpenAI(**self.client_kwargs)
+
+        self.model = deployment
+        self.response_format = response_format or ResponseFormat()
 
-        self.model = config.azure_openai_deployment
+    @cached_property
+    def async_client(self) -> AsyncAzureOpenAI:
+        # the async client also accepts the (blocking) bearer token provider, which caches its token
+        return AsyncAzureOpenAI(**self.client_kwargs)
@@ -1,77 +1,169 @@
+import asyncio
 import json
-import urllib.error
-import urllib.request
+import threading
+import weakref
+from typing import Callable, Optional
+
+import httpx2
 
 from zev.config import config
-from zev.constants import GEMINI_BASE_URL, GEMINI_DEFAULT_MODEL, PROMPT
+from zev.constants import GEMINI_DEFAULT_MODEL
 from zev.llms.inference_provider_base import InferenceProvider
-from zev.llms.types import OptionsResponse
-
-GEMINI_RESPONSE_SCHEMA = {
-    "response_mime_type": "application/json",
-    "response_schema": {
-        "type": "OBJECT",
-        "properties": {
-            "commands": {
-                "type": "ARRAY",
-                "items": {
-                    "type": "OBJECT",
-                    "properties": {
-                        "command": {"type": "STRING"},
-                        "short_explanation": {"type": "STRING"},
-                        "is_dangerous": {"type": "BOOLEAN"},
-                        "dangerous_explanation": {"type": "STRING"},
-                    },
-                    "required": [
-                        "command",
-                        "short_explanation",
-                        "is_dangerous",
-                    ],
-                },
-            },
-            "is_valid": {"type": "BOOLEAN"},
-            "explanation_if_not_valid": {"type": "STRING"},
-        },
-        "required": [
-            "commands",
-            "is_valid",
-        ],
-    },
-}
+from zev.llms.resilience import RetryableError, attempt_timeout, parse_retry_after
+from zev.llms.response_format import ResponseFormat
+from zev.llms.stream_parser import CommandStreamParser
+from zev.llms.types import Command, OptionsResponse
+from zev.profiling import span
+from zev.reporting import report
+
+# timeouts and dropped connections
+RETRYABLE_ERRORS = (httpx2.TimeoutException, httpx2.NetworkError, httpx2.RemoteProtocolError)
+HEADERS = {"Content-Type": "application/json"}
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> httpx2.Client:
+    # one client per process, so repeated queries (batch, daemon) reuse its keep-alive TLS connections
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = httpx2.Client(timeout=client_timeout())
+        return _shared_client
+
+
+def client_timeout() -> httpx2.Timeout:
+    return httpx2.Timeout(config.read_timeout, connect=config.connect_timeout)
+
+
+def request_timeout() -> httpx2.Timeout:
+    # the client's timeouts, or less once a retried request is close to its deadline
+    connect, read = attempt_timeout(config.connect_timeout, config.read_timeout)
+    return httpx2.Timeout(read, connect=connect)
 
 
 class GeminiProvider(InferenceProvider):
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, response_format: Optional[ResponseFormat] = None):
         if not config.gemini_api_key:
             raise ValueError("GEMINI_API_KEY must be set. Try running `zev --setup`.")
 
-        self.model = config.gemini_model or GEMINI_DEFAULT_MODEL
-        self.api_url = f"{GEMINI_BASE_URL}/v1beta/models/{self.model}:generateContent?key={config.gemini_api_key}"
+        self.model = model or config.gemini_model or GEMINI_DEFAULT_MODEL
+        self.response_format = response_format or ResponseFormat()
+        base_url = f"{config.gemini_base_url}/v1beta/models/{self.model}"
+        self.model_url = f"{base_url}?key={config.gemini_api_key}"
+        self.api_url = f"{base_url}:generateContent?key={config.gemini_api_key}"
+        self.stream_api_url = f"{base_url}:streamGenerateContent?alt=sse&key={config.gemini_api_key}"
+        self.client = get_shared_client()
+        # an AsyncClient's connections belong to the event loop that opened them, so there's one client per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def async_client(self) -> httpx2.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx2.AsyncClient(timeout=client_timeout())
+        return client
 
     def get_options(self, prompt: str, context: str) -> None:
-        assembled_prompt = PROMPT.format(prompt=prompt, context=context)
-        headers = {"Content-Type": "application/json"}
-        body = json.dumps(
+        try:
+            with span("request"):
+                response = self.client.post(
+                    self.api_url,
+                    content=self._request_body(prompt, context),
+                    headers=HEADERS,
+                    timeout=request_timeout(),
+                )
+                response.raise_for_status()
+            with span("parse"):
+                return self._parse_response(response.content)
+        except Exception as e:
+            self._handle_error(e)
+        return None
+
+    def warm_up(self) -> None:
+        # httpx can't just connect, so look up the model, which leaves a keep-alive connection in the client's pool
+        self.client.get(self.model_url)
+
+    async def awarm_up(self) -> None:
+        await self.async_client.get(self.model_url)
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        try:
+            response = await self.async_client.post(
+                self.api_url, content=self._request_body(prompt, context), headers=HEADERS, timeout=request_timeout()
+            )
+            response.raise_for_status()
+            return self._parse_response(response.content)
+        except Exception as e:
+            self._handle_error(e)
+        return None
+
+    def stream_options(
+        self, prompt: str, context: str, on_command: Callable[[Command], None]
+    ) -> Optional[OptionsResponse]:
+        parser = CommandStreamParser(array_key=self.response_format.array_key)
+
+        try:
+            body = self._request_body(prompt, context)
+            timeout = request_timeout()
+            with (
+                span("request"),
+                self.client.stream(
+                    "POST", self.stream_api_url, content=body, headers=HEADERS, timeout=timeout
+                ) as response,
+            ):
+                if response.is_error:
+                    response.read()  # for the error message
+                response.raise_for_status()
+                # server-sent events, each carrying the next piece of the generated JSON
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:") :])
+                    for part in data["candidates"][0]["content"]["parts"]:
+                        for command in parser.feed(part.get("text", "")):
+                            on_command(self.response_format.parse_command(command))
+            return self.response_format.parse(parser.result())
+        except Exception as e:
+            self._handle_error(e)
+        return None
+
+    def _request_body(self, prompt: str, context: str) -> bytes:
+        return json.dumps(
             {
-                "contents": [{"parts": [{"text": assembled_prompt}]}],
-                "generationConfig": GEMINI_RESPONSE_SCHEMA,
+                "contents": [{"parts": [{"text": self.response_format.prompt(prompt, context)}]}],
+                "generationConfig": self.response_format.gemini_schema(),
             }
         ).encode("utf-8")
-        request = urllib.request.Request(self.api_url, data=body, headers=headers, method="POST")
 
+    def _parse_response(self, body: bytes) -> OptionsResponse:
+        data = json.loads(body.decode())
+        text_output = data["candidates"][0]["content"]["parts"][0]["text"]
+        return self.response_format.parse(json.loads(text_output))
+
+    def _handle_error(self, error: Exception) -> None:
+        if isinstance(error, RETRYABLE_ERRORS):
+            raise RetryableError(f"{type(error).__name__}: {error}") from error
+        if isinstance(error, httpx2.HTTPStatusError):
+            status = error.response.status_code
+            message = self._error_message(error)
+            if status == 429 or status >= 500:
+                raise RetryableError(
+                    f"HTTP {status}: {message}" if message else f"HTTP {status}",
+                    retry_after=parse_retry_after(error.response.headers),
+                ) from error
+            if message:
+                report(f"Error: {message}")
+            else:
+                report(f"HTTP Error: {status}")
+            report("Note that to update settings, you can run `zev --setup`.")
+        else:
+            report(f"Unexpected error: {error}")
+
+    def _error_message(self, error: httpx2.HTTPStatusError) -> Optional[str]:
         try:
-            with urllib.request.urlopen(request) as response:
-                data = json.loads(response.read().decode())
-                text_output = data["candidates"][0]["content"]["parts"][0]["text"]
-                parsed_json = json.loads(text_output)
-                return OptionsResponse(**parsed_json)
-        except urllib.error.HTTPError as e:
-            try:
-                error_data = json.loads(e.read().decode())
-                print("Error:", error_data["error"]["message"])
-            except Exception:
-                print("HTTP Error:", e.code)
-            print("Note that to update settings, you can run `zev --setup`.")
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-        return None
+            return error.response.json()["error"]["message"]
+        except Exception:
+            return None
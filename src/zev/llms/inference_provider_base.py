@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Callable, Optional
 
-from zev.llms.types import OptionsResponse
+from zev.llms.types import Command, OptionsResponse
 
 
 class InferenceProvider:
@@ -9,3 +9,40 @@ class InferenceProvider:
 
     def get_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
         raise NotImplementedError("Subclasses must implement this method")
+
+    def warm_up(self) -> None:
+        """
+        Opens a connection to the provider ahead of the first request, e.g. while the user is typing. Providers
+        whose client can't do that keep this no-op. Errors are the caller's to ignore; the request reports them.
+        """
+
+    async def awarm_up(self) -> None:
+        """
+        Async version of warm_up, which connects the client aget_options uses. Providers without a native async
+        client fall back to running warm_up in a worker thread.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        await asyncio.to_thread(self.warm_up)
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        """
+        Async version of get_options, for running many queries on one event loop. Providers without a native
+        async client fall back to running get_options in a worker thread.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        return await asyncio.to_thread(self.get_options, prompt, context)
+
+    def stream_options(
+        self, prompt: str, context: str, on_command: Callable[[Command], None]
+    ) -> Optional[OptionsResponse]:
+        """
+        Like get_options, but calls on_command with each command as soon as it has been generated.
+        Providers that can't stream fall back to calling it for every command once the response is complete.
+        """
+        response = self.get_options(prompt, context)
+        if response is not None:
+            for command in response.commands:
+                on_command(command)
+        return response
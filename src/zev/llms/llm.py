@@ -1,28 +1,108 @@
+from typing import Optional
+
 from zev.config import config
-from zev.constants import LLMProviders
+from zev.constants import LLMProviders, RoutingTiers
 from zev.llms.inference_provider_base import InferenceProvider
 
 
 def get_inference_provider() -> InferenceProvider:
-    if config.llm_provider == LLMProviders.OPENAI:
+    routes = config.routing_table
+    if RoutingTiers.SIMPLE in routes:
+        # pylint: disable=import-outside-toplevel
+        from zev.llms.routing import RoutingProvider
+
+        tiers = {}
+        for tier in (RoutingTiers.SIMPLE, RoutingTiers.COMPLEX):
+            if tier in routes:
+                provider, model = routes[tier]
+                label = f"{provider}/{model}"
+                tiers[tier] = (label, with_resilience(create_provider(provider, model), label))
+        if RoutingTiers.COMPLEX not in tiers:
+            # the larger model defaults to the usual one (or the race, with RACE_PROVIDERS)
+            tiers[RoutingTiers.COMPLEX] = (default_backend_label(), get_default_provider())
+        return RoutingProvider(tiers)
+
+    return get_default_provider()
+
+
+def get_default_provider() -> InferenceProvider:
+    if config.race_providers:
+        # pylint: disable=import-outside-toplevel
+        from zev.llms.racing import RacingProvider
+
+        backends = [
+            (f"{provider}/{model}", with_resilience(create_provider(provider, model), f"{provider}/{model}"))
+            for provider, model in config.race_providers
+        ]
+        return RacingProvider(backends, hedge_delay=config.race_hedge_delay_seconds)
+
+    return with_resilience(create_provider(config.llm_provider), f"{config.llm_provider}/{config.llm_model}")
+
+
+def with_resilience(provider: InferenceProvider, label: str) -> InferenceProvider:
+    # the breaker is keyed on the label (provider and model), since one model can be down or retired while the
+    # provider's others are fine
+    # pylint: disable=import-outside-toplevel
+    from zev.llms.resilience import CircuitBreaker, ResilientProvider
+
+    return ResilientProvider(
+        provider,
+        label,
+        CircuitBreaker(config.circuit_breaker_threshold, config.circuit_breaker_cooldown),
+        deadline=config.request_deadline,
+        max_retries=config.max_retries,
+        base_delay=config.retry_base_delay,
+        max_delay=config.retry_max_delay,
+    )
+
+
+def create_provider(provider: str, model: Optional[str] = None) -> InferenceProvider:
+    # pylint: disable=import-outside-toplevel
+    from zev.llms.response_format import ResponseFormat
+
+    response_format = ResponseFormat(
+        compact=config.compact_schema,
+        # with the local danger check, the model isn't asked whether commands are dangerous (see zev.danger)
+        with_danger_fields=not config.local_danger_check,
+        max_options=config.max_options,
+    )
+    if provider == LLMProviders.OPENAI:
         # pylint: disable=import-outside-toplevel
         from zev.llms.openai.provider import OpenAIProvider
 
-        return OpenAIProvider()
-    elif config.llm_provider == LLMProviders.OLLAMA:
+        return OpenAIProvider(model=model, response_format=response_format)
+    elif provider == LLMProviders.OLLAMA:
         # pylint: disable=import-outside-toplevel
         from zev.llms.ollama.provider import OllamaProvider
 
-        return OllamaProvider()
-    elif config.llm_provider == LLMProviders.GEMINI:
+        return OllamaProvider(model=model, response_format=response_format)
+    elif provider == LLMProviders.GEMINI:
         # pylint: disable=import-outside-toplevel
         from zev.llms.gemini.provider import GeminiProvider
 
-        return GeminiProvider()
-    elif config.llm_provider == LLMProviders.AZURE_OPENAI:
+        return GeminiProvider(model=model, response_format=response_format)
+    elif provider == LLMProviders.AZURE_OPENAI:
         # pylint: disable=import-outside-toplevel
         from zev.llms.azure_openai.provider import AzureOpenAIProvider
 
-        return AzureOpenAIProvider()
+        return AzureOpenAIProvider(model=model, response_format=response_format)
     else:
-        raise ValueError(f"Invalid LLM provider: {config.llm_provider}")
+        raise ValueError(f"Invalid LLM provider: {provider}")
+
+
+def get_backend_description() -> tuple[str, Optional[str]]:
+    """The (provider, model) that answers queries, used to label the spinner and key the response cache."""
+    routes = config.routing_table
+    if RoutingTiers.SIMPLE in routes:
+        labels = {tier: f"{provider}/{model}" for tier, (provider, model) in routes.items()}
+        labels.setdefault(RoutingTiers.COMPLEX, default_backend_label())
+        return "route", ",".join(f"{tier}={labels[tier]}" for tier in (RoutingTiers.SIMPLE, RoutingTiers.COMPLEX))
+    if config.race_providers:
+        return "race", ",".join(f"{provider}/{model}" for provider, model in config.race_providers)
+    return config.llm_provider, config.llm_model
+
+
+def default_backend_label() -> str:
+    if config.race_providers:
+        return "race:" + ",".join(f"{provider}/{model}" for provider, model in config.race_providers)
+    return f"{config.llm_provider}/{config.llm_model}"
@@ -1,7 +1,10 @@
+from typing import Optional
+
 from openai import OpenAI
 
 from zev.config import config
-from zev.llms.openai.provider import OpenAIProvider
+from zev.llms.openai.provider import OpenAIProvider, client_options
+from zev.llms.response_format import ResponseFormat
 
 
 class OllamaProvider(OpenAIProvider):
@@ -9,12 +12,14 @@ class OllamaProvider(OpenAIProvider):
     Same as OpenAIProvider, but takes a different base url and model.
     """
 
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, response_format: Optional[ResponseFormat] = None):
         if not config.ollama_base_url:
             raise ValueError("OLLAMA_BASE_URL must be set. Try running `zev --setup`.")
-        if not config.ollama_model:
+        if not (model or config.ollama_model):
             raise ValueError("OLLAMA_MODEL must be set. Try running `zev --setup`.")
         # api_key is not used, but is still required by the OpenAI client
         # https://github.com/ollama/ollama/blob/5cfc1c39f3d5822b0c0906f863f6df45c141c33b/docs/openai.md?plain=1#L19
-        self.client = OpenAI(base_url=config.ollama_base_url, api_key="ollama")
-        self.model = config.ollama_model
+        self.client_kwargs = {"base_url": config.ollama_base_url, "api_key": "ollama", **client_options()}
+        self.client = OpenAI(**self.client_kwargs)
+        self.model = model or config.ollama_model
+        self.response_format = response_format or ResponseFormat()
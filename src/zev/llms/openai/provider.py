@@ -1,11 +1,44 @@
-from typing import Optional
+from functools import cached_property
+from typing import Callable, Optional
 
-from openai import AuthenticationError, OpenAI
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    AuthenticationError,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+    Timeout,
+)
 
 from zev.config import config
-from zev.constants import OPENAI_BASE_URL, OPENAI_DEFAULT_MODEL, PROMPT
+from zev.constants import OPENAI_DEFAULT_MODEL
 from zev.llms.inference_provider_base import InferenceProvider
-from zev.llms.types import OptionsResponse
+from zev.llms.resilience import RetryableError, attempt_timeout, parse_retry_after
+from zev.llms.response_format import ResponseFormat
+from zev.llms.stream_parser import CommandStreamParser
+from zev.llms.types import Command, OptionsResponse
+from zev.profiling import span
+from zev.reporting import report
+
+# rate limits, 5xx responses, timeouts and dropped connections
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+
+def client_options() -> dict:
+    # retries are handled by zev.llms.resilience for every provider, so the SDK's own are turned off
+    return {"timeout": Timeout(config.read_timeout, connect=config.connect_timeout), "max_retries": 0}
+
+
+def request_timeout() -> Timeout:
+    # the client's timeouts, or less once a retried request is close to its deadline
+    connect, read = attempt_timeout(config.connect_timeout, config.read_timeout)
+    return Timeout(read, connect=connect)
+
+
+def as_retryable(error: Exception) -> RetryableError:
+    response = getattr(error, "response", None)
+    return RetryableError(str(error), retry_after=parse_retry_after(response.headers if response is not None else None))
 
 
 class OpenAIProvider(InferenceProvider):
@@ -13,22 +46,85 @@ class OpenAIProvider(InferenceProvider):
         "Error: There was an error with your OpenAI API key. You can change it by running `zev --setup`."
     )
 
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, response_format: Optional[ResponseFormat] = None):
         if not config.openai_api_key:
             raise ValueError("OPENAI_API_KEY must be set. Try running `zev --setup`.")
 
-        self.client = OpenAI(base_url=OPENAI_BASE_URL, api_key=config.openai_api_key)
-        self.model = config.openai_model or OPENAI_DEFAULT_MODEL
+        self.client_kwargs = {"base_url": config.openai_base_url, "api_key": config.openai_api_key, **client_options()}
+        self.client = OpenAI(**self.client_kwargs)
+        self.model = model or config.openai_model or OPENAI_DEFAULT_MODEL
+        self.response_format = response_format or ResponseFormat()
+
+    @cached_property
+    def async_client(self) -> AsyncOpenAI:
+        # only built when aget_options is first used, since the CLI itself makes blocking calls
+        return AsyncOpenAI(**self.client_kwargs)
 
     def get_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
         try:
-            assembled_prompt = PROMPT.format(prompt=prompt, context=context)
-            response = self.client.beta.chat.completions.parse(
+            assembled_prompt = self.response_format.prompt(prompt, context)
+            # the SDK validates the response as part of the call, so "request" includes parsing it
+            with span("request"):
+                response = self.client.beta.chat.completions.parse(
+                    model=self.model,
+                    messages=[{"role": "user", "content": assembled_prompt}],
+                    response_format=self.response_format.model,
+                    timeout=request_timeout(),
+                )
+            return self.response_format.parse(response.choices[0].message.parsed)
+        except AuthenticationError:
+            report(self.AUTH_ERROR_MESSAGE)
+            return None
+        except RETRYABLE_ERRORS as e:
+            raise as_retryable(e) from e
+
+    def warm_up(self) -> None:
+        # the SDK's HTTP client has no way to just connect, so make the smallest authenticated request, which
+        # leaves a keep-alive connection in its pool for the query
+        self.client.models.retrieve(self.model)
+
+    async def awarm_up(self) -> None:
+        await self.async_client.models.retrieve(self.model)
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        try:
+            assembled_prompt = self.response_format.prompt(prompt, context)
+            response = await self.async_client.beta.chat.completions.parse(
                 model=self.model,
                 messages=[{"role": "user", "content": assembled_prompt}],
-                response_format=OptionsResponse,
+                response_format=self.response_format.model,
+                timeout=request_timeout(),
             )
-            return response.choices[0].message.parsed
+            return self.response_format.parse(response.choices[0].message.parsed)
+        except AuthenticationError:
+            report(self.AUTH_ERROR_MESSAGE)
+            return None
+        except RETRYABLE_ERRORS as e:
+            raise as_retryable(e) from e
+
+    def stream_options(
+        self, prompt: str, context: str, on_command: Callable[[Command], None]
+    ) -> Optional[OptionsResponse]:
+        try:
+            assembled_prompt = self.response_format.prompt(prompt, context)
+            parser = CommandStreamParser(array_key=self.response_format.array_key)
+            with (
+                span("request"),
+                self.client.beta.chat.completions.stream(
+                    model=self.model,
+                    messages=[{"role": "user", "content": assembled_prompt}],
+                    response_format=self.response_format.model,
+                    timeout=request_timeout(),
+                ) as stream,
+            ):
+                for event in stream:
+                    if event.type == "content.delta":
+                        for command in parser.feed(event.delta):
+                            on_command(self.response_format.parse_command(command))
+                completion = stream.get_final_completion()
+            return self.response_format.parse(completion.choices[0].message.parsed)
         except AuthenticationError:
-            print(self.AUTH_ERROR_MESSAGE)
+            report(self.AUTH_ERROR_MESSAGE)
             return None
+        except RETRYABLE_ERRORS as e:
+            raise as_retryable(e) from e
@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Optional
+
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import OptionsResponse
+from zev.reporting import report
+
+
+class _Race:
+    """The state of a single query's race, kept apart from the provider so races can run concurrently."""
+
+    def __init__(self, backends: list[tuple[str, InferenceProvider]], hedge_delay: float) -> None:
+        self.waiting = list(backends)
+        self.started_at = {}
+        # label -> seconds it took to answer, or None if it hadn't answered when the race was decided
+        self.timings = {label: None for label, _ in backends}
+        self.hedge_at = time.perf_counter() + hedge_delay
+        self.winner = None
+        self.finished = 0
+        self.fallbacks = []
+        self.errors = []
+
+    def next_timeout(self) -> Optional[float]:
+        return max(self.hedge_at - time.perf_counter(), 0) if self.waiting else None
+
+    def record(self, label: str, response: Optional[OptionsResponse], error: Optional[Exception]) -> bool:
+        """Records a backend's result, and returns whether it won the race."""
+        self.finished += 1
+        self.timings[label] = time.perf_counter() - self.started_at[label]
+        if response is not None and response.is_valid:
+            self.winner = label
+            return True
+        if error is not None:
+            self.errors.append(f"{label}: {error}")
+        elif response is not None:
+            self.fallbacks.append(response)
+        return False
+
+    def no_winner(self) -> Optional[OptionsResponse]:
+        for error in self.errors:
+            report(f"Error from {error}")
+        # e.g. every backend agreed the query isn't something a command can do
+        return self.fallbacks[0] if self.fallbacks else None
+
+    def print_summary(self) -> None:
+        others = []
+        for label, elapsed in self.timings.items():
+            if label == self.winner:
+                continue
+            if elapsed is not None:
+                others.append(f"{label}: {elapsed:.2f}s")
+            else:
+                others.append(f"{label}: {'cancelled' if label in self.started_at else 'not started'}")
+        summary = f"Fastest: {self.winner} in {self.timings[self.winner]:.2f}s"
+        report(f"{summary} ({', '.join(others)})" if others else summary)
+
+
+class RacingProvider(InferenceProvider):
+    """
+    Sends each query to several backends and returns the first valid response, so one slow region or
+    overloaded host doesn't set the latency. With a hedge delay, the first backend gets a head start and
+    the others are only queried if it hasn't answered by then (or as soon as it fails).
+
+    Races always run on the backends' async clients, so the backends still in flight when one wins are
+    cancelled, and neither report errors nor count towards the circuit breaker. The blocking methods run them
+    on an event loop the provider keeps in a background thread, whose connections carry over between queries.
+    """
+
+    def __init__(self, backends: list[tuple[str, InferenceProvider]], hedge_delay: float = 0) -> None:
+        self.backends = backends
+        self.hedge_delay = hedge_delay
+        self.model = ",".join(label for label, _ in backends)
+        self.last_timings = {}
+        self.last_winner = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def get_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        return self._run(self.aget_options(prompt, context))
+
+    def warm_up(self) -> None:
+        """Warms up every backend at once. Returns once they've all finished."""
+        self._run(self.awarm_up())
+
+    async def awarm_up(self) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        # one backend failing to connect shouldn't stop the others
+        await asyncio.gather(*(provider.awarm_up() for _, provider in self.backends), return_exceptions=True)
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        """Same race on the running event loop. Backends still in flight when one wins are cancelled."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        race = _Race(self.backends, self.hedge_delay)
+        pending = set()
+
+        async def run(label: str, provider: InferenceProvider) -> tuple:
+            try:
+                return label, await provider.aget_options(prompt, context), None
+            except Exception as e:
+                return label, None, e
+
+        def start_next() -> None:
+            label, provider = race.waiting.pop(0)
+            race.started_at[label] = time.perf_counter()
+            pending.add(asyncio.ensure_future(run(label, provider)))
+
+        start_next()
+        while race.waiting and self.hedge_delay <= 0:
+            start_next()
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=race.next_timeout(), return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                for task in done:
+                    result = task.result()
+                    if race.record(*result):
+                        return self._finish(race, result[1])
+                # either the hedge delay is up or a backend failed, so start the rest
+                while race.waiting:
+                    start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self._finish(race, race.no_winner())
+
+    def _run(self, coroutine):
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                # a daemon thread, so that it doesn't keep zev from exiting
+                threading.Thread(target=self._loop.run_forever, name="zev-race", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _finish(self, race: _Race, response: Optional[OptionsResponse]) -> Optional[OptionsResponse]:
+        self.last_timings = race.timings
+        self.last_winner = race.winner
+        if race.winner is not None:
+            race.print_summary()
+        return response
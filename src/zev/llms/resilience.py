@@ -0,0 +1,284 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from zev.constants import CIRCUIT_BREAKER_FILE_NAME
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import Command, OptionsResponse
+from zev.profiling import span
+from zev.reporting import report
+
+# the time.monotonic() at which the request being made in this context runs out of time, set by ResilientProvider
+# for each attempt (context variables follow asyncio tasks and to_thread, and each thread has its own)
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# a socket timeout of 0 would make it non-blocking rather than time out at once
+MIN_ATTEMPT_TIMEOUT = 0.001
+
+
+class RetryableError(Exception):
+    """
+    Raised by providers for failures worth retrying: rate limits (429), server errors (5xx), timeouts and
+    dropped connections. retry_after is the delay the server asked for, in seconds, if it sent one.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds to wait according to a response's Retry-After (or retry-after-ms) header, if any."""
+    if not headers:
+        return None
+    values = {name.lower(): value for name, value in headers.items()}
+    try:
+        if "retry-after-ms" in values:
+            return max(float(values["retry-after-ms"]) / 1000, 0)
+        if "retry-after" in values:
+            value = values["retry-after"]
+            if value.strip().isdigit():
+                return float(value)
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def attempt_timeout(connect_timeout: float, read_timeout: float) -> tuple[float, float]:
+    """
+    The (connect, read) timeouts for an HTTP call: the client's own, capped by the time left before the request
+    deadline when the call is part of an attempt made by ResilientProvider.
+    """
+    deadline_at = _request_deadline.get()
+    if deadline_at is None:
+        return connect_timeout, read_timeout
+    remaining = max(deadline_at - time.monotonic(), MIN_ATTEMPT_TIMEOUT)
+    return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failed queries per backend (provider and model) in a file, so that the state carries over
+    between runs of zev. Once a backend has failed `threshold` times in a row it is skipped until
+    `cooldown_seconds` have passed. Then a single query is let through to see if it has recovered, and the
+    others keep skipping it for another cooldown unless that query succeeds. (Within one process, that is; two
+    runs of zev starting a probe at the same moment may both get through.)
+    """
+
+    # all breakers share the file, so its read-modify-writes are serialized across them
+    _lock = threading.Lock()
+
+    def __init__(self, threshold: int, cooldown_seconds: float) -> None:
+        self.path = Path.home() / CIRCUIT_BREAKER_FILE_NAME
+        self.threshold = threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.encoding = "utf-8"
+
+    def retry_in(self, name: str) -> float:
+        """Seconds until the backend may be tried again, or 0 if it may be tried now."""
+        state = self._read().get(name)
+        if not state or state["failures"] < self.threshold:
+            return 0
+        return max(state["opened_at"] + self.cooldown_seconds - time.time(), 0)
+
+    def acquire(self, name: str) -> float:
+        """
+        Like retry_in, for a caller about to query the backend. When the cooldown is over, only the first caller
+        gets 0 (and makes the probe query); the circuit stays open for the rest until it's recorded.
+        """
+        with self._lock:
+            data = self._read()
+            state = data.get(name)
+            if not state or state["failures"] < self.threshold:
+                return 0
+            retry_in = state["opened_at"] + self.cooldown_seconds - time.time()
+            if retry_in > 0:
+                return retry_in
+            state["opened_at"] = time.time()
+            self._write(data)
+            return 0
+
+    def record_success(self, name: str) -> None:
+        with self._lock:
+            data = self._read()
+            if data.pop(name, None) is not None:
+                self._write(data)
+
+    def record_failure(self, name: str) -> None:
+        with self._lock:
+            data = self._read()
+            state = data.setdefault(name, {"failures": 0, "opened_at": None})
+            state["failures"] += 1
+            if state["failures"] >= self.threshold:
+                # (re)opened, including when the probe let through after the cooldown fails too
+                state["opened_at"] = time.time()
+            self._write(data)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding=self.encoding) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, data: dict) -> None:
+        # write to a temp file and rename, so a crash mid-write can't leave a truncated file behind
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.")
+        except OSError:
+            return  # e.g. a read-only home directory; the failures just aren't remembered
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return  # e.g. a full disk
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class ResilientProvider(InferenceProvider):
+    """
+    Wraps a provider with retries and a circuit breaker. Requests that fail with a RetryableError are retried
+    with jittered exponential backoff (or after the server's Retry-After), as long as the retry can start
+    before the deadline. Providers bound each HTTP call by attempt_timeout, so no connect or read waits past
+    the deadline either; aget_options also cancels an attempt that is still running when the deadline passes.
+    """
+
+    def __init__(
+        self,
+        provider: InferenceProvider,
+        name: str,
+        breaker: CircuitBreaker,
+        deadline: float,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+    ) -> None:
+        self.provider = provider
+        self.name = name
+        self.breaker = breaker
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.model = getattr(provider, "model", None)
+
+    def get_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        return self._call(lambda: self.provider.get_options(prompt, context))
+
+    def warm_up(self) -> None:
+        # a provider the breaker is skipping won't be asked, so don't bother connecting to it
+        if self.breaker.retry_in(self.name) <= 0:
+            self.provider.warm_up()
+
+    async def awarm_up(self) -> None:
+        if self.breaker.retry_in(self.name) <= 0:
+            await self.provider.awarm_up()
+
+    def stream_options(
+        self, prompt: str, context: str, on_command: Callable[[Command], None]
+    ) -> Optional[OptionsResponse]:
+        emitted = []
+
+        def emit(command: Command) -> None:
+            emitted.append(command)
+            on_command(command)
+
+        # once commands have been shown, a retry would show them again, so only retry before the first one
+        return self._call(lambda: self.provider.stream_options(prompt, context, emit), can_retry=lambda: not emitted)
+
+    def _call(self, attempt: Callable, can_retry: Callable[[], bool] = lambda: True) -> Optional[OptionsResponse]:
+        if not self._allowed():
+            return None
+
+        deadline_at = time.monotonic() + self.deadline
+        token = _request_deadline.set(deadline_at)
+        try:
+            return self._attempt_until(attempt, deadline_at, can_retry)
+        finally:
+            _request_deadline.reset(token)
+
+    def _attempt_until(self, attempt: Callable, deadline_at: float, can_retry: Callable[[], bool]):
+        retries = 0
+        while True:
+            try:
+                response = attempt()
+            except RetryableError as e:
+                delay = self._retry_delay(e, retries, deadline_at) if can_retry() else None
+                if delay is None:
+                    return self._give_up(e, retries)
+                retries += 1
+                with span("retry backoff"):
+                    time.sleep(delay)
+                continue
+            if response is not None:
+                self.breaker.record_success(self.name)
+            return response
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        if not self._allowed():
+            return None
+
+        deadline_at = time.monotonic() + self.deadline
+        token = _request_deadline.set(deadline_at)
+        try:
+            return await self._aattempt_until(prompt, context, deadline_at)
+        finally:
+            _request_deadline.reset(token)
+
+    async def _aattempt_until(self, prompt: str, context: str, deadline_at: float) -> Optional[OptionsResponse]:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        retries = 0
+        while True:
+            try:
+                remaining = max(deadline_at - time.monotonic(), 0)
+                response = await asyncio.wait_for(self.provider.aget_options(prompt, context), timeout=remaining)
+            except asyncio.TimeoutError:
+                return self._give_up(RetryableError(f"no response within {self.deadline:g}s"), retries)
+            except RetryableError as e:
+                delay = self._retry_delay(e, retries, deadline_at)
+                if delay is None:
+                    return self._give_up(e, retries)
+                retries += 1
+                await asyncio.sleep(delay)
+                continue
+            if response is not None:
+                self.breaker.record_success(self.name)
+            return response
+
+    def _allowed(self) -> bool:
+        retry_in = self.breaker.acquire(self.name)
+        if retry_in > 0:
+            report(f"Skipping {self.name}: it failed repeatedly, so it won't be retried for another {retry_in:.0f}s.")
+            return False
+        return True
+
+    def _retry_delay(self, error: RetryableError, retries: int, deadline_at: float) -> Optional[float]:
+        """How long to wait before the next attempt, or None if there shouldn't be one."""
+        if retries >= self.max_retries:
+            return None
+        if error.retry_after is not None:
+            delay = error.retry_after
+        else:
+            # "full jitter", so that many clients backing off at once don't retry in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**retries))
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        return delay
+
+    def _give_up(self, error: RetryableError, retries: int) -> None:
+        self.breaker.record_failure(self.name)
+        attempts = f" after {retries + 1} attempts" if retries else ""
+        report(f"Error: {self.name} is unavailable{attempts}: {error}")
+        return None
@@ -0,0 +1,164 @@
+import textwrap
+from functools import cached_property
+from typing import Optional, Union
+
+from pydantic import BaseModel, create_model
+
+from zev.constants import (
+    COMPACT_MAX_EXPLANATION_CHARS,
+    COMPACT_PROMPT,
+    COMPACT_PROMPT_WITHOUT_DANGER,
+    DEFAULT_MAX_OPTIONS,
+    PROMPT,
+    PROMPT_WITHOUT_DANGER,
+)
+from zev.llms.types import Command, OptionsResponse
+
+# The JSON the model is asked for, keyed by the OptionsResponse and Command field each key maps to. The compact
+# keys save output tokens, since the model writes them out for every command (and output tokens are the slow,
+# expensive ones).
+FULL_KEYS = {
+    "commands": "commands",
+    "is_valid": "is_valid",
+    "explanation_if_not_valid": "explanation_if_not_valid",
+    "command": "command",
+    "short_explanation": "short_explanation",
+    "is_dangerous": "is_dangerous",
+    "dangerous_explanation": "dangerous_explanation",
+}
+COMPACT_KEYS = {
+    "commands": "o",
+    "is_valid": "ok",
+    "explanation_if_not_valid": "why",
+    "command": "c",
+    "short_explanation": "e",
+    "is_dangerous": "d",
+    "dangerous_explanation": "w",
+}
+
+RESPONSE_FIELDS = {"is_valid": bool, "explanation_if_not_valid": Optional[str]}
+COMMAND_FIELDS = {
+    "command": str,
+    "short_explanation": str,
+    "is_dangerous": bool,
+    "dangerous_explanation": Optional[str],
+}
+# left out with LOCAL_DANGER_CHECK=true, where zev.danger fills them in instead
+DANGER_FIELDS = ("is_dangerous", "dangerous_explanation")
+
+GEMINI_TYPES = {str: "STRING", bool: "BOOLEAN", Optional[str]: "STRING"}
+
+
+class ResponseFormat:
+    """
+    The prompt and JSON schema a query is sent with, and how the model's answer maps back to an
+    OptionsResponse. The default is the full format, whose keys are OptionsResponse's own field names.
+
+    The compact format also caps the number of options and the length of explanations. OpenAI's strict
+    structured outputs don't support maxItems or maxLength, so the caps are asked for in the prompt (and in
+    Gemini's schema, which supports maxItems) and enforced when the answer is mapped back.
+    """
+
+    def __init__(
+        self,
+        compact: bool = False,
+        with_danger_fields: bool = True,
+        max_options: int = DEFAULT_MAX_OPTIONS,
+        max_explanation_chars: int = COMPACT_MAX_EXPLANATION_CHARS,
+    ) -> None:
+        self.compact = compact
+        self.with_danger_fields = with_danger_fields
+        self.max_options = max_options
+        self.max_explanation_chars = max_explanation_chars
+        self.keys = COMPACT_KEYS if compact else FULL_KEYS
+        self.command_fields = {
+            field: kind for field, kind in COMMAND_FIELDS.items() if with_danger_fields or field not in DANGER_FIELDS
+        }
+
+    @property
+    def array_key(self) -> str:
+        """The key of the list of commands, for CommandStreamParser."""
+        return self.keys["commands"]
+
+    def prompt(self, prompt: str, context: str) -> str:
+        if self.compact:
+            template = COMPACT_PROMPT if self.with_danger_fields else COMPACT_PROMPT_WITHOUT_DANGER
+        else:
+            template = PROMPT if self.with_danger_fields else PROMPT_WITHOUT_DANGER
+        return template.format(
+            prompt=prompt,
+            context=context,
+            max_options=self.max_options,
+            max_explanation_chars=self.max_explanation_chars,
+        )
+
+    @cached_property
+    def model(self) -> type[BaseModel]:
+        """A pydantic model of the JSON, which the OpenAI SDK turns into a strict JSON schema."""
+        if not self.compact and self.with_danger_fields:
+            return OptionsResponse
+        name = ("Compact" if self.compact else "") + "Options" + ("" if self.with_danger_fields else "WithoutDanger")
+        command = create_model(
+            name + "Command", **{self.keys[field]: _model_field(kind) for field, kind in self.command_fields.items()}
+        )
+        fields = {self.keys["commands"]: (list[command], ...)}
+        fields.update({self.keys[field]: _model_field(kind) for field, kind in RESPONSE_FIELDS.items()})
+        return create_model(name, **fields)
+
+    def gemini_schema(self) -> dict:
+        """The generationConfig that asks Gemini for the JSON."""
+        commands = {"type": "ARRAY", "items": _gemini_object(self.command_fields, self.keys)}
+        if self.compact:
+            commands["maxItems"] = self.max_options
+        schema = _gemini_object(RESPONSE_FIELDS, self.keys)
+        schema["properties"] = {self.keys["commands"]: commands, **schema["properties"]}
+        schema["required"].insert(0, self.keys["commands"])
+        return {"response_mime_type": "application/json", "response_schema": schema}
+
+    def parse(self, data: Union[dict, BaseModel, None]) -> Optional[OptionsResponse]:
+        """The OptionsResponse for the model's answer, as parsed JSON or an instance of `model`."""
+        if data is None:
+            return None  # the OpenAI SDK's parsed answer when the model refuses
+        if isinstance(data, BaseModel):
+            data = data.model_dump()
+        commands = [self.parse_command(command) for command in data.get(self.keys["commands"]) or []]
+        return OptionsResponse(
+            commands=commands[: self.max_options],
+            is_valid=data[self.keys["is_valid"]],
+            explanation_if_not_valid=data.get(self.keys["explanation_if_not_valid"]),
+        )
+
+    def parse_command(self, data: dict) -> Command:
+        explanation = data[self.keys["short_explanation"]]
+        if self.compact:
+            explanation = textwrap.shorten(explanation, self.max_explanation_chars, placeholder="…")
+        return Command(
+            command=data[self.keys["command"]],
+            short_explanation=explanation,
+            # the danger fields are left out with LOCAL_DANGER_CHECK=true, and zev.danger fills them in
+            is_dangerous=data.get(self.keys["is_dangerous"], False),
+            dangerous_explanation=data.get(self.keys["dangerous_explanation"]),
+        )
+
+    def encode(self, response: dict) -> dict:
+        """The JSON for an OptionsResponse-shaped dict, as the model would write it, e.g. for zev.mock_server."""
+        commands = [
+            {self.keys[field]: command.get(field) for field in self.command_fields}
+            for command in response.get("commands") or []
+        ]
+        encoded = {self.keys["commands"]: commands}
+        encoded.update({self.keys[field]: response.get(field) for field in RESPONSE_FIELDS})
+        return encoded
+
+
+def _model_field(kind) -> tuple:
+    # Optional fields default to None, as in OptionsResponse
+    return (kind, None) if kind == Optional[str] else (kind, ...)
+
+
+def _gemini_object(fields: dict, keys: dict) -> dict:
+    return {
+        "type": "OBJECT",
+        "properties": {keys[field]: {"type": GEMINI_TYPES[kind]} for field, kind in fields.items()},
+        "required": [keys[field] for field, kind in fields.items() if kind != Optional[str]],
+    }
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable, Generator, Optional
+
+from zev.constants import ROUTING_LOG_FILE_NAME, ROUTING_LOG_MAX_BYTES, RoutingTiers
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import Command, OptionsResponse
+
+# A query scoring at least this much goes to the complex tier: any one strong feature (a pipe, a tool like awk,
+# a long query) is enough, while most lookups ("list files by size") score 0.
+COMPLEX_SCORE = 2
+# words, beyond which a query earns a point (or two, past LONG_QUERY_WORDS)
+MEDIUM_QUERY_WORDS = 7
+LONG_QUERY_WORDS = 12
+
+# pipes, chained commands and language that describes several steps or conditions
+MULTI_STEP = re.compile(
+    r"\|"
+    r"|&&|;"
+    r"|\b(?:then|afterwards|followed by|each|every|for all|while|until|unless|only if|otherwise|loop|script"
+    r"|recursively|in parallel)\b"
+)
+CONJUNCTIONS = frozenset(("and", "or", "but"))
+NEGATIONS = frozenset(("not", "without", "except", "excluding", "ignoring", "don't", "dont"))
+# tools whose syntax small models tend to get wrong
+COMPLEX_TOOLS = frozenset(
+    (
+        "awk sed jq yq xargs ffmpeg imagemagick openssl iptables nft kubectl helm terraform ansible rsync "
+        "crontab systemd systemctl regex regexp gpg strace tcpdump"
+    ).split()
+)
+TOKEN = re.compile(r"[a-z0-9][\w'+-]*")
+
+
+def classify_query(query: str) -> tuple[str, list[str]]:
+    """The tier a query should go to, and the features that added up to it (for the routing log)."""
+    text = query.lower()
+    words = TOKEN.findall(text)
+    features = []
+    score = 0
+    if len(words) > LONG_QUERY_WORDS:
+        score += 2
+        features.append("long")
+    elif len(words) > MEDIUM_QUERY_WORDS:
+        score += 1
+        features.append("medium length")
+        if CONJUNCTIONS.intersection(words):
+            # "find python files and compress them": two things to do in one query
+            score += 1
+            features.append("conjunction")
+    steps = sorted({match.strip() for match in MULTI_STEP.findall(text)})
+    if steps:
+        score += 2 * len(steps)
+        features.append(f"multi-step: {', '.join(steps)}")
+    tools = sorted(COMPLEX_TOOLS.intersection(words))
+    if tools:
+        score += 2
+        features.append(f"tools: {', '.join(tools)}")
+    if NEGATIONS.intersection(words):
+        score += 1
+        features.append("negation")
+    return (RoutingTiers.COMPLEX if score >= COMPLEX_SCORE else RoutingTiers.SIMPLE), features
+
+
+def needs_escalation(response: Optional[OptionsResponse]) -> bool:
+    # no answer (an error, already reported), "not a valid query" or no commands: the larger model may do better
+    return response is None or not response.is_valid or not response.commands
+
+
+def get_log_path() -> Path:
+    return Path.home() / ROUTING_LOG_FILE_NAME
+
+
+class RoutingProvider(InferenceProvider):
+    """
+    Sends simple queries to a fast, small model and everything else to a larger one, going by cheap features
+    of the query (see classify_query). A query the fast tier can't answer is sent on to the larger one. The
+    tier that served each query is appended to ~/.zevrouting, which only the user can read, since it holds
+    their queries, and which is rotated once it reaches ROUTING_LOG_MAX_BYTES.
+    """
+
+    def __init__(self, tiers: dict[str, tuple[str, InferenceProvider]]) -> None:
+        # tier -> (label, provider), with a provider for both RoutingTiers
+        self.tiers = tiers
+        self.model = ",".join(f"{tier}={label}" for tier, (label, _) in tiers.items())
+        self.last_route = None
+
+    def get_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        return self._route(prompt, lambda provider: provider.get_options(prompt, context))
+
+    def stream_options(
+        self, prompt: str, context: str, on_command: Callable[[Command], None]
+    ) -> Optional[OptionsResponse]:
+        # a response that needs escalating has no commands, so nothing has been streamed from it
+        return self._route(prompt, lambda provider: provider.stream_options(prompt, context, on_command))
+
+    async def aget_options(self, prompt: str, context: str) -> Optional[OptionsResponse]:
+        steps = self._steps(prompt)
+        provider = next(steps)
+        while True:
+            response = await provider.aget_options(prompt, context)
+            try:
+                provider = steps.send(response)
+            except StopIteration as done:
+                return done.value
+
+    def warm_up(self) -> None:
+        # the query isn't known yet, so connect to the tier most queries go to
+        self.tiers[RoutingTiers.SIMPLE][1].warm_up()
+
+    async def awarm_up(self) -> None:
+        await self.tiers[RoutingTiers.SIMPLE][1].awarm_up()
+
+    def _route(self, prompt: str, ask: Callable[[InferenceProvider], Optional[OptionsResponse]]):
+        steps = self._steps(prompt)
+        provider = next(steps)
+        while True:
+            try:
+                provider = steps.send(ask(provider))
+            except StopIteration as done:
+                return done.value
+
+    def _steps(self, prompt: str) -> Generator[InferenceProvider, Optional[OptionsResponse], Optional[OptionsResponse]]:
+        # the routing itself, shared by the blocking and async methods: yields each provider to ask, is sent its
+        # response, and returns the one to use
+        tier, features = classify_query(prompt)
+        response, escalated = None, False
+        if tier == RoutingTiers.SIMPLE:
+            response = yield self.tiers[RoutingTiers.SIMPLE][1]
+            escalated = needs_escalation(response)
+        if tier == RoutingTiers.COMPLEX or escalated:
+            response = yield self.tiers[RoutingTiers.COMPLEX][1]
+        self._log(prompt, tier, features, escalated)
+        return response
+
+    def _log(self, prompt: str, tier: str, features: list[str], escalated: bool) -> None:
+        served = RoutingTiers.COMPLEX if escalated else tier
+        self.last_route = {
+            "time": time.time(),
+            "query": prompt,
+            "tier": served,
+            "model": self.tiers[served][0],
+            "classified": tier,
+            "features": features,
+            "escalated": escalated,
+        }
+        path = get_log_path()
+        try:
+            if path.exists() and path.stat().st_size >= ROUTING_LOG_MAX_BYTES:
+                os.replace(path, path.with_name(path.name + ".1"))
+            with open(os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.last_route) + "\n")
+        except OSError:
+            pass  # e.g. a read-only home directory; the log is only for tuning the table
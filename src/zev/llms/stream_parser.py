@@ -0,0 +1,61 @@
+import json
+
+
+class CommandStreamParser:
+    """
+    Incremental parser for a streamed OptionsResponse JSON document. Text can be fed in arbitrary chunks,
+    and each object in the top-level `commands` array is returned as soon as its closing brace arrives.
+    """
+
+    def __init__(self, array_key: str = "commands") -> None:
+        self.array_key = array_key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_key = None
+        self._in_commands = False
+        self._object_start = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        self.text += chunk
+        completed = []
+
+        while self._pos < len(self.text):
+            char = self.text[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        # strings at the top level are either keys or scalar values; only keys precede `[`
+                        self._last_key = json.loads(self.text[self._string_start : self._pos + 1])
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._last_key == self.array_key:
+                    self._in_commands = True
+                elif char == "{" and self._depth == 3 and self._in_commands:
+                    self._object_start = self._pos
+            elif char in "}]":
+                if char == "}" and self._depth == 3 and self._object_start is not None:
+                    completed.append(json.loads(self.text[self._object_start : self._pos + 1]))
+                    self._object_start = None
+                elif char == "]" and self._depth == 2:
+                    self._in_commands = False
+                self._depth -= 1
+
+            self._pos += 1
+
+        return completed
+
+    def result(self) -> dict:
+        return json.loads(self.text)
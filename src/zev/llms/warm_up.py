@@ -0,0 +1,45 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from zev.llms.inference_provider_base import InferenceProvider
+
+
+class ProviderWarmUp:
+    """
+    Builds the inference provider and connects to it in a background thread, e.g. while the user is typing a
+    query, so that sending it doesn't have to wait for the client's imports and setup or for the TCP and TLS
+    handshakes. Everything, including the imports, happens in the thread, so starting it costs nothing.
+    """
+
+    def __init__(self) -> None:
+        self._provider = None
+        self._built = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zev-warm-up", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from zev import daemon
+
+        try:
+            if daemon.is_daemon_running(daemon.get_socket_path()):
+                return  # queries go to the daemon, whose connections are already warm
+
+            from zev.llms.llm import get_inference_provider
+
+            self._provider = get_inference_provider()
+        except Exception:
+            return  # e.g. a missing API key, which is reported when the query is sent
+        finally:
+            self._built.set()
+
+        try:
+            self._provider.warm_up()
+        except Exception:
+            pass  # e.g. no network; the query will fail the same way and report it
+
+    def provider(self) -> Optional["InferenceProvider"]:
+        """The provider, once it's built (without waiting for the connection). None if it couldn't be."""
+        self._built.wait()
+        return self._provider
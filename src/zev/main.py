@@ -1,35 +1,130 @@
 import sys
 from pathlib import Path
 
-import dotenv
-from rich import print as rprint
-from rich.console import Console
-
-from zev.command_history import CommandHistory
-from zev.command_selector import show_options
+from zev import profiling
 from zev.config import config
-from zev.config.setup import run_setup
 from zev.constants import CONFIG_FILE_NAME
-from zev.llms.llm import get_inference_provider
-from zev.utils import get_env_context, get_input_string, show_help
+from zev.profiling import span
+from zev.utils import get_input_string, show_help
+
+# Heavy dependencies (rich, questionary, pydantic, openai, dotenv) are imported inside the functions that
+# need them, so that trivial entry paths like `zev --version` don't pay for them at startup.
+
+command_history = None
+
+
+def get_command_history():
+    global command_history
+    if command_history is None:
+        # pylint: disable=import-outside-toplevel
+        from zev.command_history import create_command_history
+
+        command_history = create_command_history()
+    return command_history
+
+
+def load_config_into_environ():
+    # from the config already loaded, rather than parsing .zevrc a second time
+    config.export_to_environ()
+
+
+def start_daemon():
+    # pylint: disable=import-outside-toplevel
+    from zev.daemon import run_daemon
+
+    load_config_into_environ()
+    run_daemon()
+
+
+def start_batch(args):
+    # pylint: disable=import-outside-toplevel
+    from zev.batch import run_batch
+
+    source, concurrency, output_path = "-", config.batch_concurrency, None
+    options = list(args)
+    while options:
+        option = options.pop(0)
+        if option in ("--concurrency", "--output") and not options:
+            print(f"Missing value for {option}")
+            return
+        if option == "--concurrency":
+            value = options.pop(0)
+            if not value.isdigit() or int(value) < 1:
+                print(f"Invalid concurrency: {value}")
+                return
+            concurrency = int(value)
+        elif option == "--output":
+            output_path = options.pop(0)
+        else:
+            source = option
+
+    if source != "-" and not Path(source).is_file():
+        print(f"Batch file not found: {source}")
+        return
 
-command_history = CommandHistory()
+    load_config_into_environ()
+    run_batch(source, concurrency, output_path)
 
 
 def setup():
+    # pylint: disable=import-outside-toplevel
+    from zev.config.setup import run_setup
+
     run_setup()
 
 
-def get_options(words: str):
-    context = get_env_context()
+def get_options(words: str, use_cache: bool = True, prefetched=None, warm_up=None):
+    from zev import env_context  # pylint: disable=import-outside-toplevel
+
+    # probed in the background while the heavy imports below run
+    probes = env_context.start_probes()
+    with span("imports"):
+        # pylint: disable=import-outside-toplevel
+        from rich import print as rprint
+        from rich.console import Console
+
+        from zev.command_selector import show_options
+        from zev.danger import check_response
+        from zev.knowledge import answer_locally
+        from zev.llms.llm import get_backend_description
+        from zev.response_cache import ResponseCache, make_cache_key
+
+    with span("env context"):
+        context = env_context.get_env_context(probes)
+    provider_name, model = get_backend_description()
+    use_cache = use_cache and config.cache_ttl_seconds > 0
+    cache = ResponseCache(config.cache_ttl_seconds, config.cache_max_entries) if use_cache else None
+    cache_key = make_cache_key(words, env_context.static_part(context), provider_name, model)
+    if provider_name == "route":
+        backend = "routed by complexity"
+    elif provider_name == "race":
+        backend = f"racing {model}"
+    else:
+        backend = f"using {provider_name} backend"
     console = Console()
     rprint(f"")
-    with console.status(
-        f"[bold blue]Thinking... [grey39](running query using {config.llm_provider} backend)", spinner="dots"
-    ):
-        inference_provider = get_inference_provider()
-        response = inference_provider.get_options(prompt=words, context=context)
-        command_history.save_options(words, response)
+    with console.status(f"[bold blue]Thinking... [grey39](running query {backend})", spinner="dots"):
+        with span("cache lookup"):
+            response = cache.get(cache_key) if cache else None
+        if response is None and config.local_answers:
+            with span("local answer"):
+                response = check_response(answer_locally(words, config.local_answer_min_confidence))
+        if response is None:
+            if prefetched is not None:
+                # sent while the query was being typed, see run_no_prompt
+                with span("prefetch wait"):
+                    response = prefetched.result()
+            if response is None:
+                on_command = (lambda cmd: print_streamed_command(console, cmd)) if config.stream_responses else None
+                response = fetch_options(words, context, on_command, warm_up)
+            # marks the commands zev.danger considers dangerous; cached responses were marked before being cached
+            response = check_response(response)
+            if cache and response is not None and response.is_valid:
+                with span("cache write"):
+                    cache.set(cache_key, response)
+        if response is not None:
+            with span("history write"):
+                get_command_history().save_options(words, response)
 
     if response is None:
         return
@@ -42,14 +137,125 @@ def get_options(words: str):
         print("No commands available")
         return
 
-    show_options(response.commands)
+    from zev.path_index import flag_missing_tools  # pylint: disable=import-outside-toplevel
+
+    show_options(flag_missing_tools(response.commands))
+
+
+def fetch_options(words: str, context: str, on_command=None, warm_up=None):
+    # pylint: disable=import-outside-toplevel
+    from zev import daemon
+    from zev.llms.llm import get_inference_provider
+
+    try:
+        with span("daemon request"):
+            return daemon.request_options(words, context, on_command)
+    except daemon.DaemonUnavailable:
+        pass  # no daemon running, so run the query in this process
+
+    with span("client setup"):
+        # built in the background while the query was typed, if run_no_prompt started a warm-up
+        inference_provider = (warm_up and warm_up.provider()) or get_inference_provider()
+    if on_command:
+        return inference_provider.stream_options(prompt=words, context=context, on_command=on_command)
+    return inference_provider.get_options(prompt=words, context=context)
+
+
+def print_streamed_command(console, command):
+    # printed above the spinner as each command arrives, before the selection menu is ready
+    from rich.markup import escape  # pylint: disable=import-outside-toplevel
+
+    console.print(
+        f"[cyan]›[/cyan] {escape(command.command)} [grey39]{escape(command.short_explanation)}", highlight=False
+    )
+
+
+async def speculative_fetch(words: str, warm_up=None):
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    from zev import env_context
+    from zev.llms.llm import get_inference_provider
 
+    # always in-process, since a request to the daemon couldn't be cancelled once it's superseded
+    context = await asyncio.to_thread(env_context.get_env_context)
+    provider = await asyncio.to_thread(lambda: (warm_up and warm_up.provider()) or get_inference_provider())
+    return await provider.aget_options(prompt=words, context=context)
 
-def run_no_prompt():
-    input = get_input_string("input", "Describe what you want to do:", required=False, help_text="(-h for help)")
+
+def run_no_prompt(use_cache: bool = True):
+    # pylint: disable=import-outside-toplevel
+    from zev.llms.warm_up import ProviderWarmUp
+
+    # connect to the provider while the user types, rather than after they press Enter
+    warm_up = ProviderWarmUp()
+    prefetcher = None
+    if config.speculative_prefetch:
+        from zev.prefetch import Prefetcher
+
+        prefetcher = Prefetcher(lambda words: speculative_fetch(words, warm_up), config.prefetch_debounce_seconds)
+    try:
+        input = get_input_string(
+            "input",
+            "Describe what you want to do:",
+            required=False,
+            help_text="(-h for help)",
+            on_change=prefetcher.update if prefetcher else None,
+        )
+    except BaseException:
+        if prefetcher:
+            prefetcher.close()
+        raise
+    prefetched = prefetcher.take(input) if prefetcher else None
     if handle_special_case(input):
         return
-    get_options(input)
+    get_options(input, use_cache=use_cache, prefetched=prefetched, warm_up=warm_up)
+
+
+def show_cache_stats():
+    # pylint: disable=import-outside-toplevel
+    from zev.response_cache import ResponseCache
+
+    stats = ResponseCache(config.cache_ttl_seconds, config.cache_max_entries).stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    print(f"Cache entries: {stats['entries']}")
+    print(f"Hits: {stats['hits']}, misses: {stats['misses']} (hit rate: {hit_rate})")
+
+
+def build_local_index():
+    from zev.knowledge import build_index  # pylint: disable=import-outside-toplevel
+
+    build_index()
+
+
+def show_profile_stats():
+    summary = profiling.summarize_log()
+    if not summary:
+        print(f"No profiled runs yet. Run a query with --profile, or set PROFILE_LOG=true in {CONFIG_FILE_NAME}.")
+        return
+    print(f"{'Phase':<24} {'runs':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, (runs, p50, p95) in summary.items():
+        print(f"{name:<24} {runs:>6} {p50:>9.1f} {p95:>9.1f}")
+
+
+def finish_profile(show_report: bool):
+    if config.profile_log:
+        profiling.append_to_log()
+    if show_report:
+        print("")
+        print(profiling.format_report())
+
+
+def check_config():
+    try:
+        config.settings
+    except ValueError as e:
+        # e.g. READ_TIMEOUT=soon, reported with the key and value rather than as a traceback
+        print(e)
+        print("You can fix it by editing the file or running `zev --setup`.")
+        return False
+    return True
 
 
 def handle_special_case(args):
@@ -59,7 +265,14 @@ def handle_special_case(args):
     if isinstance(args, str):
         args = args.split()
 
+    if args[0].lower() == "--batch":
+        start_batch(args[1:])
+        return True
+
     if len(args) > 1:
+        if args[0].lower() in ("--recent", "-r"):
+            get_command_history().show_history(search_terms=" ".join(args[1:]))
+            return True
         return False
 
     command = args[0].lower()
@@ -73,39 +286,71 @@ def handle_special_case(args):
         return True
 
     if command == "--recent" or command == "-r":
-        command_history.show_history()
+        get_command_history().show_history()
         return True
 
     if command == "--help" or command == "-h":
         show_help()
         return True
 
+    if command == "--daemon":
+        start_daemon()
+        return True
+
+    if command == "--cache-stats":
+        show_cache_stats()
+        return True
+
+    if command == "--profile-stats":
+        show_profile_stats()
+        return True
+
+    if command == "--build-index":
+        build_local_index()
+        return True
+
     return False
 
 
 def app():
+    profiling.mark_ready()
     # check if .zevrc exists or if setting up again
-    config_path = Path.home() / CONFIG_FILE_NAME
+    config_path = config.config_path
     args = [arg.strip() for arg in sys.argv[1:]]
+    use_cache = "--no-cache" not in args
+    show_profile = "--profile" in args
+    args = [arg for arg in args if arg not in ("--no-cache", "--profile")]
 
     if not config_path.exists():
-        run_setup()
+        setup()
         print("Setup complete...\n")
         if len(args) == 1 and args[0] == "--setup":
             return
 
+    # --setup has to work with a broken .zevrc, and --version and --help don't read it
+    needs_config = not (len(args) == 1 and args[0].lower() in ("--setup", "-s", "--version", "-v", "--help", "-h"))
+    if needs_config and not check_config():
+        return
+
     if handle_special_case(args):
         return
 
-    dotenv.load_dotenv(config_path, override=True)
+    if show_profile:
+        profiling.enable()
+    with span("config"):
+        load_config_into_environ()
+        if config.profile_log:
+            profiling.enable()
 
     if not args:
-        run_no_prompt()
-        return
-
-    # Strip any trailing question marks from the input
-    query = " ".join(args).rstrip("?")
-    get_options(query)
+        run_no_prompt(use_cache=use_cache)
+    else:
+        # Strip any trailing question marks from the input
+        query = " ".join(args).rstrip("?")
+        get_options(query, use_cache=use_cache)
+
+    if profiling.is_enabled():
+        finish_profile(show_profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,367 @@
+"""
+A local stand-in for the OpenAI and Gemini APIs, for running zev (or its benchmarks) offline.
+
+    python -m zev.mock_server --port 8765 --latency 150-400 --rate-429 0.05
+
+then point zev at it, e.g. with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 (also used for Ollama) or
+GEMINI_BASE_URL=http://127.0.0.1:8765. It serves chat completions (plain, structured output and streamed)
+and Gemini generateContent / streamGenerateContent, answering in the response format (see
+zev.llms.response_format) the request's schema asks for, and can add latency, rate limits, server errors,
+slow streams and generation time per output token.
+"""
+
+import argparse
+import json
+import random
+import re
+import shlex
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from zev.llms.response_format import COMPACT_KEYS, FULL_KEYS, ResponseFormat
+
+OPENAI_MODEL_PATH = re.compile(r"/models/(?P<model>[^/]+)$")
+GEMINI_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+# the usual rule of thumb for English text and JSON, used to estimate output tokens
+CHARS_PER_TOKEN = 4
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Returns a function giving a latency in seconds from a spec in milliseconds: `200` (fixed), `100-300`
+    (uniform), `normal:200:50` (mean and standard deviation) or `lognormal:200:0.5` (median and sigma, for
+    the long tail real APIs have).
+    """
+    kind, _, params = spec.partition(":")
+    if kind == "normal":
+        mean, stddev = (float(p) for p in params.split(":"))
+        return lambda: max(random.gauss(mean, stddev), 0) / 1000
+    if kind == "lognormal":
+        median, sigma = (float(p) for p in params.split(":"))
+        return lambda: random.lognormvariate(0, sigma) * median / 1000
+    if "-" in spec:
+        low, high = (float(p) for p in spec.split("-"))
+        return lambda: random.uniform(low, high) / 1000
+    fixed = float(spec)
+    return lambda: fixed / 1000
+
+
+def load_cassette(path: Path) -> list[tuple[str, dict]]:
+    """
+    (query, response) pairs from a JSONL file of {"query": ..., "response": {...}} records, which is also the
+    format of `zev --batch --output`, so a batch run against a real provider can be replayed.
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("response"):
+                    entries.append((record["query"], record["response"]))
+    # longest first, so "list files by size" wins over "list files"
+    return sorted(entries, key=lambda entry: len(entry[0]), reverse=True)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(round(len(text) / CHARS_PER_TOKEN), 1)
+
+
+def requested_format(schema: Optional[dict]) -> ResponseFormat:
+    """The response format a request's JSON schema asks for: full or compact, with or without the danger fields."""
+    properties = (schema or {}).get("properties", {})
+    keys = COMPACT_KEYS if COMPACT_KEYS["commands"] in properties else FULL_KEYS
+    command = properties.get(keys["commands"], {}).get("items", {})
+    if "$ref" in command:
+        # OpenAI's schemas come from pydantic models, which put nested models in $defs
+        command = schema.get("$defs", {}).get(command["$ref"].rsplit("/", 1)[-1], {})
+    with_danger_fields = not command or keys["is_dangerous"] in command.get("properties", {})
+    return ResponseFormat(compact=keys is COMPACT_KEYS, with_danger_fields=with_danger_fields)
+
+
+def default_response(query: str) -> dict:
+    return {
+        "commands": [
+            {
+                "command": f"echo {shlex.quote(query)}",
+                "short_explanation": "Mock response",
+                "is_dangerous": False,
+                "dangerous_explanation": None,
+            }
+        ],
+        "is_valid": True,
+        "explanation_if_not_valid": None,
+    }
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "0",
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: Optional[float] = 1,
+        stream_chunk_size: int = 16,
+        stream_chunk_delay_ms: float = 0,
+        token_latency_ms: float = 0,
+        cassette: Optional[list] = None,
+    ) -> None:
+        super().__init__((host, port), MockLLMHandler)
+        self.latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.stream_chunk_size = stream_chunk_size
+        self.stream_chunk_delay = stream_chunk_delay_ms / 1000
+        # time to generate each output token, so that latency grows with the length of the response
+        self.token_latency = token_latency_ms / 1000
+        self.cassette = cassette or []
+        self.stats = {"requests": 0, "429": 0, "5xx": 0, "completion_tokens": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        """Serves in a background thread, e.g. from tests or benchmarks."""
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def pick_failure(self) -> Optional[int]:
+        roll = random.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_5xx:
+            return 503
+        return None
+
+    def response_for(self, prompt: str) -> dict:
+        # zev's prompt ends with the user's query; the rest (instructions, INSTALLED TOOLS, ...) would match
+        # short cassette queries like "git" for every prompt
+        lines = [line for line in prompt.strip().splitlines() if line.strip()]
+        user_query = lines[-1].strip() if lines else ""
+        for query, response in self.cassette:
+            if query in user_query:
+                return response
+        return default_response(user_query)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: MockLLMServer
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        model_match = OPENAI_MODEL_PATH.search(path)
+        if path == "/_stats":
+            self._send_json(200, self.server.stats)
+        elif model_match:
+            # what OpenAIProvider.warm_up asks for
+            self._send_json(200, {"id": model_match["model"], "object": "model", "created": 0, "owned_by": "zev"})
+        else:
+            self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        path = urlsplit(self.path).path
+        self.server.count("requests")
+
+        gemini_match = GEMINI_PATH.match(path)
+        if path.endswith("/chat/completions"):
+            api = "openai"
+        elif gemini_match:
+            api = "gemini"
+        else:
+            self._send_json(404, {"error": {"message": f"Not found: {path}"}})
+            return
+
+        time.sleep(self.server.latency())
+
+        status = self.server.pick_failure()
+        if status is not None:
+            self.server.count("429" if status == 429 else "5xx")
+            self._send_error(api, status)
+            return
+
+        if api == "openai":
+            prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+            schema = (body.get("response_format") or {}).get("json_schema", {}).get("schema")
+            content = self._generate(self.server.response_for(prompt), schema, bool(body.get("stream")))
+            if body.get("stream"):
+                self._stream_openai(body.get("model", "mock"), content)
+            else:
+                self._send_json(200, self._openai_completion(body.get("model", "mock"), content))
+        else:
+            parts = [part for entry in body.get("contents", []) for part in entry.get("parts", [])]
+            response = self.server.response_for("\n".join(part.get("text", "") for part in parts))
+            schema = body.get("generationConfig", {}).get("response_schema")
+            stream = gemini_match.group("method") == "streamGenerateContent"
+            content = self._generate(response, schema, stream)
+            if stream:
+                self._stream_gemini(content)
+            else:
+                self._send_json(200, self._gemini_candidate(content))
+
+    def _generate(self, response: dict, schema: Optional[dict], stream: bool) -> str:
+        content = json.dumps(requested_format(schema).encode(response))
+        self.server.count("completion_tokens", estimate_tokens(content))
+        if not stream:
+            # streamed responses take the time piece by piece instead, see _send_events
+            time.sleep(self.server.token_latency * estimate_tokens(content))
+        return content
+
+    def _openai_completion(self, model: str, content: str) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": estimate_tokens(content),
+            },
+        }
+
+    def _openai_chunk(self, model: str, delta: dict, finish_reason: Optional[str] = None) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+        }
+
+    def _gemini_candidate(self, text: str) -> dict:
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+    def _stream_openai(self, model: str, content: str) -> None:
+        events = [self._openai_chunk(model, {"role": "assistant", "content": ""})]
+        events += [self._openai_chunk(model, {"content": piece}) for piece in self._pieces(content)]
+        events.append(self._openai_chunk(model, {}, finish_reason="stop"))
+        self._send_events([json.dumps(event) for event in events] + ["[DONE]"])
+
+    def _stream_gemini(self, content: str) -> None:
+        self._send_events([json.dumps(self._gemini_candidate(piece)) for piece in self._pieces(content)])
+
+    def _pieces(self, content: str) -> list[str]:
+        size = max(self.server.stream_chunk_size, 1)
+        return [content[i : i + size] for i in range(0, len(content), size)]
+
+    def _send_events(self, events: list[str]) -> None:
+        # server-sent events over a chunked response, so the connection stays reusable afterwards
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        piece_delay = self.server.stream_chunk_delay
+        piece_delay += self.server.token_latency * max(self.server.stream_chunk_size, 1) / CHARS_PER_TOKEN
+        for i, event in enumerate(events):
+            if i and piece_delay:
+                time.sleep(piece_delay)
+            payload = f"data: {event}\r\n\r\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_error(self, api: str, status: int) -> None:
+        if api == "openai":
+            error_type = "rate_limit_error" if status == 429 else "server_error"
+            body = {"error": {"message": f"Mock {status} error", "type": error_type, "code": None, "param": None}}
+        else:
+            error_status = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+            body = {"error": {"code": status, "message": f"Mock {status} error", "status": error_status}}
+        headers = {"Retry-After": f"{self.server.retry_after:g}"} if self.server.retry_after is not None else {}
+        self._send_json(status, body, headers)
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI/Gemini-compatible server for testing zev offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="0", help="ms: 200, 100-300, normal:200:50 or lognormal:200:0.5")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests that get a 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="fraction of requests that get a 503")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After sent with errors, in seconds")
+    parser.add_argument("--stream-chunk-size", type=int, default=16, help="characters per streamed event")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0, help="ms between streamed events")
+    parser.add_argument("--token-latency", type=float, default=0, help="ms to generate each output token")
+    parser.add_argument("--cassette", type=Path, help="JSONL of recorded responses, e.g. from `zev --batch`")
+    parser.add_argument("--seed", type=int, help="seed for latency and error injection, for repeatable runs")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        stream_chunk_size=args.stream_chunk_size,
+        stream_chunk_delay_ms=args.stream_chunk_delay,
+        token_latency_ms=args.token_latency,
+        cassette=load_cassette(args.cassette) if args.cassette else None,
+    )
+    print(f"Mock LLM server listening on {server.url}. Point zev at it with:")
+    print(f"  OPENAI_BASE_URL={server.url}/v1  GEMINI_BASE_URL={server.url}  OLLAMA_BASE_URL={server.url}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
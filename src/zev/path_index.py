@@ -0,0 +1,179 @@
+import json
+import os
+import shlex
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from zev.constants import PATH_INDEX_FILE_NAME
+
+if TYPE_CHECKING:
+    from zev.llms.types import Command
+
+# Tools the model likes to suggest that often aren't installed, or that have a more common alternative. The
+# prompt says which of these the user has, so the model can pick e.g. `find` over `fd` without a retry.
+TOOLS_OF_INTEREST = (
+    "rg", "fd", "fdfind", "jq", "yq", "fzf", "bat", "batcat", "eza", "exa", "tree", "htop", "btop", "ncdu",
+    "dust", "duf", "tldr", "gh", "docker", "podman", "kubectl", "ffmpeg", "magick", "convert", "rsync", "wget",
+    "curl", "lsof", "ss", "netstat", "ip", "ifconfig", "pbcopy", "xclip", "xsel", "gsed", "gawk", "sd", "delta",
+    "tmux", "parallel", "pv", "entr", "watch", "zip", "unzip", "7z", "git",
+)  # fmt: skip
+
+# Words that can start a command without being on $PATH
+SHELL_BUILTINS = frozenset(
+    "! . : [ [[ { } alias bg bind break builtin case cd command continue declare dirs disown do done echo elif "
+    "else enable esac eval exec exit export false fc fg fi for function getopts hash help history if jobs kill "
+    "let local logout popd printf pushd pwd read readonly return select set shift shopt source suspend test "
+    "then time times trap true type typeset ulimit umask unalias unset until wait while".split()
+)
+# Commands that run the command after them. Anything past an option (`sudo -u root ...`) isn't checked, since
+# telling option values from the command would need to know each wrapper's options.
+COMMAND_WRAPPERS = frozenset(("sudo", "doas", "env", "nohup", "nice", "exec", "command", "time", "xargs", "watch"))
+# Shell keywords that are followed by a command, e.g. `wc` in `for f in *; do wc -l "$f"; done`
+COMMAND_KEYWORDS = frozenset(("!", "{", "if", "elif", "then", "else", "while", "until", "do"))
+COMMAND_SEPARATORS = frozenset(("|", "||", "&", "&&", ";", ";;", "(", ")", "|&"))
+
+
+class PathIndex:
+    """
+    The executables in each $PATH directory, cached in a file. On load, only directories whose mtime changed
+    since they were indexed (i.e. something was installed or removed there) are listed again.
+    """
+
+    def __init__(self) -> None:
+        self.path = Path.home() / PATH_INDEX_FILE_NAME
+        self.encoding = "utf-8"
+        self.executables = set()
+
+    def load(self) -> "PathIndex":
+        cached = self._read()
+        dirs = {}
+        changed = False
+        for directory in dict.fromkeys(os.environ.get("PATH", "").split(os.pathsep)):
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+            entry = cached.get(directory)
+            if entry is None or entry["mtime"] != mtime:
+                entry = {"mtime": mtime, "names": _list_executables(directory)}
+                changed = True
+            dirs[directory] = entry
+            self.executables.update(entry["names"])
+
+        if changed or dirs.keys() != cached.keys():
+            self._write(dirs)
+        return self
+
+    def has(self, name: str) -> bool:
+        return _normalize_name(name) in self.executables
+
+    def missing_binaries(self, command: str) -> list[str]:
+        """Programs the command runs that are neither on $PATH nor shell builtins, e.g. `fd` in `fd -e py`."""
+        return [name for name in _command_names(command) if name not in SHELL_BUILTINS and not self.has(name)]
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding=self.encoding) as f:
+                return json.load(f)["dirs"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _write(self, dirs: dict) -> None:
+        # write to a temp file and rename, so a crash mid-write can't leave a truncated index behind
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.")
+        except OSError:
+            return  # e.g. a read-only home directory; the index is just built again next time
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                json.dump({"dirs": dirs}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return  # e.g. a full disk; PATH is scanned again next time
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+@lru_cache(maxsize=1)
+def get_path_index() -> PathIndex:
+    return PathIndex().load()
+
+
+def _normalize_name(name: str) -> str:
+    if os.name != "nt":
+        return name
+    # on Windows `git` runs git.exe, and names are case-insensitive
+    name = name.lower()
+    root, ext = os.path.splitext(name)
+    return root if ext in os.environ.get("PATHEXT", ".exe;.bat;.cmd").lower().split(";") else name
+
+
+def _list_executables(directory: str) -> list[str]:
+    names = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and os.access(entry.path, os.X_OK):
+                        names.append(_normalize_name(entry.name))
+                except OSError:
+                    continue  # e.g. a broken symlink
+    except OSError:
+        pass
+    return names
+
+
+def _command_names(command: str) -> list[str]:
+    """The program at the start of each part of a pipeline or command list."""
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return []  # unbalanced quotes; leave it to the shell
+
+    names = []
+    at_start = True
+    for token in tokens:
+        if token in COMMAND_SEPARATORS:
+            at_start = True
+        elif not at_start:
+            continue
+        elif token.partition("=")[0].isidentifier() and "=" in token:
+            continue  # FOO=bar before the command
+        elif token in COMMAND_WRAPPERS or token in COMMAND_KEYWORDS:
+            names.append(token)
+        elif token.startswith("-") or any(char in token for char in "$`<>*?/"):
+            # a wrapper's option, a variable, a redirection, a glob or a path: nothing to look up
+            at_start = False
+        else:
+            names.append(token)
+            at_start = False
+    return names
+
+
+def available_tools_context(index: PathIndex) -> str:
+    installed = [tool for tool in TOOLS_OF_INTEREST if index.has(tool)]
+    missing = [tool for tool in TOOLS_OF_INTEREST if not index.has(tool)]
+    return f"{', '.join(installed) or 'none of them'} (not installed: {', '.join(missing) or 'none'})"
+
+
+def flag_missing_tools(commands: list["Command"], index: Optional[PathIndex] = None) -> list["Command"]:
+    """
+    Commands whose programs are all installed first, followed by those that need something that isn't, with
+    the missing programs noted in their explanation. The order is otherwise kept.
+    """
+    index = index or get_path_index()
+    available, unavailable = [], []
+    for command in commands:
+        missing = index.missing_binaries(command.command)
+        if missing:
+            note = f"(not installed: {', '.join(dict.fromkeys(missing))})"
+            unavailable.append(command.model_copy(update={"short_explanation": f"{command.short_explanation} {note}"}))
+        else:
+            available.append(command)
+    return available + unavailable
@@ -0,0 +1,99 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Optional
+
+from zev.reporting import reports_to
+from zev.response_cache import normalize_query
+
+# Speculative queries for interactive mode (`zev` without arguments, with SPECULATIVE_PREFETCH=true): once
+# typing pauses, the text so far is sent in the background, so that by the time Enter is pressed the answer
+# is often ready, or at least on its way. Only the request for the latest text is kept; those it supersedes
+# are cancelled, like the losers of a race (see zev.llms.racing).
+
+# Shorter text is rarely the finished query, so it isn't worth a request
+MIN_QUERY_LENGTH = 8
+
+
+class PrefetchRequest:
+    def __init__(self, key: str, future: concurrent.futures.Future) -> None:
+        self.key = key
+        self._future = future
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancel(self) -> None:
+        self._future.cancel()
+
+    def result(self):
+        """The response, waiting for it if the request is still in flight. None if it failed or was cancelled."""
+        try:
+            return self._future.result()
+        except (Exception, concurrent.futures.CancelledError):  # pylint: disable=broad-except
+            return None  # the query is sent again on submit, where the error is shown
+
+
+class Prefetcher:
+    """
+    Debounces keystrokes into speculative requests. Feed it the text on every change with update(), then call
+    take() with the submitted text to get the matching request, if any.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable], debounce_seconds: float) -> None:
+        self.fetch = fetch
+        self.debounce_seconds = debounce_seconds
+        self._lock = threading.Lock()
+        self._timer = None
+        self._request = None
+        self._closed = False
+        # requests run on an event loop in a background thread, so a superseded one can be cancelled mid-flight
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="zev-prefetch", daemon=True).start()
+
+    def update(self, text: str) -> None:
+        key = normalize_query(text)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._closed or len(key) < MIN_QUERY_LENGTH or key.startswith("-"):
+                return
+            if self._request is not None and self._request.key == key:
+                return  # e.g. typed a character and deleted it again
+            self._timer = threading.Timer(self.debounce_seconds, self._send, args=(key, text))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def take(self, text: str) -> Optional[PrefetchRequest]:
+        """The request sent for the submitted text (compared as the response cache does), and stops prefetching."""
+        self.close()
+        request, self._request = self._request, None
+        if request is not None and request.key == normalize_query(text):
+            return request
+        if request is not None:
+            request.cancel()
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _send(self, key: str, text: str) -> None:
+        with self._lock:
+            # the timer may have fired just as it was cancelled
+            if self._closed:
+                return
+            if self._request is not None:
+                self._request.cancel()
+            future = asyncio.run_coroutine_threadsafe(self._fetch(text), self._loop)
+            self._request = PrefetchRequest(key, future)
+
+    async def _fetch(self, text: str):
+        # what a speculative request reports (e.g. a rejected API key) would garble the prompt being typed in;
+        # it's reported again if the query is sent on submit
+        with reports_to(lambda message: None):
+            return await self.fetch(text)
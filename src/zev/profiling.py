@@ -0,0 +1,143 @@
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from zev.constants import PROFILE_LOG_FILE_NAME
+
+# Lightweight phase timings for `zev --profile`. Spans cost an attribute check when profiling is off, so
+# they can stay in hot paths.
+
+_started_at = time.perf_counter()
+_ready_at = None
+_enabled = False
+_spans = []
+_local = threading.local()
+
+
+def mark_ready() -> None:
+    """Called once zev's own modules have been imported, before the command line is handled."""
+    global _ready_at
+    _ready_at = time.perf_counter()
+
+
+def enable() -> None:
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    # startup happens before we know whether to profile, so it's recorded after the fact
+    if _ready_at is not None:
+        record("startup", _ready_at - _started_at, started=_started_at)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Span:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = None
+        self.depth = 0
+
+    def __enter__(self) -> "Span":
+        if _enabled:
+            # spans in worker threads (e.g. racing backends) overlap the main thread's, so never count them
+            # towards the total
+            default_depth = 0 if threading.current_thread() is threading.main_thread() else 1
+            self.depth = getattr(_local, "depth", default_depth)
+            _local.depth = self.depth + 1
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        """Ends the span. Only the first call counts, so it can also be called from a callback."""
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start, self.depth, self.start)
+            _local.depth = self.depth
+            self.start = None
+
+
+def span(name: str) -> Span:
+    """Times a phase of the current run: `with span("request"): ...`"""
+    return Span(name)
+
+
+def start(name: str) -> Span:
+    """Starts a span to be ended with .stop(), for phases that don't end in the same block."""
+    return Span(name).__enter__()
+
+
+def record(name: str, seconds: float, depth: int = 0, started: Optional[float] = None) -> None:
+    if _enabled:
+        _spans.append((name, depth, started if started is not None else time.perf_counter() - seconds, seconds))
+
+
+def phase_totals() -> dict:
+    """
+    name -> (seconds, count, depth), in the order the phases started. Repeated phases (e.g. retried requests)
+    are summed.
+    """
+    phases = {}
+    for name, depth, _, seconds in sorted(_spans, key=lambda s: s[2]):
+        total, count, first_depth = phases.get(name, (0.0, 0, depth))
+        phases[name] = (total + seconds, count + 1, min(first_depth, depth))
+    return phases
+
+
+def format_report() -> str:
+    phases = phase_totals()
+    total = sum(seconds for seconds, _, depth in phases.values() if depth == 0)
+    lines = [f"{'Phase':<24} {'ms':>9} {'%':>6}"]
+    for name, (seconds, count, depth) in phases.items():
+        label = "  " * depth + name + (f" (x{count})" if count > 1 else "")
+        share = f"{seconds / total:.0%}" if total and depth == 0 else ""
+        lines.append(f"{label:<24} {seconds * 1000:>9.1f} {share:>6}")
+    lines.append(f"{'total':<24} {total * 1000:>9.1f}")
+    return "\n".join(lines)
+
+
+def get_log_path() -> Path:
+    return Path.home() / PROFILE_LOG_FILE_NAME
+
+
+def append_to_log() -> None:
+    import json  # pylint: disable=import-outside-toplevel
+
+    phases = {name: round(seconds * 1000, 2) for name, (seconds, _, _) in phase_totals().items()}
+    with open(get_log_path(), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"time": time.time(), "phases": phases}) + "\n")
+
+
+def summarize_log() -> dict:
+    """name -> (runs, p50 ms, p95 ms) over every run in the stats file."""
+    import json  # pylint: disable=import-outside-toplevel
+
+    samples = {}
+    try:
+        with open(get_log_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    phases = json.loads(line)["phases"]
+                except (ValueError, KeyError):
+                    continue
+                for name, ms in phases.items():
+                    samples.setdefault(name, []).append(ms)
+    except FileNotFoundError:
+        return {}
+
+    summary = {}
+    for name, values in samples.items():
+        values.sort()
+        summary[name] = (len(values), _percentile(values, 50), _percentile(values, 95))
+    return summary
+
+
+def _percentile(sorted_values: list, percent: int) -> float:
+    # nearest-rank, so the result is always one of the recorded timings
+    rank = max(-(-len(sorted_values) * percent // 100), 1)
+    return sorted_values[rank - 1]
@@ -0,0 +1,29 @@
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# What providers have to tell the user while answering a query: a rejected API key, a backend that's down, which
+# backend won a race. Normally that's printed, but some callers need it elsewhere: in a batch it goes into the
+# query's result, in the daemon back to the client, and a speculative prefetch drops it so it can't garble the
+# prompt being typed. The handler is a context variable, so it carries over into the asyncio tasks, to_thread
+# workers and run_coroutine_threadsafe calls a query makes, and concurrent queries each keep their own.
+
+_handler: contextvars.ContextVar = contextvars.ContextVar("report_handler", default=None)
+
+
+def report(message: str) -> None:
+    handler = _handler.get()
+    if handler is None:
+        print(message)
+    else:
+        handler(message)
+
+
+@contextmanager
+def reports_to(handler: Callable[[str], None]) -> Iterator[None]:
+    """Sends report()s made in this context to handler instead of printing them."""
+    token = _handler.set(handler)
+    try:
+        yield
+    finally:
+        _handler.reset(token)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from pydantic import ValidationError
+
+from zev.constants import CACHE_FILE_NAME
+from zev.llms.types import OptionsResponse
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?").rstrip()
+
+
+def make_cache_key(query: str, context: str, provider: Optional[str], model: Optional[str]) -> str:
+    raw = json.dumps([normalize_query(query), context, provider, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses, with a TTL and LRU eviction once it holds more than max_entries.
+    Hit and miss counts are kept in the same file so they survive across runs.
+
+    A lookup doesn't rewrite the cache: it appends a line to a log next to it, and the hits, misses and
+    last-used times logged there are folded into the cache the next time it's written, which is usually the
+    set() that follows a miss. Expired entries are dropped then too.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self.path = Path.home() / CACHE_FILE_NAME
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.encoding = "utf-8"
+        self.logged_lookups = 0
+
+    @property
+    def log_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".log")
+
+    def get(self, key: str) -> Optional[OptionsResponse]:
+        data = self._read()
+        entry = data["entries"].get(key)
+        now = time.time()
+
+        response = None
+        if entry is not None and now - entry["created_at"] <= self.ttl_seconds:
+            try:
+                response = OptionsResponse.model_validate(entry["response"])
+            except ValidationError:
+                # e.g. cached before a change to OptionsResponse, so it would never be usable again
+                del data["entries"][key]
+                self._write(data)
+
+        self._log_lookup(now, key if response else None)
+        if self.logged_lookups >= self.max_entries:
+            # only hits in a row, with no set() to fold them in, so fold them in now to keep the log short
+            self._write(self._read())
+        return response
+
+    def set(self, key: str, response: OptionsResponse) -> None:
+        data = self._read()
+        now = time.time()
+        data["entries"][key] = {
+            "created_at": now,
+            "last_used_at": now,
+            "response": response.model_dump(),
+        }
+        data["entries"] = self._evict(data["entries"], now)
+        self._write(data)
+
+    def stats(self) -> dict:
+        data = self._read()
+        entries = self._evict(data["entries"], time.time())
+        return {"hits": data["hits"], "misses": data["misses"], "entries": len(entries)}
+
+    def _evict(self, entries: dict, now: float) -> dict:
+        fresh = {key: entry for key, entry in entries.items() if now - entry["created_at"] <= self.ttl_seconds}
+        if len(fresh) <= self.max_entries:
+            return fresh
+        newest_first = sorted(fresh.items(), key=lambda item: item[1]["last_used_at"], reverse=True)
+        return dict(newest_first[: self.max_entries])
+
+    def _read(self) -> dict:
+        """The cache, with the lookups logged since it was last written folded in."""
+        try:
+            with open(self.path, "r", encoding=self.encoding) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data.setdefault("hits", 0)
+        data.setdefault("misses", 0)
+        data.setdefault("entries", {})
+
+        self.logged_lookups = 0
+        try:
+            with open(self.log_path, "r", encoding=self.encoding) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                used_at, key = json.loads(line)
+            except (ValueError, TypeError):
+                continue  # e.g. cut short by a crash
+            self.logged_lookups += 1
+            if key is None:
+                data["misses"] += 1
+                continue
+            data["hits"] += 1
+            entry = data["entries"].get(key)
+            if entry is not None:
+                entry["last_used_at"] = max(entry["last_used_at"], used_at)
+        return data
+
+    def _log_lookup(self, now: float, hit_key: Optional[str]) -> None:
+        try:
+            with open(self.log_path, "a", encoding=self.encoding) as f:
+                f.write(json.dumps([now, hit_key]) + "\n")
+        except OSError:
+            return  # e.g. a read-only home directory; it only costs a count
+        self.logged_lookups += 1
+
+    def _write(self, data: dict) -> None:
+        # write to a temp file and rename, so a crash mid-write can't leave a truncated cache behind
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.")
+        except OSError:
+            return  # e.g. a read-only home directory; the response just isn't cached
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return  # e.g. a full disk; the logged lookups stay in the log until the next write
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # the logged lookups are in the cache now; one logged by another zev in between only costs a count
+        try:
+            os.unlink(self.log_path)
+        except FileNotFoundError:
+            pass
+        self.logged_lookups = 0
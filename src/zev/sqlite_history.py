@@ -0,0 +1,131 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from zev.command_history import CommandHistory, CommandHistoryEntry, HistoryRecord, _parse_entry
+from zev.constants import HISTORY_DB_FILE_NAME
+from zev.llms.types import OptionsResponse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    commands TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    query, commands, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, query, commands) VALUES (new.id, new.query, new.commands);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, query, commands) VALUES ('delete', old.id, old.query, old.commands);
+END;
+"""
+
+# bumped once the JSONL history has been imported, so it's only ever migrated once
+MIGRATED_VERSION = 1
+
+
+class SQLiteCommandHistory(CommandHistory):
+    """
+    History stored in SQLite, with an FTS5 index over queries and generated commands so that
+    `zev --recent <terms>` stays fast with tens of thousands of entries. Falls back to LIKE
+    matching if the local SQLite was built without FTS5.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.db_path = Path.home() / HISTORY_DB_FILE_NAME
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self._migrate_from_jsonl()
+
+    def save_options(self, query: str, options: OptionsResponse) -> None:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO history (query, commands, response, created_at) VALUES (?, ?, ?, ?)",
+                (query, _commands_text(options), options.model_dump_json(), time.time()),
+            )
+            # ids only ever grow, so this is a range delete on the primary key rather than a count
+            self.conn.execute("DELETE FROM history WHERE id <= ?", (cursor.lastrowid - self.max_entries,))
+
+    def get_history(self) -> Optional[list[CommandHistoryEntry]]:
+        rows = self.conn.execute(
+            "SELECT query, response FROM (SELECT id, query, response FROM history ORDER BY id DESC LIMIT ?) "
+            "ORDER BY id",
+            (self.max_entries,),
+        ).fetchall()
+        return _to_entries(rows)
+
+    def iter_history_reverse(self) -> Iterator[HistoryRecord]:
+        cursor = self.conn.execute("SELECT query, response FROM history ORDER BY id DESC LIMIT ?", (self.max_entries,))
+        return (HistoryRecord(query, response) for query, response in cursor)
+
+    def search(self, terms: str) -> Optional[list[CommandHistoryEntry]]:
+        words = terms.split()
+        if not words:
+            return self.get_history()
+
+        # the newest max_entries matches, oldest first like get_history
+        if self.has_fts:
+            # quote every term so FTS syntax in user input is taken literally, and prefix-match the terms
+            match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+            rows = self.conn.execute(
+                "SELECT query, response FROM (SELECT history.id, history.query, history.response FROM history_fts "
+                "JOIN history ON history.id = history_fts.rowid "
+                "WHERE history_fts MATCH ? ORDER BY history.id DESC LIMIT ?) ORDER BY id",
+                (match, self.max_entries),
+            ).fetchall()
+        else:
+            conditions = " AND ".join("(query || ' ' || commands) LIKE ?" for _ in words)
+            rows = self.conn.execute(
+                f"SELECT query, response FROM (SELECT id, query, response FROM history WHERE {conditions} "
+                "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                [f"%{word}%" for word in words] + [self.max_entries],
+            ).fetchall()
+        return _to_entries(rows)
+
+    def _migrate_from_jsonl(self) -> None:
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version >= MIGRATED_VERSION:
+            return
+
+        rows = []
+        if self.path.exists():
+            with self._open_for_reading() as f:
+                # lines that don't parse (e.g. cut short by a crash) are left behind, as the JSONL reader skips them
+                for entry in filter(None, map(_parse_entry, f)):
+                    rows.append(
+                        (entry.query, _commands_text(entry.response), entry.response.model_dump_json(), time.time())
+                    )
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (query, commands, response, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self.conn.execute(f"PRAGMA user_version = {MIGRATED_VERSION}")
+
+
+def _commands_text(options: OptionsResponse) -> str:
+    return "\n".join(cmd.command for cmd in options.commands)
+
+
+def _to_entries(rows) -> Optional[list[CommandHistoryEntry]]:
+    if not rows:
+        return None
+    return [
+        CommandHistoryEntry(query=query, response=OptionsResponse.model_validate_json(response))
+        for query, response in rows
+    ]
@@ -1,15 +1,8 @@
-import os
-import platform
-
-import questionary
-
-CLI_STYLE = questionary.Style(
-    [
-        ("qmark", "#98c379"),
-        ("question", "#98c379"),
-        ("instruction", "italic #646464"),
-    ]
-)
+CLI_STYLE = [
+    ("qmark", "#98c379"),
+    ("question", "#98c379"),
+    ("instruction", "italic #646464"),
+]
 
 
 def get_input_string(
@@ -18,18 +11,24 @@ def get_input_string(
     default: str = "",
     required: bool = False,
     help_text: str = "",
+    on_change=None,
 ) -> str:
-    """Ask for a single line of input in the terminal, with colour + hint."""
+    """Ask for a single line of input in the terminal, with colour + hint. on_change gets the text as it's typed."""
+    import questionary  # pylint: disable=import-outside-toplevel
+
     base = f"{prompt_text} (default: {default})" if default else prompt_text
 
     while True:
-        value = questionary.text(
+        question = questionary.text(
             message=base,
             default=default,
             instruction=help_text or None,
-            style=CLI_STYLE,
+            style=questionary.Style(CLI_STYLE),
             validate=lambda t: bool(t) if required else True,
-        ).ask()
+        )
+        if on_change is not None:
+            question.application.current_buffer.on_text_changed += lambda buffer: on_change(buffer.text)
+        value = question.ask()
 
         if value is None:  # user pressed Ctrl-C / Ctrl-D
             raise KeyboardInterrupt
@@ -42,12 +41,6 @@ def get_input_string(
         print(f"{field_name} is required, please try again.")
 
 
-def get_env_context() -> str:
-    os_name = platform.platform(aliased=True)
-    shell = os.environ.get("SHELL") or os.environ.get("COMSPEC")
-    return f"OS: {os_name}\nSHELL: {shell}" if shell else f"OS: {os_name}"
-
-
 def show_help():
     print("""
 Zev is a simple CLI tool to help you remember terminal commands.
@@ -56,6 +49,16 @@ Usage:
 zev "<query>"               Describe what you want to do
 zev --help, -h            Show this help message
 zev --recent, -r          Show recently run commands and results
+zev --recent <terms>      Search history for queries or commands matching terms
 zev --setup, -s           Run setup again
 zev --version, -v         Show version information
+zev --daemon              Run a background daemon that keeps provider connections warm
+zev --cache-stats         Show response cache hit/miss counts
+zev --no-cache "<query>"  Skip the response cache for this query
+zev --profile "<query>"   Show how long each phase of the query took
+zev --profile-stats       Show p50/p95 phase timings of runs logged with PROFILE_LOG=true
+zev --build-index         Index installed man pages for answering simple queries offline
+zev --batch <file|->      Run one query per line and print results as JSONL
+    [--concurrency N]     Number of queries in flight at once (default 8)
+    [--output <file>]     Append results to a file, skipping queries it already has results for
 """)
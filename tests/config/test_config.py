@@ -1,7 +1,9 @@
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import patch
 
+import pytest
 from dotenv import dotenv_values
 
 
@@ -64,3 +66,122 @@ AZURE_OPENAI_API_VERSION=2024-02-01
                 assert config.gemini_api_key is None
         finally:
             config_path.unlink()
+
+    def test_parses_race_providers(self):
+        with patch('zev.config.Config.__init__', lambda self: None):
+            from zev.config import Config
+            config = Config()
+            config.vals = {
+                "RACE_PROVIDERS": "openai:gpt-4o-mini, gemini ,ollama:llama3.2:latest",
+                "RACE_HEDGE_DELAY_MS": "250",
+                "GEMINI_MODEL": "gemini-pro",
+            }
+
+            assert config.race_providers == [
+                ("openai", "gpt-4o-mini"),
+                ("gemini", "gemini-pro"),
+                ("ollama", "llama3.2:latest"),
+            ]
+            assert config.race_hedge_delay_seconds == 0.25
+
+    def test_parses_routing_table(self):
+        with patch('zev.config.Config.__init__', lambda self: None):
+            from zev.config import Config
+            config = Config()
+            config.vals = {"ROUTING_TABLE": "simple=openai:gpt-4o-mini, complex=gemini", "GEMINI_MODEL": "gemini-pro"}
+
+            assert config.routing_table == {"simple": ("openai", "gpt-4o-mini"), "complex": ("gemini", "gemini-pro")}
+
+            config.vals = {}
+            assert config.routing_table == {}
+
+    def test_rejects_unknown_routing_tiers(self):
+        with patch('zev.config.Config.__init__', lambda self: None):
+            from zev.config import Config
+            config = Config()
+            config.vals = {"ROUTING_TABLE": "tiny=openai:gpt-4o-mini"}
+
+            with pytest.raises(ValueError, match="ROUTING_TABLE"):
+                config.routing_table
+
+    def test_base_urls_fall_back_to_environment_then_defaults(self):
+        with patch('zev.config.Config.__init__', lambda self: None):
+            from zev.config import Config
+            from zev.constants import GEMINI_BASE_URL, OPENAI_BASE_URL
+            config = Config()
+            config.vals = {"OPENAI_BASE_URL": "http://127.0.0.1:8765/v1/"}
+
+            with patch.dict('os.environ', {"GEMINI_BASE_URL": "http://127.0.0.1:9000"}, clear=True):
+                assert config.openai_base_url == "http://127.0.0.1:8765/v1"
+                assert config.gemini_base_url == "http://127.0.0.1:9000"
+                assert config.ollama_base_url is None
+
+            with patch.dict('os.environ', {}, clear=True):
+                config.vals = {}
+                assert config.openai_base_url == OPENAI_BASE_URL
+                assert config.gemini_base_url == GEMINI_BASE_URL
+
+
+class TestConfigSnapshot:
+    @pytest.fixture
+    def home(self, tmp_path):
+        with patch.object(Path, "home", return_value=tmp_path):
+            yield tmp_path
+
+    def test_parses_once_then_reuses_snapshot(self, home):
+        from zev.config import Config
+        (home / ".zevrc").write_text("LLM_PROVIDER=openai\nCACHE_TTL_SECONDS=0\nSTREAM_RESPONSES=yes\n")
+
+        with patch("dotenv.dotenv_values", wraps=dotenv_values) as mock_parse:
+            first = Config()
+            assert first.cache_ttl_seconds == 0
+            assert first.stream_responses is True
+            assert first.llm_provider == "openai"
+
+            second = Config()
+            assert second.cache_ttl_seconds == 0
+            assert second.stream_responses is True
+
+        assert mock_parse.call_count == 1
+
+    def test_snapshot_is_invalidated_when_file_changes(self, home):
+        from zev.config import Config
+        config_path = home / ".zevrc"
+        config_path.write_text("CACHE_MAX_ENTRIES=10\n")
+        assert Config().cache_max_entries == 10
+
+        config_path.write_text("CACHE_MAX_ENTRIES=250\n")
+
+        assert Config().cache_max_entries == 250
+
+    def test_invalid_value_raises(self, home):
+        from zev.config import Config
+        (home / ".zevrc").write_text("READ_TIMEOUT=soon\n")
+
+        with pytest.raises(ValueError, match="READ_TIMEOUT in ~/.zevrc must be a number"):
+            Config().read_timeout
+
+    def test_invalid_value_keeps_raw_values_readable(self, home):
+        from zev.config import Config
+        (home / ".zevrc").write_text("LLM_PROVIDER=openai\nREAD_TIMEOUT=soon\n")
+        config = Config()
+
+        assert config.vals == {"LLM_PROVIDER": "openai", "READ_TIMEOUT": "soon"}
+        with pytest.raises(ValueError, match="READ_TIMEOUT"):
+            config.settings
+        assert not (home / ".zevrc.snapshot").exists()
+
+    def test_missing_file_uses_defaults(self, home):
+        from zev.config import Config
+        from zev.constants import CACHE_DEFAULT_MAX_ENTRIES
+
+        assert Config().cache_max_entries == CACHE_DEFAULT_MAX_ENTRIES
+        assert not (home / ".zevrc.snapshot").exists()
+
+    def test_export_to_environ_overrides_existing_values(self, home):
+        from zev.config import Config
+        (home / ".zevrc").write_text("OPENAI_API_KEY=sk-from-file\n")
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "sk-old"}):
+            Config().export_to_environ()
+            assert os.environ["OPENAI_API_KEY"] == "sk-from-file"
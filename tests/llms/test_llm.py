@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 from zev.constants import LLMProviders
+from zev.llms.resilience import ResilientProvider
 
 
 class TestGetInferenceProvider:
@@ -11,6 +12,7 @@ class TestGetInferenceProvider:
     @patch('zev.llms.llm.config')
     def test_returns_openai_provider_for_openai(self, mock_llm_config, mock_provider_config, mock_openai):
         mock_llm_config.llm_provider = LLMProviders.OPENAI
+        mock_llm_config.race_providers = []
         mock_provider_config.openai_api_key = "test-key"
         mock_provider_config.openai_model = None
 
@@ -19,13 +21,15 @@ class TestGetInferenceProvider:
         
         provider = get_inference_provider()
         
-        assert isinstance(provider, OpenAIProvider)
+        assert isinstance(provider, ResilientProvider)
+        assert isinstance(provider.provider, OpenAIProvider)
 
     @patch('zev.llms.ollama.provider.OpenAI')
     @patch('zev.llms.ollama.provider.config')
     @patch('zev.llms.llm.config')
     def test_returns_ollama_provider_for_ollama(self, mock_llm_config, mock_provider_config, mock_openai):
         mock_llm_config.llm_provider = LLMProviders.OLLAMA
+        mock_llm_config.race_providers = []
         mock_provider_config.ollama_base_url = "http://localhost:11434"
         mock_provider_config.ollama_model = "llama2"
 
@@ -34,12 +38,14 @@ class TestGetInferenceProvider:
         
         provider = get_inference_provider()
         
-        assert isinstance(provider, OllamaProvider)
+        assert isinstance(provider, ResilientProvider)
+        assert isinstance(provider.provider, OllamaProvider)
 
     @patch('zev.llms.gemini.provider.config')
     @patch('zev.llms.llm.config')
     def test_returns_gemini_provider_for_gemini(self, mock_llm_config, mock_gemini_config):
         mock_llm_config.llm_provider = LLMProviders.GEMINI
+        mock_llm_config.race_providers = []
         mock_gemini_config.gemini_api_key = "test-key"
         mock_gemini_config.gemini_model = None
 
@@ -48,13 +54,86 @@ class TestGetInferenceProvider:
         
         provider = get_inference_provider()
         
-        assert isinstance(provider, GeminiProvider)
+        assert isinstance(provider, ResilientProvider)
+        assert isinstance(provider.provider, GeminiProvider)
 
     @patch('zev.llms.llm.config')
     def test_raises_error_for_invalid_provider(self, mock_config):
         mock_config.llm_provider = "unknown_provider"
+        mock_config.race_providers = []
 
         from zev.llms.llm import get_inference_provider
         
         with pytest.raises(ValueError, match="Invalid LLM provider"):
             get_inference_provider()
+
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    @patch('zev.llms.llm.config')
+    def test_local_danger_check_leaves_out_danger_fields(self, mock_llm_config, mock_provider_config, mock_openai):
+        mock_llm_config.local_danger_check = True
+        mock_llm_config.compact_schema = False
+        mock_llm_config.max_options = 3
+        mock_provider_config.openai_api_key = "test-key"
+        mock_provider_config.openai_model = None
+
+        from zev.llms.llm import create_provider
+
+        assert create_provider(LLMProviders.OPENAI).response_format.with_danger_fields is False
+
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    @patch('zev.llms.llm.config')
+    def test_compact_schema_and_max_options(self, mock_llm_config, mock_provider_config, mock_openai):
+        mock_llm_config.local_danger_check = False
+        mock_llm_config.compact_schema = True
+        mock_llm_config.max_options = 5
+        mock_provider_config.openai_api_key = "test-key"
+        mock_provider_config.openai_model = None
+
+        from zev.llms.llm import create_provider
+
+        response_format = create_provider(LLMProviders.OPENAI).response_format
+        assert response_format.compact is True
+        assert response_format.max_options == 5
+        assert response_format.with_danger_fields is True
+
+
+class TestRouting:
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    @patch('zev.llms.llm.config')
+    def test_routing_table_builds_a_routing_provider(self, mock_llm_config, mock_provider_config, mock_openai):
+        mock_llm_config.routing_table = {"simple": ("openai", "gpt-4o-mini")}
+        mock_llm_config.race_providers = []
+        mock_llm_config.llm_provider = LLMProviders.OPENAI
+        mock_llm_config.llm_model = "gpt-4o"
+        mock_llm_config.local_danger_check = False
+        mock_llm_config.compact_schema = False
+        mock_llm_config.max_options = 3
+        mock_provider_config.openai_api_key = "test-key"
+        mock_provider_config.openai_model = "gpt-4o"
+
+        from zev.llms.llm import get_backend_description, get_inference_provider
+        from zev.llms.routing import RoutingProvider
+
+        provider = get_inference_provider()
+
+        assert isinstance(provider, RoutingProvider)
+        assert provider.tiers["simple"][0] == "openai/gpt-4o-mini"
+        assert provider.tiers["simple"][1].provider.model == "gpt-4o-mini"
+        # without a complex tier in the table, the usual provider and model answer complex queries
+        assert provider.tiers["complex"][0] == "openai/gpt-4o"
+        assert provider.tiers["complex"][1].provider.model == "gpt-4o"
+        assert get_backend_description() == ("route", "simple=openai/gpt-4o-mini,complex=openai/gpt-4o")
+
+    @patch('zev.llms.llm.config')
+    def test_without_routing_table(self, mock_llm_config):
+        mock_llm_config.routing_table = {}
+        mock_llm_config.race_providers = []
+        mock_llm_config.llm_provider = LLMProviders.GEMINI
+        mock_llm_config.llm_model = "gemini-pro"
+
+        from zev.llms.llm import get_backend_description
+
+        assert get_backend_description() == (LLMProviders.GEMINI, "gemini-pro")
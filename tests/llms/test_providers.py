@@ -1,4 +1,5 @@
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import ANY, AsyncMock, patch, MagicMock
 
 import pytest
 
@@ -6,6 +7,12 @@ from zev.constants import OPENAI_DEFAULT_MODEL, GEMINI_DEFAULT_MODEL
 from zev.llms.types import Command, OptionsResponse
 
 
+def gemini_response(status, body, headers=None):
+    import httpx2
+
+    return httpx2.Response(status, content=body, headers=headers, request=httpx2.Request("POST", "https://gemini"))
+
+
 class TestOpenAIProvider:
     @patch('zev.llms.openai.provider.OpenAI')
     @patch('zev.llms.openai.provider.config')
@@ -88,6 +95,166 @@ class TestOpenAIProvider:
         assert "error" in captured.out.lower()
 
 
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    def test_stream_options_emits_commands_before_completion(self, mock_config, mock_openai_class):
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+
+        final = OptionsResponse(
+            commands=[
+                Command(command="ls", short_explanation="List", is_dangerous=False),
+                Command(command="ls -la", short_explanation="List all", is_dangerous=False),
+            ],
+            is_valid=True,
+        )
+        text = final.model_dump_json()
+        split = text.index("ls -la")
+        events = [
+            MagicMock(type="content.delta", delta=text[:split]),
+            MagicMock(type="content.delta", delta=text[split:]),
+        ]
+
+        seen = []
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(events)
+        stream.get_final_completion.side_effect = lambda: (
+            seen.append("done") or MagicMock(choices=[MagicMock(message=MagicMock(parsed=final))])
+        )
+        mock_client = MagicMock()
+        mock_client.beta.chat.completions.stream.return_value.__enter__.return_value = stream
+        mock_openai_class.return_value = mock_client
+
+        from zev.llms.openai.provider import OpenAIProvider
+        provider = OpenAIProvider()
+        result = provider.stream_options("list files", "OS: Linux", on_command=lambda cmd: seen.append(cmd.command))
+
+        assert seen == ["ls", "ls -la", "done"]
+        assert result == final
+
+    @patch('zev.llms.openai.provider.AsyncOpenAI')
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    def test_aget_options_uses_async_client(self, mock_config, mock_openai_class, mock_async_openai_class):
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+
+        expected_response = OptionsResponse(
+            commands=[Command(command="ls", short_explanation="List", is_dangerous=False)],
+            is_valid=True
+        )
+        mock_api_response = MagicMock()
+        mock_api_response.choices = [MagicMock()]
+        mock_api_response.choices[0].message.parsed = expected_response
+        mock_async_client = MagicMock()
+        mock_async_client.beta.chat.completions.parse = AsyncMock(return_value=mock_api_response)
+        mock_async_openai_class.return_value = mock_async_client
+
+        from zev.llms.openai.provider import OpenAIProvider
+        provider = OpenAIProvider()
+        mock_async_openai_class.assert_not_called()
+
+        result = asyncio.run(provider.aget_options("list files", "OS: Linux"))
+
+        assert result == expected_response
+        mock_async_openai_class.assert_called_once_with(**mock_openai_class.call_args.kwargs)
+        mock_openai_class.return_value.beta.chat.completions.parse.assert_not_called()
+
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    def test_without_danger_fields_asks_for_less_and_fills_them_in(self, mock_config, mock_openai_class):
+        from zev.constants import PROMPT_WITHOUT_DANGER
+        from zev.llms.response_format import ResponseFormat
+
+        response_format = ResponseFormat(with_danger_fields=False)
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+        mock_client = mock_openai_class.return_value
+        mock_client.beta.chat.completions.parse.return_value.choices = [MagicMock()]
+        mock_client.beta.chat.completions.parse.return_value.choices[0].message.parsed = response_format.model(
+            commands=[{"command": "ls", "short_explanation": "List"}], is_valid=True
+        )
+
+        from zev.llms.openai.provider import OpenAIProvider
+        result = OpenAIProvider(response_format=response_format).get_options("list files", "OS: Linux")
+
+        call = mock_client.beta.chat.completions.parse.call_args.kwargs
+        assert call["response_format"] is response_format.model
+        assert set(call["response_format"].model_fields) == {"commands", "is_valid", "explanation_if_not_valid"}
+        assert call["messages"][0]["content"] == PROMPT_WITHOUT_DANGER.format(
+            prompt="list files", context="OS: Linux", max_options=3
+        )
+        assert "is_dangerous" not in call["messages"][0]["content"]
+        assert isinstance(result, OptionsResponse)
+        assert result.commands[0].is_dangerous is False
+
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    def test_compact_schema_maps_back_to_options_response(self, mock_config, mock_openai_class):
+        from zev.llms.response_format import ResponseFormat
+
+        response_format = ResponseFormat(compact=True, max_options=2)
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+        mock_client = mock_openai_class.return_value
+        mock_client.beta.chat.completions.parse.return_value.choices = [MagicMock()]
+        mock_client.beta.chat.completions.parse.return_value.choices[0].message.parsed = response_format.model(
+            o=[{"c": "ls", "e": "List", "d": False, "w": None}] * 3, ok=True, why=None
+        )
+
+        from zev.llms.openai.provider import OpenAIProvider
+        result = OpenAIProvider(response_format=response_format).get_options("list files", "OS: Linux")
+
+        call = mock_client.beta.chat.completions.parse.call_args.kwargs
+        assert set(call["response_format"].model_fields) == {"o", "ok", "why"}
+        assert "at most 2 options" in call["messages"][0]["content"]
+        assert result == OptionsResponse(
+            commands=[Command(command="ls", short_explanation="List", is_dangerous=False)] * 2, is_valid=True
+        )
+
+    @patch('zev.llms.openai.provider.OpenAI')
+    @patch('zev.llms.openai.provider.config')
+    def test_warm_up_retrieves_the_model(self, mock_config, mock_openai_class):
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+
+        from zev.llms.openai.provider import OpenAIProvider
+        OpenAIProvider().warm_up()
+
+        mock_openai_class.return_value.models.retrieve.assert_called_once_with("gpt-4")
+
+
+class TestAsyncFallback:
+    def test_base_provider_runs_get_options_in_a_thread(self):
+        from zev.llms.inference_provider_base import InferenceProvider
+
+        response = OptionsResponse(commands=[], is_valid=False, explanation_if_not_valid="nope")
+        provider = MagicMock(spec=InferenceProvider)
+        provider.get_options.return_value = response
+
+        result = asyncio.run(InferenceProvider.aget_options(provider, "hello", "OS: Linux"))
+
+        assert result == response
+        provider.get_options.assert_called_once_with("hello", "OS: Linux")
+
+
+class TestStreamOptionsFallback:
+    def test_base_provider_emits_commands_after_full_response(self):
+        from zev.llms.inference_provider_base import InferenceProvider
+
+        response = OptionsResponse(
+            commands=[Command(command="pwd", short_explanation="Where", is_dangerous=False)], is_valid=True
+        )
+        provider = MagicMock(spec=InferenceProvider)
+        provider.get_options.return_value = response
+
+        seen = []
+        result = InferenceProvider.stream_options(provider, "where am i", "OS: Linux", seen.append)
+
+        assert result == response
+        assert [cmd.command for cmd in seen] == ["pwd"]
+
+
 class TestOllamaProvider:
     @patch('zev.llms.ollama.provider.OpenAI')
     @patch('zev.llms.ollama.provider.config')
@@ -99,7 +266,9 @@ class TestOllamaProvider:
         provider = OllamaProvider()
 
         assert provider.model == "llama2"
-        mock_openai.assert_called_with(base_url="http://localhost:11434", api_key="ollama")
+        mock_openai.assert_called_with(
+            base_url="http://localhost:11434", api_key="ollama", timeout=ANY, max_retries=0
+        )
 
     @patch('zev.llms.ollama.provider.config')
     def test_raises_error_without_base_url(self, mock_config):
@@ -162,6 +331,140 @@ class TestGeminiProvider:
 
         assert "my-secret-key" in provider.api_url
 
+    @patch('zev.llms.gemini.provider.get_shared_client')
+    @patch('zev.llms.gemini.provider.config')
+    def test_warm_up_looks_up_the_model(self, mock_config, mock_get_client):
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+
+        from zev.llms.gemini.provider import GeminiProvider
+        provider = GeminiProvider()
+        provider.warm_up()
+
+        mock_get_client.return_value.get.assert_called_once_with(provider.model_url)
+        assert provider.model_url.endswith("/models/gemini-pro?key=gemini-key")
+
+    @patch('zev.llms.gemini.provider.config')
+    def test_providers_share_one_client(self, mock_config):
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_config.read_timeout = 5
+        mock_config.connect_timeout = 5
+
+        from zev.llms.gemini.provider import GeminiProvider
+
+        assert GeminiProvider().client is GeminiProvider(model="gemini-2.0-flash").client
+
+    @patch('zev.llms.gemini.provider.get_shared_client')
+    @patch('zev.llms.gemini.provider.config')
+    def test_stream_options_parses_server_sent_events(self, mock_config, mock_get_client):
+        import json
+
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+
+        command = {"command": "df -h", "short_explanation": "Disk", "is_dangerous": False}
+        text = json.dumps({"commands": [command], "is_valid": True})
+        lines = [
+            "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": chunk}]}}]})
+            for chunk in (text[:30], text[30:])
+        ]
+        mock_client = mock_get_client.return_value
+        mock_response = mock_client.stream.return_value.__enter__.return_value
+        mock_response.is_error = False
+        mock_response.iter_lines.return_value = iter(lines)
+
+        from zev.llms.gemini.provider import GeminiProvider
+        provider = GeminiProvider()
+        seen = []
+        result = provider.stream_options("disk usage", "OS: Linux", seen.append)
+
+        assert [cmd.command for cmd in seen] == ["df -h"]
+        assert result.commands[0].command == "df -h"
+        assert "streamGenerateContent" in mock_client.stream.call_args[0][1]
+
+    @patch('zev.llms.gemini.provider.get_shared_client')
+    @patch('zev.llms.gemini.provider.config')
+    def test_without_danger_fields(self, mock_config, mock_get_client):
+        import json
+
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        text = json.dumps({"commands": [{"command": "df -h", "short_explanation": "Disk"}], "is_valid": True})
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+        mock_client = mock_get_client.return_value
+        mock_client.post.return_value = gemini_response(200, body)
+
+        from zev.llms.gemini.provider import GeminiProvider
+        from zev.llms.response_format import ResponseFormat
+
+        result = GeminiProvider(response_format=ResponseFormat(with_danger_fields=False)).get_options(
+            "disk usage", "OS: Linux"
+        )
+
+        request = json.loads(mock_client.post.call_args.kwargs["content"])
+        command_schema = request["generationConfig"]["response_schema"]["properties"]["commands"]["items"]
+        assert set(command_schema["properties"]) == {"command", "short_explanation"}
+        assert "is_dangerous" not in request["contents"][0]["parts"][0]["text"]
+        assert result.commands[0].command == "df -h"
+        assert result.commands[0].is_dangerous is False
+
+    @patch('zev.llms.gemini.provider.get_shared_client')
+    @patch('zev.llms.gemini.provider.config')
+    def test_get_options_prints_api_error(self, mock_config, mock_get_client, capsys):
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_get_client.return_value.post.return_value = gemini_response(
+            400, b'{"error": {"message": "API key not valid"}}'
+        )
+
+        from zev.llms.gemini.provider import GeminiProvider
+        result = GeminiProvider().get_options("disk usage", "OS: Linux")
+
+        assert result is None
+        assert "API key not valid" in capsys.readouterr().out
+
+    @patch('zev.llms.gemini.provider.config')
+    def test_aget_options_posts_through_async_client(self, mock_config):
+        import json
+
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+
+        command = {"command": "df -h", "short_explanation": "Disk", "is_dangerous": False}
+        text = json.dumps({"commands": [command], "is_valid": True})
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+
+        from zev.llms.gemini.provider import GeminiProvider
+        provider = GeminiProvider()
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=gemini_response(200, body))
+
+        with patch('zev.llms.gemini.provider.httpx2.AsyncClient', return_value=mock_client):
+            result = asyncio.run(provider.aget_options("disk usage", "OS: Linux"))
+
+        assert result.commands[0].command == "df -h"
+        assert mock_client.post.call_args[0][0] == provider.api_url
+
+    @patch('zev.llms.gemini.provider.config')
+    def test_one_async_client_per_event_loop(self, mock_config):
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_config.read_timeout = 5
+        mock_config.connect_timeout = 5
+
+        from zev.llms.gemini.provider import GeminiProvider
+        provider = GeminiProvider()
+
+        async def clients():
+            return provider.async_client, provider.async_client
+
+        first, again = asyncio.run(clients())
+        second, _ = asyncio.run(clients())
+
+        assert first is again
+        assert first is not second
+
 
 class TestAzureOpenAIProvider:
     @patch('zev.llms.azure_openai.provider.AzureOpenAI')
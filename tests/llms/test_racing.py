@@ -0,0 +1,222 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.racing import RacingProvider
+from zev.llms.types import Command, OptionsResponse
+
+
+def make_response(command="ls", is_valid=True):
+    return OptionsResponse(
+        commands=[Command(command=command, short_explanation="list", is_dangerous=False)] if is_valid else [],
+        is_valid=is_valid,
+        explanation_if_not_valid=None if is_valid else "not a command",
+    )
+
+
+class FakeProvider(InferenceProvider):
+    def __init__(self, delay=0.0, response=None, error=None):
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    def get_options(self, prompt, context):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.response
+
+    async def aget_options(self, prompt, context):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.response
+
+
+class TestRacingProvider:
+    def test_returns_fastest_valid_response(self, capsys):
+        slow = FakeProvider(delay=0.5, response=make_response("slow"))
+        fast = FakeProvider(delay=0.01, response=make_response("fast"))
+        racer = RacingProvider([("slow", slow), ("fast", fast)])
+
+        response = racer.get_options("list files", "context")
+
+        assert response.commands[0].command == "fast"
+        assert racer.last_winner == "fast"
+        assert racer.last_timings["slow"] is None
+        assert "Fastest: fast" in capsys.readouterr().out
+
+    def test_hedge_delay_skips_others_when_first_is_fast(self, capsys):
+        first = FakeProvider(delay=0.01, response=make_response("first"))
+        second = FakeProvider(response=make_response("second"))
+        racer = RacingProvider([("first", first), ("second", second)], hedge_delay=1.0)
+
+        response = racer.get_options("list files", "context")
+
+        assert response.commands[0].command == "first"
+        assert second.calls == 0
+        assert "second: not started" in capsys.readouterr().out
+
+    def test_hedged_backend_starts_after_delay(self):
+        first = FakeProvider(delay=1.0, response=make_response("first"))
+        second = FakeProvider(delay=0.01, response=make_response("second"))
+        racer = RacingProvider([("first", first), ("second", second)], hedge_delay=0.05)
+
+        start = time.perf_counter()
+        response = racer.get_options("list files", "context")
+
+        assert response.commands[0].command == "second"
+        assert time.perf_counter() - start < 0.5
+
+    def test_failure_starts_hedged_backends_immediately(self, capsys):
+        failing = FakeProvider(error=RuntimeError("boom"))
+        backup = FakeProvider(response=make_response("backup"))
+        racer = RacingProvider([("failing", failing), ("backup", backup)], hedge_delay=5.0)
+
+        start = time.perf_counter()
+        response = racer.get_options("list files", "context")
+
+        assert response.commands[0].command == "backup"
+        assert time.perf_counter() - start < 1.0
+
+    def test_falls_back_to_invalid_response_when_none_are_valid(self):
+        invalid = FakeProvider(response=make_response(is_valid=False))
+        failed = FakeProvider(response=None)
+        racer = RacingProvider([("invalid", invalid), ("failed", failed)])
+
+        response = racer.get_options("list files", "context")
+
+        assert response is not None
+        assert not response.is_valid
+        assert racer.last_winner is None
+
+    def test_prints_errors_when_all_fail(self, capsys):
+        racer = RacingProvider([("a", FakeProvider(error=RuntimeError("down")))])
+
+        assert racer.get_options("list files", "context") is None
+        assert "Error from a: down" in capsys.readouterr().out
+
+    def test_warm_up_connects_to_every_backend_at_once(self):
+        async def slow_warm_up():
+            await asyncio.sleep(0.2)
+
+        backends = [MagicMock(), MagicMock(), MagicMock()]
+        backends[0].awarm_up = AsyncMock(side_effect=ConnectionError("unreachable"))
+        for backend in backends[1:]:
+            backend.awarm_up = AsyncMock(side_effect=slow_warm_up)
+        racer = RacingProvider([(str(i), backend) for i, backend in enumerate(backends)])
+
+        start = time.perf_counter()
+        racer.warm_up()
+
+        assert time.perf_counter() - start < 0.35
+        for backend in backends:
+            backend.awarm_up.assert_awaited_once()
+
+    def test_losers_are_cancelled_without_reporting(self, tmp_path, capsys):
+        from zev.llms.resilience import CircuitBreaker, ResilientProvider, RetryableError
+
+        class FailingLate(FakeProvider):
+            def get_options(self, prompt, context):
+                super().get_options(prompt, context)
+                raise RetryableError("HTTP 503")
+
+            async def aget_options(self, prompt, context):
+                await super().aget_options(prompt, context)
+                raise RetryableError("HTTP 503")
+
+        with patch("zev.llms.resilience.Path.home", return_value=tmp_path):
+            breaker = CircuitBreaker(threshold=1, cooldown_seconds=60)
+        slow = FailingLate(delay=0.3)
+        loser = ResilientProvider(slow, "slow", breaker, deadline=5, max_retries=0, base_delay=0, max_delay=0)
+        racer = RacingProvider([("slow", loser), ("fast", FakeProvider(response=make_response("fast")))])
+
+        response = racer.get_options("list files", "context")
+        time.sleep(0.4)
+
+        assert response.commands[0].command == "fast"
+        assert slow.cancelled
+        assert breaker.retry_in("slow") == 0
+        assert "unavailable" not in capsys.readouterr().out
+
+    def test_backends_keep_one_event_loop_between_queries(self):
+        loops = []
+
+        class LoopRecorder(FakeProvider):
+            async def aget_options(self, prompt, context):
+                loops.append(asyncio.get_running_loop())
+                return make_response()
+
+        racer = RacingProvider([("a", LoopRecorder())])
+        racer.get_options("list files", "context")
+        racer.get_options("list files", "context")
+
+        assert loops[0] is loops[1]
+
+
+class TestAsyncRacingProvider:
+    def test_returns_fastest_and_cancels_the_rest(self, capsys):
+        slow = FakeProvider(delay=5.0, response=make_response("slow"))
+        fast = FakeProvider(delay=0.01, response=make_response("fast"))
+        racer = RacingProvider([("slow", slow), ("fast", fast)])
+
+        async def run():
+            response = await racer.aget_options("list files", "context")
+            await asyncio.sleep(0)  # let the cancellation reach the losing backend
+            return response
+
+        start = time.perf_counter()
+        response = asyncio.run(run())
+
+        assert response.commands[0].command == "fast"
+        assert slow.cancelled
+        assert time.perf_counter() - start < 1.0
+        assert "slow: cancelled" in capsys.readouterr().out
+
+    def test_hedged_backend_starts_after_delay(self):
+        first = FakeProvider(delay=5.0, response=make_response("first"))
+        second = FakeProvider(delay=0.01, response=make_response("second"))
+        racer = RacingProvider([("first", first), ("second", second)], hedge_delay=0.05)
+
+        response = asyncio.run(racer.aget_options("list files", "context"))
+
+        assert response.commands[0].command == "second"
+        assert racer.last_winner == "second"
+
+    def test_concurrent_races_do_not_interfere(self):
+        racer = RacingProvider([("a", FakeProvider(delay=0.02, response=make_response("a")))])
+
+        async def run():
+            return await asyncio.gather(*(racer.aget_options(f"query {i}", "context") for i in range(10)))
+
+        responses = asyncio.run(run())
+
+        assert [r.commands[0].command for r in responses] == ["a"] * 10
+
+
+class TestRaceConfiguration:
+    @patch("zev.llms.llm.create_provider")
+    @patch("zev.llms.llm.config")
+    def test_builds_racing_provider_from_config(self, mock_config, mock_create_provider):
+        mock_config.race_providers = [("openai", "gpt-4o-mini"), ("gemini", "gemini-2.0-flash")]
+        mock_config.race_hedge_delay_seconds = 0.25
+        mock_create_provider.return_value = MagicMock()
+
+        from zev.llms.llm import get_backend_description, get_inference_provider
+
+        provider = get_inference_provider()
+
+        assert isinstance(provider, RacingProvider)
+        assert [label for label, _ in provider.backends] == ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"]
+        assert provider.hedge_delay == 0.25
+        mock_create_provider.assert_any_call("gemini", "gemini-2.0-flash")
+        assert get_backend_description() == ("race", "openai/gpt-4o-mini,gemini/gemini-2.0-flash")
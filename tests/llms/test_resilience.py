@@ -0,0 +1,348 @@
+import asyncio
+import threading
+import time
+from email.utils import formatdate
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.resilience import (
+    CircuitBreaker,
+    ResilientProvider,
+    RetryableError,
+    attempt_timeout,
+    parse_retry_after,
+)
+from zev.llms.types import Command, OptionsResponse
+
+RESPONSE = OptionsResponse(
+    commands=[Command(command="ls", short_explanation="List", is_dangerous=False)], is_valid=True
+)
+
+
+class FlakyProvider(InferenceProvider):
+    """Fails with the given errors, in order, then succeeds."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def get_options(self, prompt, context):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return RESPONSE
+
+    async def aget_options(self, prompt, context):
+        return self.get_options(prompt, context)
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    with patch("zev.llms.resilience.Path.home", return_value=tmp_path):
+        yield CircuitBreaker(threshold=2, cooldown_seconds=60)
+
+
+@pytest.fixture
+def sleeps():
+    with patch("zev.llms.resilience.time.sleep") as mock_sleep:
+        yield mock_sleep
+
+
+def make_resilient(provider, breaker, **kwargs):
+    options = {"deadline": 30, "max_retries": 2, "base_delay": 0.5, "max_delay": 8}
+    options.update(kwargs)
+    return ResilientProvider(provider, "openai", breaker, **options)
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after({"Retry-After": "3"}) == 3
+
+    def test_milliseconds(self):
+        assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+
+    def test_http_date(self):
+        delay = parse_retry_after({"retry-after": formatdate(time.time() + 30, usegmt=True)})
+        assert 25 <= delay <= 30
+
+    def test_missing_or_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after({"Retry-After": "soon"}) is None
+
+
+class TestResilientProvider:
+    def test_retries_until_success(self, breaker, sleeps):
+        provider = FlakyProvider([RetryableError("HTTP 503"), RetryableError("HTTP 503")])
+
+        assert make_resilient(provider, breaker).get_options("list files", "ctx") == RESPONSE
+        assert provider.calls == 3
+        assert sleeps.call_count == 2
+        # exponential with full jitter: at most base_delay, then 2 * base_delay
+        assert sleeps.call_args_list[0][0][0] <= 0.5
+        assert sleeps.call_args_list[1][0][0] <= 1.0
+
+    def test_honors_retry_after(self, breaker, sleeps):
+        provider = FlakyProvider([RetryableError("HTTP 429", retry_after=7)])
+
+        make_resilient(provider, breaker).get_options("list files", "ctx")
+
+        sleeps.assert_called_once_with(7)
+
+    def test_gives_up_after_max_retries(self, breaker, sleeps, capsys):
+        provider = FlakyProvider([RetryableError("HTTP 500")] * 5)
+
+        assert make_resilient(provider, breaker, max_retries=1).get_options("list files", "ctx") is None
+        assert provider.calls == 2
+        assert "openai is unavailable after 2 attempts: HTTP 500" in capsys.readouterr().out
+
+    def test_does_not_retry_past_deadline(self, breaker, sleeps):
+        provider = FlakyProvider([RetryableError("HTTP 429", retry_after=60)])
+
+        assert make_resilient(provider, breaker, deadline=10).get_options("list files", "ctx") is None
+        assert provider.calls == 1
+        sleeps.assert_not_called()
+
+    def test_non_retryable_errors_propagate(self, breaker):
+        provider = FlakyProvider([ValueError("bad request")])
+
+        with pytest.raises(ValueError):
+            make_resilient(provider, breaker).get_options("list files", "ctx")
+
+    def test_stream_is_not_retried_after_commands_were_shown(self, breaker, sleeps):
+        provider = MagicMock()
+
+        def stream(prompt, context, on_command):
+            on_command(RESPONSE.commands[0])
+            raise RetryableError("connection reset")
+
+        provider.stream_options.side_effect = stream
+        seen = []
+
+        assert make_resilient(provider, breaker).stream_options("list files", "ctx", seen.append) is None
+        assert len(seen) == 1
+        assert provider.stream_options.call_count == 1
+
+    def test_async_deadline_cancels_hung_attempt(self, breaker, capsys):
+        provider = MagicMock()
+
+        async def hang(prompt, context):
+            await asyncio.sleep(10)
+
+        provider.aget_options = hang
+        resilient = make_resilient(provider, breaker, deadline=0.05)
+
+        start = time.perf_counter()
+        assert asyncio.run(resilient.aget_options("list files", "ctx")) is None
+        assert time.perf_counter() - start < 1
+        assert "no response within 0.05s" in capsys.readouterr().out
+
+    def test_attempts_are_bounded_by_the_time_left(self, breaker, sleeps):
+        provider = FlakyProvider([RetryableError("HTTP 503")])
+        timeouts = []
+        get_options = provider.get_options
+
+        def record_timeouts(prompt, context):
+            timeouts.append(attempt_timeout(5, 60))
+            return get_options(prompt, context)
+
+        provider.get_options = record_timeouts
+        with patch("zev.llms.resilience.time.monotonic", side_effect=[100, 100, 100, 104, 104]):
+            make_resilient(provider, breaker, deadline=10).get_options("list files", "ctx")
+
+        assert timeouts == [(5, 10), (5, 6)]
+        assert attempt_timeout(5, 60) == (5, 60)
+
+    def test_async_attempts_are_bounded_by_the_time_left(self, breaker):
+        provider = MagicMock()
+        timeouts = []
+
+        async def record_timeouts(prompt, context):
+            timeouts.append(attempt_timeout(5, 60))
+            return RESPONSE
+
+        provider.aget_options = record_timeouts
+
+        asyncio.run(make_resilient(provider, breaker, deadline=2).aget_options("list files", "ctx"))
+
+        connect, read = timeouts[0]
+        assert 1 < connect <= 2
+        assert 1 < read <= 2
+
+    def test_warm_up_is_passed_through(self, breaker):
+        provider = MagicMock()
+
+        make_resilient(provider, breaker).warm_up()
+
+        provider.warm_up.assert_called_once()
+
+    def test_warm_up_skips_provider_with_open_circuit(self, breaker, capsys):
+        provider = MagicMock()
+        breaker.record_failure("openai")
+        breaker.record_failure("openai")
+
+        make_resilient(provider, breaker).warm_up()
+
+        provider.warm_up.assert_not_called()
+        assert capsys.readouterr().out == ""
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_skips_provider(self, breaker, sleeps, capsys):
+        failing = FlakyProvider([RetryableError("HTTP 503")] * 10)
+        resilient = make_resilient(failing, breaker, max_retries=0)
+
+        resilient.get_options("q", "ctx")
+        resilient.get_options("q", "ctx")
+        calls = failing.calls
+        assert resilient.get_options("q", "ctx") is None
+
+        assert failing.calls == calls
+        assert "Skipping openai" in capsys.readouterr().out
+
+    def test_state_persists_between_runs(self, breaker):
+        breaker.record_failure("gemini")
+        breaker.record_failure("gemini")
+
+        assert CircuitBreaker(threshold=2, cooldown_seconds=60).retry_in("gemini") > 0
+        assert CircuitBreaker(threshold=2, cooldown_seconds=60).retry_in("openai") == 0
+
+    def test_lets_a_query_through_after_cooldown_and_resets_on_success(self, breaker):
+        breaker.record_failure("openai")
+        breaker.record_failure("openai")
+
+        with patch("zev.llms.resilience.time.time", return_value=time.time() + 61):
+            assert breaker.retry_in("openai") == 0
+            make_resilient(FlakyProvider(), breaker).get_options("q", "ctx")
+
+        assert breaker.retry_in("openai") == 0
+        assert breaker._read() == {}
+
+    def test_lets_only_one_query_through_after_cooldown(self, breaker, capsys):
+        breaker.record_failure("openai")
+        breaker.record_failure("openai")
+        release = threading.Event()
+        provider = MagicMock()
+        provider.get_options.side_effect = lambda prompt, context: release.wait() and None
+        resilient = make_resilient(provider, breaker)
+
+        with patch("zev.llms.resilience.time.time", return_value=time.time() + 61):
+            probe = threading.Thread(target=resilient.get_options, args=("q", "ctx"))
+            probe.start()
+            while not provider.get_options.called:
+                time.sleep(0.005)
+            assert resilient.get_options("q", "ctx") is None
+            release.set()
+            probe.join()
+
+        provider.get_options.assert_called_once()
+        assert "Skipping openai" in capsys.readouterr().out
+
+    def test_read_only_home_only_forgets_failures(self, breaker):
+        with patch("zev.llms.resilience.tempfile.mkstemp", side_effect=PermissionError("read-only")):
+            breaker.record_failure("openai")
+            breaker.record_failure("openai")
+
+        assert breaker.retry_in("openai") == 0
+
+    @patch("zev.llms.llm.create_provider")
+    @patch("zev.llms.llm.config")
+    def test_is_keyed_on_the_backend_with_its_model(self, mock_config, mock_create_provider, breaker):
+        from zev.llms.llm import get_default_provider
+
+        mock_config.race_providers = []
+        mock_config.llm_provider = "openai"
+        mock_config.llm_model = "gpt-4o"
+
+        assert get_default_provider().name == "openai/gpt-4o"
+
+
+class TestProviderTimeouts:
+    @patch("zev.llms.openai.provider.OpenAI")
+    @patch("zev.llms.openai.provider.config")
+    def test_openai_request_gets_the_time_left(self, mock_config, mock_openai_class, breaker):
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+        mock_config.connect_timeout = 5
+        mock_config.read_timeout = 60
+        parse = mock_openai_class.return_value.beta.chat.completions.parse
+        parse.return_value.choices[0].message.parsed = None
+
+        from zev.llms.openai.provider import OpenAIProvider
+
+        make_resilient(OpenAIProvider(), breaker, deadline=3).get_options("list files", "OS: Linux")
+
+        timeout = parse.call_args.kwargs["timeout"]
+        assert 2 < timeout.read <= 3
+        assert 2 < timeout.connect <= 3
+
+    @patch("zev.llms.gemini.provider.get_shared_client")
+    @patch("zev.llms.gemini.provider.config")
+    def test_gemini_request_gets_the_time_left(self, mock_config, mock_get_client, breaker):
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_config.connect_timeout = 5
+        mock_config.read_timeout = 60
+        mock_get_client.return_value.post.side_effect = ValueError("stop here")
+
+        from zev.llms.gemini.provider import GeminiProvider
+
+        make_resilient(GeminiProvider(), breaker, deadline=8).get_options("disk usage", "OS: Linux")
+
+        timeout = mock_get_client.return_value.post.call_args.kwargs["timeout"]
+        assert timeout.connect == 5
+        assert 7 < timeout.read <= 8
+
+
+class TestProviderErrors:
+    @patch("zev.llms.openai.provider.OpenAI")
+    @patch("zev.llms.openai.provider.config")
+    def test_openai_rate_limit_is_retryable(self, mock_config, mock_openai_class):
+        from openai import RateLimitError
+
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4"
+        mock_openai_class.return_value.beta.chat.completions.parse.side_effect = RateLimitError(
+            message="Rate limit reached", response=MagicMock(status_code=429, headers={"retry-after": "2"}), body={}
+        )
+
+        from zev.llms.openai.provider import OpenAIProvider
+
+        with pytest.raises(RetryableError) as exc_info:
+            OpenAIProvider().get_options("list files", "OS: Linux")
+        assert exc_info.value.retry_after == 2
+
+    @patch("zev.llms.gemini.provider.get_shared_client")
+    @patch("zev.llms.gemini.provider.config")
+    def test_gemini_server_error_is_retryable(self, mock_config, mock_get_client):
+        import httpx2
+
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_get_client.return_value.post.return_value = httpx2.Response(
+            503,
+            content=b'{"error": {"message": "The model is overloaded"}}',
+            headers={"Retry-After": "4"},
+            request=httpx2.Request("POST", "https://gemini"),
+        )
+
+        from zev.llms.gemini.provider import GeminiProvider
+
+        with pytest.raises(RetryableError, match="HTTP 503: The model is overloaded") as exc_info:
+            GeminiProvider().get_options("disk usage", "OS: Linux")
+        assert exc_info.value.retry_after == 4
+
+    @patch("zev.llms.gemini.provider.get_shared_client")
+    @patch("zev.llms.gemini.provider.config")
+    def test_gemini_timeout_is_retryable(self, mock_config, mock_get_client):
+        import httpx2
+
+        mock_config.gemini_api_key = "gemini-key"
+        mock_config.gemini_model = "gemini-pro"
+        mock_get_client.return_value.post.side_effect = httpx2.ReadTimeout("timed out")
+
+        from zev.llms.gemini.provider import GeminiProvider
+
+        with pytest.raises(RetryableError):
+            GeminiProvider().get_options("disk usage", "OS: Linux")
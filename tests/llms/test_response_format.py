@@ -0,0 +1,109 @@
+from zev.llms.response_format import ResponseFormat
+from zev.llms.types import Command, OptionsResponse
+
+# what GeminiProvider sent before the schema was generated from the response format
+LEGACY_GEMINI_SCHEMA = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": {
+            "commands": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "command": {"type": "STRING"},
+                        "short_explanation": {"type": "STRING"},
+                        "is_dangerous": {"type": "BOOLEAN"},
+                        "dangerous_explanation": {"type": "STRING"},
+                    },
+                    "required": ["command", "short_explanation", "is_dangerous"],
+                },
+            },
+            "is_valid": {"type": "BOOLEAN"},
+            "explanation_if_not_valid": {"type": "STRING"},
+        },
+        "required": ["commands", "is_valid"],
+    },
+}
+
+RESPONSE = {
+    "commands": [
+        {
+            "command": "rm -rf build",
+            "short_explanation": "Deletes the build directory",
+            "is_dangerous": True,
+            "dangerous_explanation": "Can't be undone",
+        }
+    ],
+    "is_valid": True,
+    "explanation_if_not_valid": None,
+}
+
+
+class TestResponseFormat:
+    def test_full_format_is_unchanged(self):
+        response_format = ResponseFormat()
+
+        assert response_format.model is OptionsResponse
+        assert response_format.gemini_schema() == LEGACY_GEMINI_SCHEMA
+        assert response_format.array_key == "commands"
+        assert "at most 3 options" in response_format.prompt("list files", "OS: Linux")
+
+    def test_compact_schema_uses_short_keys(self):
+        schema = ResponseFormat(compact=True, max_options=4).gemini_schema()["response_schema"]
+
+        assert set(schema["properties"]) == {"o", "ok", "why"}
+        assert set(schema["properties"]["o"]["items"]["properties"]) == {"c", "e", "d", "w"}
+        assert schema["properties"]["o"]["maxItems"] == 4
+
+    def test_compact_without_danger_fields(self):
+        response_format = ResponseFormat(compact=True, with_danger_fields=False)
+
+        assert set(response_format.model.model_fields) == {"o", "ok", "why"}
+        assert '"d"' not in response_format.prompt("list files", "OS: Linux")
+        assert response_format.encode(RESPONSE) == {
+            "o": [{"c": "rm -rf build", "e": "Deletes the build directory"}],
+            "ok": True,
+            "why": None,
+        }
+
+    def test_encode_and_parse_round_trip(self):
+        for response_format in (ResponseFormat(), ResponseFormat(compact=True)):
+            assert response_format.parse(response_format.encode(RESPONSE)) == OptionsResponse(**RESPONSE)
+
+    def test_parse_accepts_the_model(self):
+        response_format = ResponseFormat(compact=True)
+        parsed = response_format.model(o=[{"c": "ls", "e": "List", "d": False, "w": None}], ok=True, why=None)
+
+        assert response_format.parse(parsed).commands == [
+            Command(command="ls", short_explanation="List", is_dangerous=False)
+        ]
+
+    def test_parse_passes_on_a_missing_answer(self):
+        assert ResponseFormat().parse(None) is None
+
+    def test_parse_enforces_the_caps(self):
+        response_format = ResponseFormat(compact=True, max_options=2, max_explanation_chars=20)
+        command = {"c": "ls", "e": "Lists the files in the current directory, one per line", "d": False}
+
+        response = response_format.parse({"o": [command] * 3, "ok": True})
+
+        assert len(response.commands) == 2
+        assert response.commands[0].short_explanation == "Lists the files in…"
+
+    def test_full_format_keeps_long_explanations(self):
+        explanation = "Lists the files in the current directory, one per line, " * 3
+        command = {"command": "ls", "short_explanation": explanation, "is_dangerous": False}
+
+        response = ResponseFormat().parse({"commands": [command], "is_valid": True})
+
+        assert response.commands[0].short_explanation == explanation
+
+    def test_parse_fills_in_missing_danger_fields(self):
+        response = ResponseFormat(compact=True, with_danger_fields=False).parse(
+            {"o": [{"c": "ls", "e": "List"}], "ok": True, "why": None}
+        )
+
+        assert response.commands[0].is_dangerous is False
+        assert response.commands[0].dangerous_explanation is None
@@ -0,0 +1,172 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from zev.constants import RoutingTiers
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.routing import RoutingProvider, classify_query
+from zev.llms.types import Command, OptionsResponse
+
+
+def make_response(command="ls", is_valid=True):
+    return OptionsResponse(
+        commands=[Command(command=command, short_explanation="list", is_dangerous=False)] if is_valid else [],
+        is_valid=is_valid,
+        explanation_if_not_valid=None if is_valid else "not a command",
+    )
+
+
+class FakeProvider(InferenceProvider):
+    def __init__(self, response=None):
+        self.response = response
+        self.calls = 0
+        self.warmed_up = False
+
+    def get_options(self, prompt, context):
+        self.calls += 1
+        return self.response
+
+    async def aget_options(self, prompt, context):
+        self.calls += 1
+        return self.response
+
+    def warm_up(self):
+        self.warmed_up = True
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / ".zevrouting"
+    with patch("zev.llms.routing.get_log_path", return_value=path):
+        yield path
+
+
+def router(fast, large):
+    return RoutingProvider({RoutingTiers.SIMPLE: ("fast", fast), RoutingTiers.COMPLEX: ("large", large)})
+
+
+class TestClassifyQuery:
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "list files by size",
+            "show disk usage",
+            "kill the process on port 3000",
+            "what is my ip address",
+            "git undo last commit",
+        ],
+    )
+    def test_simple(self, query):
+        assert classify_query(query)[0] == RoutingTiers.SIMPLE
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "count lines in every python file then sort by count",
+            "find all python files modified in the last week and compress them into a tarball",
+            "extract the email column from users.csv with awk",
+            "ps aux | grep node",
+            "delete log files older than a week, except the ones in the archive folder",
+        ],
+    )
+    def test_complex(self, query):
+        assert classify_query(query)[0] == RoutingTiers.COMPLEX
+
+    def test_reports_the_features(self):
+        _, features = classify_query("run jq on each file then sort")
+
+        assert "multi-step: each, then" in features
+        assert "tools: jq" in features
+
+
+class TestRoutingProvider:
+    def test_simple_query_goes_to_the_fast_tier(self, log_path):
+        fast, large = FakeProvider(make_response("fast")), FakeProvider(make_response("large"))
+
+        response = router(fast, large).get_options("list files by size", "")
+
+        assert response.commands[0].command == "fast"
+        assert (fast.calls, large.calls) == (1, 0)
+
+    def test_complex_query_goes_to_the_large_tier(self, log_path):
+        fast, large = FakeProvider(make_response("fast")), FakeProvider(make_response("large"))
+
+        response = router(fast, large).get_options("ps aux | grep node", "")
+
+        assert response.commands[0].command == "large"
+        assert (fast.calls, large.calls) == (0, 1)
+
+    @pytest.mark.parametrize(
+        "fast_response",
+        [make_response(is_valid=False), OptionsResponse(commands=[], is_valid=True), None],
+    )
+    def test_escalates_when_the_fast_tier_has_no_answer(self, log_path, fast_response):
+        fast, large = FakeProvider(fast_response), FakeProvider(make_response("large"))
+
+        response = router(fast, large).get_options("list files by size", "")
+
+        assert response.commands[0].command == "large"
+        assert (fast.calls, large.calls) == (1, 1)
+
+    def test_logs_the_tier_that_served_each_query(self, log_path):
+        provider = router(FakeProvider(make_response(is_valid=False)), FakeProvider(make_response("large")))
+
+        provider.get_options("list files by size", "")
+        provider.get_options("ps aux | grep node", "")
+
+        first, second = [json.loads(line) for line in log_path.read_text().splitlines()]
+        assert first["query"] == "list files by size"
+        assert (first["classified"], first["tier"], first["model"], first["escalated"]) == (
+            "simple",
+            "complex",
+            "large",
+            True,
+        )
+        assert (second["classified"], second["tier"], second["escalated"]) == ("complex", "complex", False)
+        assert provider.last_route == second
+
+    def test_log_is_only_readable_by_the_user(self, log_path):
+        router(FakeProvider(make_response()), FakeProvider()).get_options("list files", "")
+
+        assert log_path.stat().st_mode & 0o777 == 0o600
+
+    def test_log_is_rotated_once_full(self, log_path):
+        log_path.write_text("old\n")
+        provider = router(FakeProvider(make_response()), FakeProvider())
+
+        with patch("zev.llms.routing.ROUTING_LOG_MAX_BYTES", 4):
+            provider.get_options("list files", "")
+
+        assert log_path.with_name(".zevrouting.1").read_text() == "old\n"
+        assert json.loads(log_path.read_text())["query"] == "list files"
+
+    def test_unwritable_log_is_ignored(self, tmp_path):
+        with patch("zev.llms.routing.get_log_path", return_value=tmp_path / "missing" / ".zevrouting"):
+            response = router(FakeProvider(make_response()), FakeProvider()).get_options("list files", "")
+
+        assert response.is_valid
+
+    def test_stream_options_escalates(self, log_path):
+        fast, large = FakeProvider(OptionsResponse(commands=[], is_valid=True)), FakeProvider(make_response("large"))
+        seen = []
+
+        router(fast, large).stream_options("list files by size", "", seen.append)
+
+        assert [command.command for command in seen] == ["large"]
+
+    def test_aget_options_escalates(self, log_path):
+        fast, large = FakeProvider(make_response(is_valid=False)), FakeProvider(make_response("large"))
+
+        response = asyncio.run(router(fast, large).aget_options("list files by size", ""))
+
+        assert response.commands[0].command == "large"
+        assert json.loads(log_path.read_text())["escalated"] is True
+
+    def test_warm_up_connects_to_the_fast_tier(self):
+        fast, large = FakeProvider(), FakeProvider()
+
+        router(fast, large).warm_up()
+
+        assert fast.warmed_up and not large.warmed_up
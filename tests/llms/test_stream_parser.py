@@ -0,0 +1,45 @@
+import json
+
+from zev.llms.stream_parser import CommandStreamParser
+
+RESPONSE = {
+    "commands": [
+        {"command": "echo '{not [a] brace}'", "short_explanation": 'Quotes "inside"', "is_dangerous": False},
+        {"command": "rm -rf build", "short_explanation": "Clean", "is_dangerous": True, "dangerous_explanation": "x"},
+    ],
+    "is_valid": True,
+    "explanation_if_not_valid": None,
+}
+
+
+class TestCommandStreamParser:
+    def test_emits_each_command_as_its_object_closes(self):
+        text = json.dumps(RESPONSE)
+        parser = CommandStreamParser()
+
+        emitted_at = []
+        for i, char in enumerate(text):
+            for command in parser.feed(char):
+                emitted_at.append((i, command))
+
+        assert [command for _, command in emitted_at] == RESPONSE["commands"]
+        first_close = text.index("}", text.index("Quotes"))
+        assert emitted_at[0][0] == first_close
+        assert parser.result() == RESPONSE
+
+    def test_handles_arbitrary_chunk_boundaries(self):
+        text = json.dumps(RESPONSE, indent=2)
+        for size in (1, 3, 7, 50, len(text)):
+            parser = CommandStreamParser()
+            commands = []
+            for start in range(0, len(text), size):
+                commands.extend(parser.feed(text[start : start + size]))
+            assert commands == RESPONSE["commands"]
+
+    def test_ignores_objects_outside_the_commands_array(self):
+        text = json.dumps({"meta": [{"command": "nope"}], "commands": [{"command": "ls"}], "is_valid": True})
+        assert CommandStreamParser().feed(text) == [{"command": "ls"}]
+
+    def test_supports_other_array_keys(self):
+        text = json.dumps({"c": [{"cmd": "ls"}], "v": True})
+        assert CommandStreamParser(array_key="c").feed(text) == [{"cmd": "ls"}]
@@ -0,0 +1,42 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zev.llms.warm_up import ProviderWarmUp
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path):
+    # no daemon socket unless a test says otherwise
+    with patch.object(Path, "home", return_value=tmp_path):
+        yield tmp_path
+
+
+class TestProviderWarmUp:
+    @patch("zev.llms.llm.get_inference_provider")
+    def test_builds_and_warms_up_the_provider(self, mock_get_provider):
+        warm_up = ProviderWarmUp()
+
+        assert warm_up.provider() is mock_get_provider.return_value
+        warm_up._thread.join(timeout=1)
+        mock_get_provider.return_value.warm_up.assert_called_once()
+
+    @patch("zev.llms.llm.get_inference_provider", side_effect=ValueError("OPENAI_API_KEY must be set."))
+    def test_provider_is_none_when_it_cannot_be_built(self, mock_get_provider):
+        assert ProviderWarmUp().provider() is None
+
+    @patch("zev.llms.llm.get_inference_provider")
+    def test_connection_errors_are_ignored(self, mock_get_provider):
+        mock_get_provider.return_value.warm_up.side_effect = ConnectionError("no network")
+
+        warm_up = ProviderWarmUp()
+        warm_up._thread.join(timeout=1)
+
+        assert warm_up.provider() is mock_get_provider.return_value
+
+    @patch("zev.llms.llm.get_inference_provider")
+    @patch("zev.daemon.is_daemon_running", return_value=True)
+    def test_nothing_to_warm_up_when_a_daemon_is_running(self, mock_running, mock_get_provider):
+        assert ProviderWarmUp().provider() is None
+        mock_get_provider.assert_not_called()
@@ -0,0 +1,134 @@
+import asyncio
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from zev.batch import load_checkpoint, read_queries, run_batch
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import Command, OptionsResponse
+from zev.reporting import report
+
+
+class FakeProvider(InferenceProvider):
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queries = []
+
+    def get_options(self, prompt, context):
+        raise AssertionError("batch mode should use aget_options")
+
+    async def aget_options(self, prompt, context):
+        self.queries.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if prompt == "explode":
+            raise RuntimeError("boom")
+        if prompt == "bad key":
+            report("Error: API key not valid")
+            return None
+        return OptionsResponse(
+            commands=[Command(command=f"echo {prompt}", short_explanation="echo", is_dangerous=False)], is_valid=True
+        )
+
+
+@pytest.fixture
+def provider():
+    provider = FakeProvider()
+    with (
+        patch("zev.llms.llm.get_inference_provider", return_value=provider),
+        patch("zev.env_context.get_env_context", return_value="OS: Linux"),
+    ):
+        yield provider
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestReadQueries:
+    def test_skips_blank_lines_and_trailing_question_marks(self, tmp_path):
+        path = tmp_path / "queries.txt"
+        path.write_text("list files?\n\n  disk usage  \n")
+
+        assert read_queries(str(path)) == ["list files", "disk usage"]
+
+    def test_reads_stdin(self):
+        with patch("sys.stdin", io.StringIO("one\ntwo\n")):
+            assert read_queries("-") == ["one", "two"]
+
+
+class TestRunBatch:
+    def test_writes_a_record_per_query(self, provider, tmp_path):
+        queries = tmp_path / "queries.txt"
+        queries.write_text("list files\ndisk usage\n")
+        output = tmp_path / "out.jsonl"
+
+        run_batch(str(queries), concurrency=2, output_path=str(output))
+
+        records = sorted(read_records(output), key=lambda r: r["index"])
+        assert [r["query"] for r in records] == ["list files", "disk usage"]
+        assert records[0]["response"]["commands"][0]["command"] == "echo list files"
+        assert all(r["error"] is None and r["latency_ms"] >= 0 for r in records)
+
+    def test_failures_are_isolated(self, provider, tmp_path, capsys):
+        queries = tmp_path / "queries.txt"
+        queries.write_text("explode\nbad key\nlist files\n")
+        output = tmp_path / "out.jsonl"
+
+        run_batch(str(queries), concurrency=3, output_path=str(output))
+
+        records = {r["query"]: r for r in read_records(output)}
+        assert records["explode"]["error"] == "RuntimeError: boom"
+        assert records["bad key"]["error"] == "Error: API key not valid"
+        assert records["list files"]["error"] is None
+        captured = capsys.readouterr()
+        assert "API key not valid" not in captured.out
+        assert "1 succeeded, 2 failed" in captured.err
+
+    def test_streams_jsonl_to_stdout(self, provider, tmp_path, capsys):
+        queries = tmp_path / "queries.txt"
+        queries.write_text("list files\n")
+
+        run_batch(str(queries), concurrency=1)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["query"] == "list files"
+
+    def test_limits_concurrency(self, provider, tmp_path):
+        queries = tmp_path / "queries.txt"
+        queries.write_text("\n".join(f"query {i}" for i in range(20)))
+
+        run_batch(str(queries), concurrency=4, output_path=str(tmp_path / "out.jsonl"))
+
+        assert provider.max_in_flight == 4
+        assert len(provider.queries) == 20
+
+    def test_resumes_from_checkpoint(self, provider, tmp_path, capsys):
+        queries = tmp_path / "queries.txt"
+        queries.write_text("explode\nlist files\ndisk usage\n")
+        output = tmp_path / "out.jsonl"
+        output.write_text(
+            json.dumps({"index": 1, "query": "list files", "response": None, "latency_ms": 1, "error": None})
+            + "\n"
+            + json.dumps({"index": 0, "query": "explode", "response": None, "latency_ms": 1, "error": "boom"})
+            + "\n"
+            + '{"index": 2, "query": "disk'  # cut short by a crash
+        )
+
+        assert load_checkpoint(output) == {(1, "list files")}
+
+        run_batch(str(queries), concurrency=2, output_path=str(output))
+
+        assert sorted(provider.queries) == ["disk usage", "explode"]
+        new_records = [json.loads(line) for line in output.read_text().splitlines()[3:]]
+        assert sorted(r["query"] for r in new_records) == ["disk usage", "explode"]
+        assert "1 already done" in capsys.readouterr().err
@@ -0,0 +1,42 @@
+import importlib.util
+from pathlib import Path
+
+RUN_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "run.py"
+
+
+def load_benchmarks():
+    spec = importlib.util.spec_from_file_location("benchmarks_run", RUN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestCompare:
+    def test_flags_slowdowns_beyond_tolerance(self):
+        run = load_benchmarks()
+        results = {
+            "latency": run.summarize([130.0], "ms"),
+            "steady": run.summarize([104.0], "ms"),
+            "throughput": run.summarize([70.0], "queries/s", higher_is_better=True),
+            "new": run.summarize([1.0], "ms"),
+        }
+        baseline = {
+            "latency": run.summarize([100.0], "ms"),
+            "steady": run.summarize([100.0], "ms"),
+            "throughput": run.summarize([100.0], "queries/s", higher_is_better=True),
+        }
+
+        rows = {row[0]: row for row in run.compare(results, baseline, tolerance=0.25)}
+
+        assert rows["latency"][3:] == ("+30%", True)
+        assert rows["steady"][3:] == ("+4%", False)
+        assert rows["throughput"][3:] == ("-30%", True)
+        assert rows["new"][2:] == (None, "", False)
+
+    def test_summarize_reports_median_and_p95(self):
+        run = load_benchmarks()
+        summary = run.summarize([float(i) for i in range(1, 101)], "ms")
+
+        assert summary["median"] == 50.5
+        assert summary["p95"] == 95.0
+        assert summary["samples"] == 100
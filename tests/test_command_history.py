@@ -1,10 +1,13 @@
+import multiprocessing
+import os
 import tempfile
+from itertools import islice
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from zev.command_history import CommandHistory, CommandHistoryEntry
+from zev.command_history import CommandHistory, CommandHistoryEntry, HistoryRecord
 from zev.llms.types import Command, OptionsResponse
 
 
@@ -33,8 +36,10 @@ class TestCommandHistory:
         with tempfile.NamedTemporaryFile(delete=False) as f:
             temp_path = Path(f.name)
         yield temp_path
-        if temp_path.exists():
-            temp_path.unlink()
+        for suffix in ("", ".count", ".lock"):
+            path = temp_path.with_name(temp_path.name + suffix)
+            if path.exists():
+                path.unlink()
 
     @pytest.fixture
     def history(self, temp_history_file):
@@ -71,6 +76,52 @@ class TestCommandHistory:
         assert entries[0].query == "query 5"
         assert entries[-1].query == "query 9"
 
+    def test_compacts_only_past_high_water_mark(self, history, temp_history_file):
+        history.max_entries = 5
+        response = make_response("test")
+
+        with patch.object(history, "_compact", wraps=history._compact) as mock_compact:
+            for i in range(10):
+                history.save_options(f"query {i}", response)
+            assert mock_compact.call_count == 0
+            assert len(temp_history_file.read_text().splitlines()) == 10
+
+            history.save_options("query 10", response)
+            assert mock_compact.call_count == 1
+
+        lines = temp_history_file.read_text().splitlines()
+        assert len(lines) == 5
+        assert history.get_history()[0].query == "query 6"
+        assert history.count_path.read_text() == "5"
+
+    def test_recounts_when_counter_is_missing(self, history, temp_history_file):
+        history.max_entries = 2
+        for i in range(4):
+            history.save_options(f"query {i}", make_response())
+        history.count_path.unlink()
+
+        history.save_options("query 4", make_response())
+
+        assert len(temp_history_file.read_text().splitlines()) == 2
+        assert [e.query for e in history.get_history()] == ["query 3", "query 4"]
+
+    @patch('zev.command_selector.show_options')
+    @patch('zev.command_history.questionary.select')
+    def test_selecting_a_line_cut_short_after_a_brace(
+        self, mock_select, mock_show_options, history, temp_history_file, capsys
+    ):
+        history.save_options("first", make_response())
+        with open(temp_history_file, "a", encoding="utf-8") as f:
+            f.write('{"query":"cut short","response":{"commands":[{"command":"ls","short_explanation":{}}\n')
+        mock_select.return_value.ask.side_effect = lambda: mock_select.call_args[1]['choices'][0].value
+
+        history.show_history()
+
+        assert mock_select.call_args[1]['choices'][0].title == "cut short"
+        assert "corrupt" in capsys.readouterr().out
+        mock_show_options.assert_not_called()
+        assert [e.query for e in history.get_history()] == ["first"]
+
     def test_preserves_entry_order(self, history):
         history.save_options("first", make_response("cmd1"))
         history.save_options("second", make_response("cmd2"))
@@ -82,14 +133,164 @@ class TestCommandHistory:
         assert entries[1].query == "second"
 
 
+    def test_skips_corrupt_lines(self, history, temp_history_file):
+        history.save_options("first", make_response())
+        with open(temp_history_file, "a", encoding="utf-8") as f:
+            f.write('not json\n{"query": "cut short", "response": {"comm')
+        history.save_options("second", make_response())
+
+        assert [e.query for e in history.get_history()] == ["first", "second"]
+        assert [r.query for r in history.iter_history_reverse()] == ["second", "first"]
+
+    def test_skips_a_line_cut_short_inside_a_multibyte_character(self, history, temp_history_file):
+        history.max_entries = 2
+        history.save_options("first", make_response())
+        line = CommandHistoryEntry(query="café ☕", response=make_response()).model_dump_json().encode("utf-8")
+        with open(temp_history_file, "ab") as f:
+            f.write(line[: line.index("☕".encode("utf-8")) + 1])
+
+        for i in range(4):
+            history.save_options(f"query {i}", make_response())
+
+        assert [e.query for e in history.get_history()] == ["query 2", "query 3"]
+        assert [r.query for r in history.iter_history_reverse()] == ["query 3", "query 2"]
+
+    def test_reverse_reader_skips_an_undecodable_last_line(self, history, temp_history_file):
+        history.save_options("first", make_response())
+        with open(temp_history_file, "ab") as f:
+            f.write('{"query":"caf'.encode("utf-8") + "é".encode("utf-8")[:1])
+
+        assert [r.query for r in history.iter_history_reverse()] == ["first"]
+        assert [e.query for e in history.get_history()] == ["first"]
+
+    def test_compaction_drops_corrupt_lines(self, history, temp_history_file):
+        history.max_entries = 2
+        history.save_options("query 0", make_response())
+        with open(temp_history_file, "a", encoding="utf-8") as f:
+            f.write("not json\n")
+        for i in range(1, 5):
+            history.save_options(f"query {i}", make_response())
+
+        assert len(temp_history_file.read_text().splitlines()) == 2
+        assert [e.query for e in history.get_history()] == ["query 3", "query 4"]
+
+
+def open_history(path: Path, max_entries: int) -> CommandHistory:
+    with patch.object(Path, 'home', return_value=path.parent):
+        history = CommandHistory()
+    history.path = path
+    history.max_entries = max_entries
+    return history
+
+
+def save_entries(path: Path, worker: int, count: int, max_entries: int, start=None) -> None:
+    history = open_history(path, max_entries)
+    if start is not None:
+        start.wait()
+    for i in range(count):
+        history.save_options(f"worker {worker} query {i}", make_response(f"echo {worker} {i}"))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+class TestConcurrentWrites:
+    WORKERS = 8
+    ENTRIES = 100
+
+    def run_workers(self, path: Path, max_entries: int) -> None:
+        context = multiprocessing.get_context("fork")
+        # released once every process is up, so that they all save at the same time
+        start = context.Event()
+        workers = [
+            context.Process(target=save_entries, args=(path, worker, self.ENTRIES, max_entries, start))
+            for worker in range(self.WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        start.set()
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+
+    def test_no_entries_are_lost(self, tmp_path):
+        path = tmp_path / ".zevhistory"
+
+        self.run_workers(path, max_entries=self.WORKERS * self.ENTRIES)
+
+        queries = [entry.query for entry in open_history(path, self.WORKERS * self.ENTRIES).get_history()]
+        assert len(queries) == self.WORKERS * self.ENTRIES
+        for worker in range(self.WORKERS):
+            mine = [query for query in queries if query.startswith(f"worker {worker} ")]
+            assert mine == [f"worker {worker} query {i}" for i in range(self.ENTRIES)]
+
+    def test_compaction_under_contention(self, tmp_path):
+        path = tmp_path / ".zevhistory"
+
+        # compacts every few saves, while the other processes keep appending
+        self.run_workers(path, max_entries=5)
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        queries = [CommandHistoryEntry.model_validate_json(line).query for line in lines]
+        assert 5 <= len(queries) <= 10
+        assert int(path.with_name(".zevhistory.count").read_text()) == len(queries)
+        # what's left is the tail of what was saved, so each worker's entries are its last ones, without gaps
+        for worker in range(self.WORKERS):
+            mine = [int(query.rsplit(" ", 1)[1]) for query in queries if query.startswith(f"worker {worker} ")]
+            assert mine == list(range(self.ENTRIES - len(mine), self.ENTRIES))
+        # no temporary files left behind by the compactions
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".zevhistory", ".zevhistory.count", ".zevhistory.lock"]
+
+
+class TestReverseHistoryReader:
+    @pytest.fixture
+    def history(self, tmp_path):
+        with patch.object(Path, 'home', return_value=tmp_path):
+            return CommandHistory()
+
+    def test_yields_newest_first_across_block_boundaries(self, history):
+        queries = [f"query {i} ✓" * (i % 7 + 1) for i in range(50)]
+        for query in queries:
+            history.save_options(query, make_response())
+
+        lines = list(history._read_lines_reverse(block_size=64))
+
+        assert [HistoryRecord.from_line(line).query for line in lines] == list(reversed(queries))
+
+    def test_only_decodes_queries_until_an_entry_is_picked(self, history):
+        for i in range(20):
+            history.save_options(f"query {i}", make_response(f"cmd {i}"))
+
+        validate = OptionsResponse.model_validate_json
+        with patch.object(OptionsResponse, 'model_validate_json', wraps=validate) as mock_validate:
+            records = list(islice(history.iter_history_reverse(), 6))
+            assert [r.query for r in records] == [f"query {i}" for i in range(19, 13, -1)]
+            assert mock_validate.call_count == 0
+
+            assert records[0].response.commands[0].command == "cmd 19"
+            assert mock_validate.call_count == 1
+
+    def test_record_falls_back_to_full_parse_for_other_layouts(self):
+        record = HistoryRecord.from_line('{"response": {"commands": [], "is_valid": false}, "query": "q"}')
+
+        assert record.query == "q"
+        assert record.response.is_valid is False
+
+    def test_limits_to_max_entries(self, history):
+        history.max_entries = 3
+        for i in range(5):
+            history.save_options(f"query {i}", make_response())
+
+        assert [r.query for r in history.iter_history_reverse()] == ["query 4", "query 3", "query 2"]
+
+
 class TestCommandHistoryDisplay:
     @pytest.fixture
     def temp_history_file(self):
         with tempfile.NamedTemporaryFile(delete=False) as f:
             temp_path = Path(f.name)
         yield temp_path
-        if temp_path.exists():
-            temp_path.unlink()
+        for path in (temp_path, temp_path.with_name(temp_path.name + ".count")):
+            if path.exists():
+                path.unlink()
 
     @pytest.fixture
     def history(self, temp_history_file):
@@ -138,3 +339,15 @@ class TestCommandHistoryDisplay:
         choices = call_args[1]['choices']
         choice_values = [c.value if hasattr(c, 'value') else str(c) for c in choices]
         assert "show_more" in choice_values
+
+    @patch('zev.command_history.questionary.select')
+    def test_display_accepts_lazy_entries(self, mock_select, history):
+        entries = (CommandHistoryEntry(query=f"query{i}", response=make_response()) for i in range(10))
+        mock_select.return_value.ask.return_value = "show_more"
+
+        history.display_history_options(entries, show_limit=5)
+
+        first_choices = mock_select.call_args_list[0][1]['choices']
+        all_choices = mock_select.call_args_list[1][1]['choices']
+        assert [c.title for c in first_choices[:6]] == [f"query{i}" for i in range(5)] + ["Show more..."]
+        assert [c.title for c in all_choices[:10]] == [f"query{i}" for i in range(10)]
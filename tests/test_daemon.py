@@ -0,0 +1,133 @@
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zev import daemon
+from zev.llms.types import Command, OptionsResponse
+from zev.reporting import report, reports_to
+
+
+def make_response(command_str: str = "ls") -> OptionsResponse:
+    return OptionsResponse(
+        commands=[Command(command=command_str, short_explanation="Test", is_dangerous=False)],
+        is_valid=True,
+    )
+
+
+@pytest.fixture
+def home():
+    # Unix socket paths are limited to ~100 characters, so avoid pytest's long tmp_path
+    path = Path(tempfile.mkdtemp(prefix="zev"))
+    with patch.object(Path, "home", return_value=path):
+        yield path
+    shutil.rmtree(path)
+
+
+@pytest.fixture
+def provider():
+    return MagicMock()
+
+
+@pytest.fixture
+def server(home, provider):
+    server = daemon.DaemonServer(daemon.get_socket_path(), provider)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestDaemon:
+    def test_raises_unavailable_when_no_daemon_is_running(self, home):
+        with pytest.raises(daemon.DaemonUnavailable):
+            daemon.request_options("list files", "OS: Linux")
+
+    def test_raises_unavailable_for_a_socket_left_behind(self, home):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(str(daemon.get_socket_path()))
+
+        with pytest.raises(daemon.DaemonUnavailable):
+            daemon.request_options("list files", "OS: Linux")
+
+    def test_round_trips_query_through_provider(self, server, provider):
+        provider.get_options.return_value = make_response("ls -la")
+
+        response = daemon.request_options("list files", "OS: Linux")
+
+        assert response.commands[0].command == "ls -la"
+        provider.get_options.assert_called_once_with(prompt="list files", context="OS: Linux")
+
+    def test_streams_commands_to_client(self, server, provider):
+        def stream_options(prompt, context, on_command):
+            on_command(Command(command="pwd", short_explanation="Where", is_dangerous=False))
+            return make_response("pwd")
+
+        provider.stream_options.side_effect = stream_options
+        seen = []
+
+        response = daemon.request_options("where am i", "OS: Linux", on_command=seen.append)
+
+        assert [cmd.command for cmd in seen] == ["pwd"]
+        assert response.commands[0].command == "pwd"
+
+    def test_forwards_provider_reports_to_client(self, server, provider, capsys):
+        def get_options(prompt, context):
+            report("Error: bad API key")
+            return None
+
+        provider.get_options.side_effect = get_options
+        client_reports = []
+        with reports_to(client_reports.append):
+            response = daemon.request_options("list files", "OS: Linux")
+
+        assert response is None
+        assert client_reports == ["Error: bad API key"]
+        # nothing is printed in the daemon's own terminal
+        assert capsys.readouterr().out == ""
+
+    def test_drops_replies_to_a_client_that_is_gone(self):
+        handler = daemon.DaemonRequestHandler.__new__(daemon.DaemonRequestHandler)
+        for error in (BrokenPipeError, ConnectionResetError):
+            handler.wfile = MagicMock()
+            handler.wfile.write.side_effect = error
+
+            handler._send({"response": None})
+
+    def test_reports_provider_exceptions(self, server, provider, capsys):
+        provider.get_options.side_effect = ValueError("OPENAI_API_KEY must be set")
+
+        assert daemon.request_options("list files", "OS: Linux") is None
+        assert "OPENAI_API_KEY must be set" in capsys.readouterr().out
+
+    def test_ignores_empty_and_invalid_requests(self, server, provider, capsys):
+        for payload in (b"", b"not json\n", b"[1, 2]\n"):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(str(daemon.get_socket_path()))
+                sock.sendall(payload)
+                sock.shutdown(socket.SHUT_WR)
+                assert sock.recv(1024) == b""
+        provider.get_options.return_value = make_response()
+
+        assert daemon.request_options("list files", "OS: Linux") is not None
+        assert "Traceback" not in capsys.readouterr().err
+
+    def test_gives_up_waiting_after_the_deadline(self, server, provider, capsys):
+        provider.get_options.side_effect = lambda prompt, context: time.sleep(1)
+
+        with patch("zev.config.config") as mock_config, patch.object(daemon, "RESPONSE_GRACE_SECONDS", 0):
+            mock_config.request_deadline = 0.1
+            start = time.perf_counter()
+            assert daemon.request_options("list files", "OS: Linux") is None
+
+        assert time.perf_counter() - start < 0.9
+        assert "didn't answer within 0.1s" in capsys.readouterr().out
+
+    def test_detects_running_daemon(self, server, home):
+        assert daemon.is_daemon_running(daemon.get_socket_path())
@@ -0,0 +1,106 @@
+import pytest
+
+from zev.danger import check_response, classify, mark_dangerous
+from zev.llms.types import Command, OptionsResponse
+
+
+def command(text, is_dangerous=False, dangerous_explanation=None):
+    return Command(
+        command=text, short_explanation="", is_dangerous=is_dangerous, dangerous_explanation=dangerous_explanation
+    )
+
+
+class TestClassify:
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "rm -rf build",
+            "sudo rm -r /tmp/x",
+            "find . -name '*.log' | xargs rm -f",
+            "git reset --hard HEAD~1",
+            "git clean -fd",
+            "git checkout -- .",
+            "git push --force origin main",
+            "git branch -D feature",
+            "dd if=/dev/zero of=/dev/sdb bs=1M",
+            "sudo mkfs.ext4 /dev/sdb1",
+            "chmod -R 777 .",
+            "sudo chown -R me:me /srv",
+            "find . -name '*.pyc' -delete",
+            "curl -fsSL https://example.com/install.sh | sh",
+            "kill -9 1234",
+            "docker system prune -a",
+            "psql -c 'DROP TABLE users'",
+            "sed -i 's/foo/bar/g' config.txt",
+            "find . -name '*.tmp' -exec echo {} \\; -delete",
+        ],
+    )
+    def test_dangerous(self, text):
+        assert classify(text)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "ls -la",
+            "rm notes.txt",
+            "git status",
+            "git reset HEAD~1",
+            "git checkout main",
+            "git push origin main",
+            "git branch -d merged",
+            "docker rm old-container",
+            "chmod +x run.sh",
+            "find . -type f -size +100M",
+            "du -sh * | sort -rh | head -n 20",
+            "ps aux --sort=-%mem | head -n 10",
+            "curl -s https://ifconfig.me",
+            "ls > /dev/null 2>&1",
+            "echo 'a > b'",
+            # a flag further down a pipeline or after a separator belongs to another command
+            "sed -n 1p file | grep -i foo",
+            "git log --oneline | grep -i fix",
+            "git status && git branch -a | grep -D x",
+            "find . -name '*.log'; ls -delete",
+        ],
+    )
+    def test_safe(self, text):
+        assert classify(text) is None
+
+    def test_redirect_over_existing_file(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "notes.txt").write_text("keep me")
+
+        assert "overwrites notes.txt" in classify("echo hi > notes.txt")
+        assert classify("echo hi >> notes.txt") is None
+        assert classify("echo hi > new.txt") is None
+
+    def test_explains_every_rule_that_matches(self):
+        explanation = classify("git reset --hard && rm -rf build")
+
+        assert "git reset --hard" in explanation
+        assert "rm -r/-f" in explanation
+
+
+class TestMarkDangerous:
+    def test_marks_matching_commands(self):
+        marked = mark_dangerous([command("ls"), command("rm -rf build")])
+
+        assert not marked[0].is_dangerous
+        assert marked[1].is_dangerous
+        assert "rm -r/-f" in marked[1].dangerous_explanation
+
+    def test_keeps_the_models_explanation(self):
+        marked = mark_dangerous([command("rm -rf build", True, "Deletes the build directory.")])
+
+        assert marked[0].dangerous_explanation == "Deletes the build directory."
+
+    def test_keeps_commands_the_model_flagged(self):
+        marked = mark_dangerous([command("some-custom-wipe", True, "Wipes everything.")])
+
+        assert marked[0].is_dangerous
+
+    def test_check_response_handles_missing_and_invalid_responses(self):
+        invalid = OptionsResponse(commands=[], is_valid=False, explanation_if_not_valid="unclear")
+
+        assert check_response(None) is None
+        assert check_response(invalid) is invalid
@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zev import env_context
+from zev.env_context import ContextProbes, get_env_context, static_part
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path):
+    with patch.object(Path, "home", return_value=tmp_path):
+        yield tmp_path
+
+
+class TestGetEnvContext:
+    def test_includes_os_and_shell_when_shell_is_set(self):
+        with patch.dict(os.environ, {"SHELL": "/bin/bash"}, clear=False):
+            with patch("platform.platform", return_value="Linux-5.4.0"):
+                result = get_env_context()
+                assert "OS: Linux-5.4.0" in result
+                assert "SHELL: /bin/bash" in result
+
+    def test_returns_os_only_when_no_shell_available(self):
+        env = os.environ.copy()
+        env.pop("SHELL", None)
+        env.pop("COMSPEC", None)
+        with patch.dict(os.environ, env, clear=True):
+            with patch("platform.platform", return_value="Darwin-21.0"):
+                result = get_env_context()
+                assert "OS: Darwin-21.0" in result
+                assert "SHELL" not in result
+
+    def test_uses_comspec_on_windows_when_shell_not_set(self):
+        env = {"COMSPEC": "C:\\Windows\\System32\\cmd.exe"}
+        with patch.dict(os.environ, env, clear=True):
+            with patch("platform.platform", return_value="Windows-10"):
+                result = get_env_context()
+                assert "Windows-10" in result
+                assert "SHELL: C:\\Windows\\System32\\cmd.exe" in result
+
+    def test_includes_cwd_and_git_repo(self, tmp_path):
+        (tmp_path / ".git").mkdir()
+        (tmp_path / "src").mkdir()
+        with patch("os.getcwd", return_value=str(tmp_path / "src")):
+            result = get_env_context()
+
+        assert f"CWD: {tmp_path / 'src'}" in result
+        assert "IN GIT REPO: yes" in result
+
+
+class TestStaticContext:
+    def test_platform_is_probed_once_per_boot(self, home):
+        with patch("platform.platform", return_value="Linux-6.1") as mock_platform:
+            get_env_context()
+            get_env_context()
+
+        assert mock_platform.call_count == 1
+        assert json.loads((home / ".zevcontext").read_text())["context"]["OS"] == "Linux-6.1"
+
+    @pytest.mark.parametrize("changed", ["_boot_id", "_os_release", "_shell"])
+    def test_recomputed_when_boot_os_or_shell_changes(self, changed):
+        with patch("platform.platform", return_value="Linux-6.1"):
+            get_env_context()
+        with (
+            patch.object(env_context, changed, return_value="changed"),
+            patch("platform.platform", return_value="Linux-6.2"),
+        ):
+            assert "OS: Linux-6.2" in get_env_context()
+
+    def test_corrupt_cache_is_ignored(self, home):
+        (home / ".zevcontext").write_text("{not json")
+        with patch("platform.platform", return_value="Linux-6.1"):
+            assert "OS: Linux-6.1" in get_env_context()
+
+
+class TestContextProbes:
+    def test_slow_probes_are_left_out(self):
+        with patch.object(env_context, "_probe_package_manager", side_effect=lambda: time.sleep(1) or "apt"):
+            start = time.monotonic()
+            context = ContextProbes(budget_seconds=0.05).result()
+
+        assert time.monotonic() - start < 0.5
+        assert "PACKAGE MANAGER" not in context
+        assert context["IN GIT REPO"] in ("yes", "no")
+
+    def test_failing_probe_is_left_out(self):
+        with patch.object(env_context, "_probe_package_manager", side_effect=OSError("boom")):
+            context = ContextProbes().result()
+
+        assert "PACKAGE MANAGER" not in context
+        assert "CWD" in context
+
+
+class TestStaticPart:
+    def test_keeps_only_os_and_shell(self):
+        context = "OS: Linux\nSHELL: /bin/zsh\nCWD: /home/me/project\nIN GIT REPO: yes\nINSTALLED TOOLS: rg, jq"
+
+        assert static_part(context) == "OS: Linux\nSHELL: /bin/zsh"
+
+    def test_same_for_probes_that_did_or_did_not_make_the_budget(self):
+        assert static_part("OS: Linux\nSHELL: /bin/sh\nPACKAGE MANAGER: apt") == static_part(
+            "OS: Linux\nSHELL: /bin/sh"
+        )
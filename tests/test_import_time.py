@@ -0,0 +1,82 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+# Per entry path: (argv, budget, modules that must not be imported). Import times are the sum of self-times
+# reported by `python -X importtime` for every module imported on top of a bare interpreter. Absolute times vary
+# too much between machines (and between runs on a busy one) for a fixed budget, so a budget is a ratio to the
+# time a reference import takes in the same test run: (reference import, ratio).
+# `--version` and `--help` have to cost well under importing rich, which they exist to avoid. `--recent` has to
+# render a questionary menu, so questionary (with prompt_toolkit) sets its floor. It reads .zevrc for
+# HISTORY_MAX_ENTRIES, but from the config snapshot, so without importing dotenv.
+ENTRY_PATHS = {
+    "version": (["--version"], ("rich.console", 0.75), ["rich", "questionary", "pydantic", "dotenv", "openai"]),
+    "help": (["--help"], ("rich.console", 0.75), ["rich", "questionary", "pydantic", "dotenv", "openai"]),
+    "recent": (["--recent"], ("questionary", 3), ["rich", "openai", "pyperclip", "dotenv"]),
+}
+
+MEASURE_ATTEMPTS = 5
+
+
+def measure_imports(code: str, home) -> dict[str, int]:
+    env = {**os.environ, "HOME": str(home)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports[match.group(4)] = int(match.group(1))
+    return imports
+
+
+@pytest.fixture(scope="module")
+def home(tmp_path_factory):
+    home = tmp_path_factory.mktemp("home")
+    (home / ".zevrc").write_text("LLM_PROVIDER=openai\n")
+    # the first run after .zevrc changes parses it and writes the snapshot; it's the later ones that count
+    measure_imports("from zev.config import config; config.vals", home)
+    return home
+
+
+@pytest.fixture(scope="module")
+def interpreter_imports(home):
+    return measure_imports("pass", home)
+
+
+def best_import_time(code: str, home, interpreter_imports, budget_us: float = 0, check=None) -> int:
+    """The least time the code spent importing modules over a few runs, stopping early once within budget_us."""
+    # timings are noisy on a busy machine, so take the best of a few runs before calling it over budget
+    best = None
+    for _ in range(MEASURE_ATTEMPTS):
+        imports = measure_imports(code, home)
+        added = {name: self_us for name, self_us in imports.items() if name not in interpreter_imports}
+        if check:
+            check(added)
+        total = sum(added.values())
+        best = total if best is None else min(best, total)
+        if best <= budget_us:
+            break
+    return best
+
+
+@pytest.mark.parametrize("path", ENTRY_PATHS.keys())
+def test_entry_path_import_budget(path, home, interpreter_imports):
+    argv, (reference, ratio), forbidden = ENTRY_PATHS[path]
+    code = f"import sys; sys.argv = ['zev'] + {argv!r}; from zev.main import app; app()"
+    budget_us = ratio * best_import_time(f"import {reference}", home, interpreter_imports)
+
+    def check_forbidden(added):
+        loaded_forbidden = [name for name in added if name.split(".")[0] in forbidden]
+        assert not loaded_forbidden, f"`zev {' '.join(argv)}` imported {sorted(set(loaded_forbidden))}"
+
+    total_us = best_import_time(code, home, interpreter_imports, budget_us, check_forbidden)
+    assert total_us <= budget_us, (
+        f"`zev {' '.join(argv)}` spent {total_us}us importing (budget {budget_us:.0f}us, {ratio}x `import {reference}`)"
+    )
@@ -0,0 +1,200 @@
+import gzip
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zev import knowledge
+from zev.knowledge import KnowledgeIndex, answer_locally, parse_man_summary, parse_man_usage, tokenize
+from zev.knowledge_corpus import CORPUS
+
+MAN_PAGE = """.TH LS 1
+.SH NAME
+ls \\- list directory contents
+.SH SYNOPSIS
+.B ls
+[\\fI\\,OPTION\\/\\fR]... [\\fI\\,FILE\\/\\fR]...
+"""
+
+CP_SYNOPSIS = """.SH SYNOPSIS
+.B cp
+[\\fI\\,OPTION\\/\\fR]... [\\fI\\,-T\\/\\fR] \\fI\\,SOURCE DEST\\/\\fR
+.br
+.B cp
+[\\fI\\,OPTION\\/\\fR]... \\fI\\,SOURCE\\/\\fR... \\fI\\,DIRECTORY\\/\\fR
+.SH DESCRIPTION
+"""
+
+MDOC_PAGE = """.Dd June 1, 2020
+.Dt UPTIME 1
+.Sh NAME
+.Nm uptime
+.Nd show how long system has been running
+.Sh SYNOPSIS
+.Nm
+.Op Fl p
+"""
+
+
+def write_man_page(directory, name, text):
+    path = directory / f"{name}.1.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(text)
+    return path
+
+
+@pytest.fixture
+def man_dir(tmp_path):
+    home = tmp_path / "home"
+    home.mkdir()
+    man1 = tmp_path / "man" / "man1"
+    man1.mkdir(parents=True)
+    write_man_page(man1, "ls", MAN_PAGE)
+    write_man_page(man1, "uptime", MDOC_PAGE)
+    write_man_page(man1, "reboot", ".SH NAME\nreboot \\- restart the machine\n.SH SYNOPSIS\n.B reboot\n")
+    (man1 / "alias.1").write_text(".so man1/ls.1\n")
+    path_index = MagicMock()
+    path_index.missing_binaries.return_value = []
+    with (
+        patch.object(Path, "home", return_value=home),
+        patch.dict(os.environ, {"MANPATH": str(tmp_path / "man")}),
+        patch("zev.path_index.get_path_index", return_value=path_index),
+    ):
+        yield man1, path_index
+
+
+class TestTokenize:
+    def test_drops_stopwords_and_normalizes_words(self):
+        assert tokenize("How do I find the biggest files in my folder?") == ["find", "large", "file", "directory"]
+
+
+class TestParseManSummary:
+    def test_man_macros(self):
+        assert parse_man_summary(MAN_PAGE) == "list directory contents"
+
+    def test_mdoc_macros(self):
+        assert parse_man_summary(MDOC_PAGE) == "show how long system has been running"
+
+    def test_page_without_name_section(self):
+        assert parse_man_summary(".TH FOO 1\nno name here\n") is None
+
+
+class TestParseManUsage:
+    def test_program_with_optional_arguments(self):
+        assert parse_man_usage(MAN_PAGE, "ls") == "ls"
+        assert parse_man_usage(".SH SYNOPSIS\n.B free\n.RI [ options ]\n", "free") == "free"
+
+    def test_program_that_needs_arguments(self):
+        assert parse_man_usage(CP_SYNOPSIS, "cp") is None
+
+    def test_git_subcommand(self):
+        synopsis = ".SH SYNOPSIS\n.sp\n.nf\n\\fIgit status\\fR [<options>] [--] [<pathspec>...]\n.fi\n"
+
+        assert parse_man_usage(synopsis, "git-status") == "git status"
+
+    def test_mdoc_macros(self):
+        assert parse_man_usage(MDOC_PAGE, "uptime") == "uptime"
+        assert parse_man_usage(".Sh SYNOPSIS\n.Nm ssh\n.Op Fl 46\n.Ar destination\n", "ssh") is None
+        assert parse_man_usage(".Sh SYNOPSIS\n.Nm cat\n.Oo\n.Ar file\n.Oc\n", "cat") == "cat"
+
+    def test_page_without_synopsis(self):
+        assert parse_man_usage(".SH NAME\nfoo \\- do things\n", "foo") is None
+
+
+class TestAnswerLocally:
+    def test_answers_common_query_from_corpus(self, man_dir):
+        response = answer_locally("show disk usage", min_confidence=0.9)
+
+        assert response.is_valid
+        assert response.commands[0].command == "df -h"
+        assert not response.commands[0].is_dangerous
+
+    def test_answers_only_with_commands_that_stay_local(self, man_dir):
+        with patch("zev.knowledge.sys.platform", "linux"):
+            response = answer_locally("what is my ip address", min_confidence=0.9)
+
+        assert response.commands[0].command == "ip -brief addr"
+        assert not any("ifconfig.me" in command for _, command, _ in CORPUS)
+
+    def test_queries_of_only_common_words_go_to_the_llm(self, man_dir):
+        assert answer_locally("show files", min_confidence=0.9) is None
+        assert answer_locally("list files", min_confidence=0.9) is None
+
+    def test_commands_with_placeholders_are_not_answers(self, man_dir):
+        # the best match is `wc -l {{path/to/file}}`, and the next best (counting files) answers something else
+        assert answer_locally("count lines in a file", min_confidence=0.9) is None
+
+    def test_man_pages_of_programs_that_need_arguments_are_not_answers(self, man_dir):
+        man1, _ = man_dir
+        write_man_page(man1, "cp", ".SH NAME\ncp \\- copy files and directories\n" + CP_SYNOPSIS)
+        knowledge.build_index()
+
+        assert answer_locally("copy files and directories", min_confidence=0.9) is None
+
+    def test_dangerous_commands_are_marked(self, man_dir):
+        knowledge.build_index()
+
+        response = answer_locally("restart the machine", min_confidence=0.9)
+
+        assert response.commands[0].command == "reboot"
+        assert response.commands[0].is_dangerous
+        assert "restarts the machine" in response.commands[0].dangerous_explanation
+
+    def test_unclear_or_negated_queries_go_to_the_llm(self, man_dir):
+        assert answer_locally("rename every jpeg by its exif date", min_confidence=0.9) is None
+        assert answer_locally("list files except hidden ones", min_confidence=0.9) is None
+
+    def test_skips_commands_whose_programs_are_missing(self, man_dir):
+        _, path_index = man_dir
+        path_index.missing_binaries.side_effect = lambda command: ["df"] if command.startswith("df") else []
+
+        assert answer_locally("show disk usage", min_confidence=0.9) is None
+
+    def test_man_pages_are_only_used_once_indexed(self, man_dir):
+        assert answer_locally("how long has the system been running", min_confidence=0.9) is None
+
+        knowledge.build_index()
+
+        response = answer_locally("how long has the system been running", min_confidence=0.9)
+        assert response.commands[0].command == "uptime"
+        assert response.commands[0].short_explanation == "Show how long system has been running"
+
+
+class TestKnowledgeIndex:
+    def test_refresh_only_reads_new_and_changed_pages(self, man_dir):
+        man1, _ = man_dir
+        index = KnowledgeIndex()
+        index.build(include_man_pages=True)
+        assert index.refresh() is False
+
+        write_man_page(
+            man1, "free", ".SH NAME\nfree \\- display amount of free and used memory\n.SH SYNOPSIS\n.B free\n"
+        )
+        os.utime(man1, (1, 1))  # make sure the mtime differs even on coarse-grained filesystems
+
+        with patch("zev.knowledge._read_man_page", wraps=knowledge._read_man_page) as mock_read:
+            assert index.refresh() is True
+
+        mock_read.assert_called_once_with(str(man1 / "free.1.gz"), "free")
+        reloaded = KnowledgeIndex()
+        assert reloaded.load()
+        assert ["free", "display amount of free and used memory"] in reloaded.data["docs"]
+        assert ["ls", "list directory contents"] in reloaded.data["docs"]
+
+    def test_read_only_home_is_skipped(self, man_dir):
+        index = KnowledgeIndex()
+        with patch("zev.knowledge.tempfile.mkstemp", side_effect=PermissionError("read-only")):
+            index.build(include_man_pages=False)
+
+        assert index.data["docs"]
+        assert not index.path.exists()
+
+    def test_rebuilds_when_corpus_changes(self, man_dir):
+        index = KnowledgeIndex()
+        index.build(include_man_pages=False)
+
+        with patch("zev.knowledge.CORPUS_VERSION", -1):
+            assert index.refresh() is True
+            assert index.refresh() is False
+        assert index.data["corpus_version"] == -1
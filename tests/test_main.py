@@ -1,4 +1,10 @@
-from unittest.mock import patch
+import time
+from pathlib import Path
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
+
+import pytest
+
+from zev.llms.types import Command, OptionsResponse
 
 
 class TestHandleSpecialCase:
@@ -60,3 +66,295 @@ class TestHandleSpecialCase:
             assert handle_special_case("--HELP") is True
             assert handle_special_case("--Help") is True
             assert handle_special_case("-H") is True
+
+
+class TestGetOptions:
+    @pytest.fixture
+    def env(self, tmp_path):
+        response = OptionsResponse(
+            commands=[Command(command="ls", short_explanation="List", is_dangerous=False)], is_valid=True
+        )
+        with patch.object(Path, "home", return_value=tmp_path), \
+                patch("zev.main.config") as mock_config, \
+                patch("zev.llms.llm.config", mock_config), \
+                patch("zev.main.get_command_history"), \
+                patch("zev.env_context.get_env_context", return_value="OS: Linux"), \
+                patch("zev.command_selector.show_options") as mock_show, \
+                patch("zev.llms.llm.get_inference_provider") as mock_get_provider:
+            mock_config.llm_provider = "openai"
+            mock_config.llm_model = "gpt-4o-mini"
+            mock_config.cache_ttl_seconds = 60
+            mock_config.cache_max_entries = 10
+            mock_config.stream_responses = False
+            mock_config.race_providers = []
+            mock_config.local_answers = False
+            mock_get_provider.return_value.get_options.return_value = response
+            yield mock_get_provider.return_value, mock_show
+
+    def test_repeated_query_is_served_from_cache(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+
+        get_options("list files")
+        get_options("List files?")
+
+        assert provider.get_options.call_count == 1
+        assert mock_show.call_count == 2
+
+    def test_no_cache_bypasses_cache(self, env):
+        from zev.main import get_options
+        provider, _ = env
+
+        get_options("list files")
+        get_options("list files", use_cache=False)
+
+        assert provider.get_options.call_count == 2
+
+    def test_streams_when_enabled(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        provider.stream_options.return_value = provider.get_options.return_value
+
+        with patch("zev.main.config.stream_responses", True):
+            get_options("list files", use_cache=False)
+
+        provider.stream_options.assert_called_once()
+        provider.get_options.assert_not_called()
+        mock_show.assert_called_once()
+
+    def test_failed_query_is_not_saved_to_history(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        provider.get_options.return_value = None
+
+        with patch("zev.main.get_command_history") as mock_history:
+            get_options("list files", use_cache=False)
+
+        mock_history.return_value.save_options.assert_not_called()
+        mock_show.assert_not_called()
+
+    def test_confident_local_answer_skips_the_provider(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        local = OptionsResponse(
+            commands=[Command(command="df -h", short_explanation="Disk usage", is_dangerous=False)], is_valid=True
+        )
+
+        with patch("zev.main.config.local_answers", True), \
+                patch("zev.knowledge.answer_locally", return_value=local) as mock_answer:
+            get_options("show disk usage", use_cache=False)
+
+        mock_answer.assert_called_once_with("show disk usage", ANY)
+        provider.get_options.assert_not_called()
+        assert [c.command for c in mock_show.call_args[0][0]] == ["df -h"]
+
+    def test_commands_needing_missing_tools_are_shown_last(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        provider.get_options.return_value = OptionsResponse(
+            commands=[
+                Command(command="zev-missing-tool -x", short_explanation="Missing", is_dangerous=False),
+                Command(command="echo hi", short_explanation="Builtin", is_dangerous=False),
+            ],
+            is_valid=True,
+        )
+
+        get_options("say hi", use_cache=False)
+
+        shown = mock_show.call_args[0][0]
+        assert [c.command for c in shown] == ["echo hi", "zev-missing-tool -x"]
+        assert shown[1].short_explanation == "Missing (not installed: zev-missing-tool)"
+
+    def test_prefetched_response_skips_the_provider(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        prefetched = MagicMock()
+        prefetched.result.return_value = OptionsResponse(
+            commands=[Command(command="ls -la", short_explanation="Prefetched", is_dangerous=False)], is_valid=True
+        )
+
+        get_options("list files", use_cache=False, prefetched=prefetched)
+
+        provider.get_options.assert_not_called()
+        assert [c.command for c in mock_show.call_args[0][0]] == ["ls -la"]
+
+    def test_failed_prefetch_falls_back_to_the_provider(self, env):
+        from zev.main import get_options
+        provider, mock_show = env
+        prefetched = MagicMock()
+        prefetched.result.return_value = None
+
+        get_options("list files", use_cache=False, prefetched=prefetched)
+
+        provider.get_options.assert_called_once()
+        mock_show.assert_called_once()
+
+    def test_dangerous_commands_are_marked_before_caching(self, env):
+        from zev.main import get_options
+        from zev.response_cache import ResponseCache
+        provider, mock_show = env
+        provider.get_options.return_value = OptionsResponse(
+            commands=[Command(command="git reset --hard", short_explanation="Reset", is_dangerous=False)],
+            is_valid=True,
+        )
+
+        get_options("undo my changes")
+        get_options("undo my changes")
+
+        for call in mock_show.call_args_list:
+            shown = call[0][0][0]
+            assert shown.is_dangerous
+            assert "git reset --hard" in shown.dangerous_explanation
+        assert provider.get_options.call_count == 1
+
+    def test_warm_provider_is_used(self, env):
+        from zev.main import get_options
+        provider, _ = env
+        warm_up = MagicMock()
+        warm = warm_up.provider.return_value
+        warm.get_options.return_value = provider.get_options.return_value
+
+        get_options("list files", use_cache=False, warm_up=warm_up)
+
+        warm.get_options.assert_called_once()
+        provider.get_options.assert_not_called()
+
+
+class TestSpeculativeFetch:
+    def test_sends_the_query_in_process_on_the_warm_provider(self):
+        import asyncio
+
+        from zev.main import speculative_fetch
+        warm_up = MagicMock()
+        warm = warm_up.provider.return_value
+        warm.aget_options = AsyncMock(return_value="response")
+
+        with patch("zev.env_context.get_env_context", return_value="OS: Linux"), \
+                patch("zev.daemon.request_options") as mock_request:
+            assert asyncio.run(speculative_fetch("list files", warm_up)) == "response"
+
+        warm.aget_options.assert_awaited_once_with(prompt="list files", context="OS: Linux")
+        mock_request.assert_not_called()
+
+
+class TestRunNoPrompt:
+    @patch("zev.main.get_options")
+    @patch("zev.main.config")
+    def test_prefetch_is_handed_to_get_options_when_enabled(self, mock_config, mock_get_options):
+        from zev.main import run_no_prompt
+        mock_config.speculative_prefetch = True
+        mock_config.prefetch_debounce_seconds = 0
+
+        def type_query(*args, on_change=None, **kwargs):
+            on_change("list files")
+            time.sleep(0.05)
+            return "list files"
+
+        with patch("zev.main.get_input_string", side_effect=type_query), \
+                patch("zev.llms.warm_up.ProviderWarmUp") as mock_warm_up, \
+                patch("zev.main.speculative_fetch", new_callable=AsyncMock, return_value="response") as mock_fetch:
+            run_no_prompt()
+
+        mock_fetch.assert_called_once_with("list files", mock_warm_up.return_value)
+        prefetched = mock_get_options.call_args.kwargs["prefetched"]
+        assert prefetched.result() == "response"
+
+    @patch("zev.main.get_options")
+    @patch("zev.main.config")
+    def test_no_prefetch_by_default(self, mock_config, mock_get_options):
+        from zev.main import run_no_prompt
+        mock_config.speculative_prefetch = False
+
+        with patch("zev.main.get_input_string", return_value="list files") as mock_input, \
+                patch("zev.llms.warm_up.ProviderWarmUp") as mock_warm_up:
+            run_no_prompt()
+
+        assert mock_input.call_args.kwargs["on_change"] is None
+        mock_get_options.assert_called_once_with(
+            "list files", use_cache=True, prefetched=None, warm_up=mock_warm_up.return_value
+        )
+
+    @patch("zev.main.get_options")
+    @patch("zev.main.config")
+    def test_provider_is_warmed_up_before_input(self, mock_config, mock_get_options):
+        from zev.main import run_no_prompt
+        mock_config.speculative_prefetch = False
+        calls = []
+
+        with patch("zev.llms.warm_up.ProviderWarmUp", side_effect=lambda: calls.append("warm up")), \
+                patch("zev.main.get_input_string", side_effect=lambda *a, **kw: calls.append("input") or "ls"):
+            run_no_prompt()
+
+        assert calls == ["warm up", "input"]
+
+
+class TestRecentSearch:
+    @patch('zev.main.command_history')
+    def test_recent_with_terms_searches_history(self, mock_history):
+        from zev.main import handle_special_case
+        assert handle_special_case(["--recent", "docker", "ps"]) is True
+        mock_history.show_history.assert_called_once_with(search_terms="docker ps")
+
+
+
+class TestBatchArgs:
+    @patch('zev.main.load_config_into_environ')
+    @patch('zev.batch.run_batch')
+    def test_batch_passes_options(self, mock_run_batch, mock_load, tmp_path):
+        from zev.main import handle_special_case
+
+        queries = tmp_path / "queries.txt"
+        queries.write_text("list files\n")
+        args = ["--batch", str(queries), "--concurrency", "4", "--output", "out.jsonl"]
+
+        assert handle_special_case(args) is True
+        mock_run_batch.assert_called_once_with(str(queries), 4, "out.jsonl")
+
+    @patch('zev.main.load_config_into_environ')
+    @patch('zev.batch.run_batch')
+    def test_batch_reads_stdin_by_default(self, mock_run_batch, mock_load):
+        from zev.main import config, handle_special_case
+
+        assert handle_special_case(["--batch"]) is True
+        mock_run_batch.assert_called_once_with("-", config.batch_concurrency, None)
+
+    @patch('zev.batch.run_batch')
+    def test_batch_rejects_invalid_concurrency(self, mock_run_batch, capsys):
+        from zev.main import handle_special_case
+
+        assert handle_special_case(["--batch", "-", "--concurrency", "zero"]) is True
+        mock_run_batch.assert_not_called()
+        assert "Invalid concurrency" in capsys.readouterr().out
+
+
+class TestInvalidConfig:
+    @pytest.fixture
+    def bad_config(self, tmp_path):
+        from zev.config import Config
+
+        (tmp_path / ".zevrc").write_text("LLM_PROVIDER=openai\nREAD_TIMEOUT=soon\n")
+        with patch.object(Path, "home", return_value=tmp_path):
+            config = Config()
+        with patch("zev.main.config", config), patch("zev.config.setup.config", config):
+            yield config
+
+    @patch('zev.main.get_options')
+    def test_bad_value_is_reported_without_a_traceback(self, mock_get_options, bad_config, capsys):
+        from zev.main import app
+
+        with patch("sys.argv", ["zev", "list", "files"]):
+            app()
+
+        assert "READ_TIMEOUT in ~/.zevrc must be a number, not 'soon'." in capsys.readouterr().out
+        mock_get_options.assert_not_called()
+
+    def test_setup_still_runs(self, bad_config):
+        from zev.main import app
+
+        def answer(question, answers):
+            return {**answers, "READ_TIMEOUT": "30"}
+
+        with patch("sys.argv", ["zev", "--setup"]), patch("zev.config.setup.prompt_question", side_effect=answer):
+            app()
+
+        assert bad_config.read_timeout == 30
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import time
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from zev.llms.resilience import RetryableError
+from zev.llms.response_format import ResponseFormat
+from zev.mock_server import MockLLMServer, estimate_tokens, load_cassette, parse_latency, requested_format
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(stream_chunk_size=8) as server:
+        yield server
+
+
+def openai_provider(url, response_format=None):
+    with patch("zev.llms.openai.provider.config") as mock_config:
+        mock_config.openai_api_key = "sk-test"
+        mock_config.openai_model = "gpt-4o-mini"
+        mock_config.openai_base_url = f"{url}/v1"
+        mock_config.read_timeout = 5
+        mock_config.connect_timeout = 5
+
+        from zev.llms.openai.provider import OpenAIProvider
+
+        return OpenAIProvider(response_format=response_format)
+
+
+def gemini_provider(url, response_format=None):
+    with patch("zev.llms.gemini.provider.config") as mock_config:
+        mock_config.gemini_api_key = "gemini-test"
+        mock_config.gemini_model = "gemini-2.0-flash"
+        mock_config.gemini_base_url = url
+        mock_config.read_timeout = 5
+        mock_config.connect_timeout = 5
+
+        from zev.llms.gemini.provider import GeminiProvider
+
+        return GeminiProvider(response_format=response_format)
+
+
+class TestParseLatency:
+    def test_fixed(self):
+        assert parse_latency("200")() == 0.2
+
+    def test_uniform_range(self):
+        sample = parse_latency("100-300")
+        assert all(0.1 <= sample() <= 0.3 for _ in range(100))
+
+    def test_distributions_are_never_negative(self):
+        assert all(parse_latency("normal:10:50")() >= 0 for _ in range(100))
+        assert all(parse_latency("lognormal:200:0.5")() > 0 for _ in range(100))
+
+
+class TestOpenAIEndpoint:
+    def test_get_options_through_the_sdk(self, server):
+        response = openai_provider(server.url).get_options("list files", "OS: Linux")
+
+        assert response.is_valid
+        assert response.commands[0].command == "echo 'list files'"
+
+    def test_stream_options_through_the_sdk(self, server):
+        streamed = []
+        response = openai_provider(server.url).stream_options("show disk usage", "OS: Linux", streamed.append)
+
+        assert [c.command for c in streamed] == ["echo 'show disk usage'"]
+        assert response.commands == streamed
+
+    def test_warm_up_through_the_sdk(self, server):
+        openai_provider(server.url).warm_up()
+
+    def test_rate_limit_is_retryable_with_retry_after(self, server):
+        server.rate_429 = 1.0
+        server.retry_after = 3
+
+        with pytest.raises(RetryableError) as exc_info:
+            openai_provider(server.url).get_options("list files", "")
+
+        assert exc_info.value.retry_after == 3
+        assert server.stats["429"] == 1
+
+
+class TestGeminiEndpoint:
+    def test_get_options(self, server):
+        response = gemini_provider(server.url).get_options("find large files", "")
+
+        assert response.commands[0].command == "echo 'find large files'"
+
+    def test_stream_options(self, server):
+        streamed = []
+        response = gemini_provider(server.url).stream_options("find large files", "", streamed.append)
+
+        assert [c.command for c in streamed] == ["echo 'find large files'"]
+        assert response.commands == streamed
+
+    def test_aget_options(self, server):
+        response = asyncio.run(gemini_provider(server.url).aget_options("uptime", ""))
+
+        assert response.commands[0].command == "echo uptime"
+
+    def test_server_error_is_retryable(self, server):
+        server.rate_5xx = 1.0
+
+        with pytest.raises(RetryableError):
+            gemini_provider(server.url).get_options("uptime", "")
+        assert server.stats["5xx"] == 1
+
+
+class TestMockServer:
+    def test_replays_cassette_longest_match_first(self, tmp_path):
+        cassette = tmp_path / "cassette.jsonl"
+        records = [
+            {"index": 0, "query": "list files", "response": {"commands": [], "is_valid": False}, "error": None},
+            {
+                "index": 1,
+                "query": "list files by size",
+                "response": {
+                    "commands": [{"command": "ls -S", "short_explanation": "By size", "is_dangerous": False}],
+                    "is_valid": True,
+                },
+                "error": None,
+            },
+            {"index": 2, "query": "failed", "response": None, "error": "timeout"},
+        ]
+        cassette.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+
+        with MockLLMServer(cassette=load_cassette(cassette)) as server:
+            response = openai_provider(server.url).get_options("list files by size", "")
+
+        assert response.commands[0].command == "ls -S"
+
+    def test_matches_cassette_queries_against_the_user_query_only(self):
+        response = {"commands": [{"command": "git status", "short_explanation": "", "is_dangerous": False}]}
+
+        with MockLLMServer(cassette=[("git", {**response, "is_valid": True})]) as server:
+            replayed = openai_provider(server.url).get_options("show git changes", "INSTALLED TOOLS: git, rg")
+            not_replayed = openai_provider(server.url).get_options("list files", "INSTALLED TOOLS: git, rg")
+
+        assert replayed.commands[0].command == "git status"
+        assert not_replayed.commands[0].command == "echo 'list files'"
+
+    def test_applies_latency(self):
+        with MockLLMServer(latency="150") as server:
+            start = time.perf_counter()
+            openai_provider(server.url).get_options("list files", "")
+            assert time.perf_counter() - start >= 0.15
+
+    def test_reports_stats(self, server):
+        gemini_provider(server.url).get_options("uptime", "")
+
+        with urllib.request.urlopen(f"{server.url}/_stats") as response:
+            stats = json.loads(response.read())
+        assert stats["requests"] == 1 and stats["429"] == 0 and stats["5xx"] == 0
+        assert stats["completion_tokens"] > 0
+
+    @pytest.mark.parametrize("make_provider", [openai_provider, gemini_provider])
+    def test_answers_in_the_requested_format(self, server, make_provider):
+        compact = make_provider(server.url, ResponseFormat(compact=True)).get_options("uptime", "")
+        seen = []
+        streamed = make_provider(server.url, ResponseFormat(compact=True, with_danger_fields=False)).stream_options(
+            "uptime", "", seen.append
+        )
+
+        assert compact.commands[0].command == "echo uptime"
+        assert [command.command for command in seen] == ["echo uptime"]
+        assert streamed.commands[0].short_explanation == "Mock response"
+
+    def test_compact_format_uses_fewer_tokens(self, server):
+        openai_provider(server.url).get_options("uptime", "")
+        full_tokens = server.stats["completion_tokens"]
+        openai_provider(server.url, ResponseFormat(compact=True)).get_options("uptime", "")
+
+        assert server.stats["completion_tokens"] - full_tokens < full_tokens
+
+    def test_applies_token_latency(self):
+        with MockLLMServer(token_latency_ms=5) as server:
+            start = time.perf_counter()
+            openai_provider(server.url).get_options("uptime", "")
+            elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.005 * server.stats["completion_tokens"]
+
+
+class TestRequestedFormat:
+    @pytest.mark.parametrize(
+        "response_format",
+        [
+            ResponseFormat(),
+            ResponseFormat(compact=True),
+            ResponseFormat(with_danger_fields=False),
+            ResponseFormat(compact=True, with_danger_fields=False),
+        ],
+    )
+    def test_detects_the_format_from_either_schema(self, response_format):
+        from openai.lib._pydantic import to_strict_json_schema
+
+        openai_schema = to_strict_json_schema(response_format.model)
+        for schema in (openai_schema, response_format.gemini_schema()["response_schema"]):
+            detected = requested_format(schema)
+            assert (detected.compact, detected.with_danger_fields) == (
+                response_format.compact,
+                response_format.with_danger_fields,
+            )
+
+    def test_defaults_to_the_full_format(self):
+        detected = requested_format(None)
+
+        assert not detected.compact and detected.with_danger_fields
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("x" * 40) == 10
@@ -0,0 +1,110 @@
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zev import path_index
+from zev.llms.types import Command
+from zev.path_index import PathIndex, _command_names, available_tools_context, flag_missing_tools
+
+
+def make_executable(directory, name):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture
+def bin_dirs(tmp_path):
+    home = tmp_path / "home"
+    home.mkdir()
+    first, second = tmp_path / "bin1", tmp_path / "bin2"
+    first.mkdir()
+    second.mkdir()
+    make_executable(first, "ls")
+    make_executable(first, "grep")
+    make_executable(second, "git")
+    (second / "README").write_text("not executable")
+    with (
+        patch.object(Path, "home", return_value=home),
+        patch.dict(os.environ, {"PATH": os.pathsep.join([str(first), str(second), str(tmp_path / "gone")])}),
+    ):
+        yield home, first, second
+
+
+class TestPathIndex:
+    def test_indexes_executables_on_path(self, bin_dirs):
+        index = PathIndex().load()
+
+        assert index.executables == {"ls", "grep", "git"}
+        assert index.has("git")
+        assert not index.has("README")
+
+    def test_only_relists_directories_whose_mtime_changed(self, bin_dirs):
+        home, first, second = bin_dirs
+        PathIndex().load()
+        make_executable(second, "jq")
+        os.utime(second, (1, 1))  # make sure the mtime differs even on coarse-grained filesystems
+
+        with patch("zev.path_index._list_executables", wraps=path_index._list_executables) as mock_list:
+            index = PathIndex().load()
+
+        mock_list.assert_called_once_with(str(second))
+        assert index.has("jq")
+        assert json.loads((home / ".zevpath").read_text())["dirs"][str(second)]["mtime"] == 1
+
+    def test_corrupt_index_is_rebuilt(self, bin_dirs):
+        home, _, _ = bin_dirs
+        (home / ".zevpath").write_text("{not json")
+
+        assert PathIndex().load().has("ls")
+
+    def test_read_only_home_is_skipped(self, bin_dirs):
+        with patch("zev.path_index.tempfile.mkstemp", side_effect=PermissionError("read-only")):
+            assert PathIndex().load().has("ls")
+
+    def test_failed_write_leaves_no_temp_file(self, bin_dirs):
+        home, _, _ = bin_dirs
+        with patch("zev.path_index.json.dump", side_effect=OSError(28, "No space left on device")):
+            assert PathIndex().load().has("ls")
+
+        assert list(home.iterdir()) == []
+
+
+class TestCommandNames:
+    @pytest.mark.parametrize(
+        "command,expected",
+        [
+            ("fd -e py | xargs rg foo", ["fd", "xargs", "rg"]),
+            ("FOO=1 env BAR=2 jq . f.json && echo hi", ["env", "jq", "echo"]),
+            ("sudo -u root apt install x", ["sudo"]),
+            ("(cd /tmp; ls) > out", ["cd", "ls"]),
+            ('for f in *.txt; do wc -l "$f"; done', ["for", "do", "wc", "done"]),
+            ("./configure && make", ["make"]),
+            ("echo 'unbalanced", []),
+        ],
+    )
+    def test_finds_the_program_of_each_command(self, command, expected):
+        assert _command_names(command) == expected
+
+
+class TestFlagMissingTools:
+    def test_demotes_and_annotates_commands_with_missing_tools(self, bin_dirs):
+        commands = [
+            Command(command="fd -e py", short_explanation="Find Python files", is_dangerous=False),
+            Command(command="ls | grep py", short_explanation="List Python files", is_dangerous=False),
+            Command(command="cd src && git status", short_explanation="Status of src", is_dangerous=False),
+        ]
+
+        flagged = flag_missing_tools(commands, PathIndex().load())
+
+        assert [c.command for c in flagged] == ["ls | grep py", "cd src && git status", "fd -e py"]
+        assert flagged[2].short_explanation == "Find Python files (not installed: fd)"
+        assert commands[0].short_explanation == "Find Python files"
+
+    def test_tools_context_lists_installed_and_missing(self, bin_dirs):
+        with patch("zev.path_index.TOOLS_OF_INTEREST", ("rg", "git", "jq")):
+            assert available_tools_context(PathIndex().load()) == "git (not installed: rg, jq)"
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock
+
+from zev.prefetch import Prefetcher
+from zev.reporting import report
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class TestPrefetcher:
+    def test_only_the_text_after_a_pause_is_sent(self):
+        fetch = AsyncMock(return_value="response")
+        prefetcher = Prefetcher(fetch, debounce_seconds=0.05)
+        try:
+            for text in ("list fi", "list fil", "list files"):
+                prefetcher.update(text)
+            wait_for(lambda: fetch.called)
+            time.sleep(0.1)
+        finally:
+            prefetcher.close()
+
+        fetch.assert_called_once_with("list files")
+
+    def test_submitted_text_reuses_the_request(self):
+        async def fetch(text):
+            return f"answer to {text}"
+
+        prefetcher = Prefetcher(fetch, debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: prefetcher._request is not None)
+
+        request = prefetcher.take("List  files?")
+
+        assert request is not None
+        assert request.result() == "answer to list files"
+
+    def test_different_submitted_text_is_not_matched(self):
+        prefetcher = Prefetcher(AsyncMock(return_value="response"), debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: prefetcher._request is not None)
+
+        assert prefetcher.take("list files by size") is None
+
+    def test_result_waits_for_a_request_in_flight(self):
+        release = threading.Event()
+
+        async def fetch(text):
+            await asyncio.to_thread(release.wait)
+            return "response"
+
+        prefetcher = Prefetcher(fetch, debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: prefetcher._request is not None)
+
+        request = prefetcher.take("list files")
+        assert not request.done()
+        release.set()
+
+        assert request.result() == "response"
+
+    def test_superseded_request_is_cancelled(self):
+        started, cancelled = [], []
+
+        async def fetch(text):
+            started.append(text)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+
+        prefetcher = Prefetcher(fetch, debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: started == ["list files"])
+        prefetcher.update("list files by size")
+        wait_for(lambda: cancelled == ["list files"])
+
+        request = prefetcher.take("list files")
+        assert request is None
+        wait_for(lambda: cancelled == ["list files", "list files by size"])
+
+    def test_short_text_and_flags_are_not_sent(self):
+        fetch = AsyncMock()
+        prefetcher = Prefetcher(fetch, debounce_seconds=0)
+        prefetcher.update("ls")
+        prefetcher.update("--recent foo")
+        time.sleep(0.05)
+        prefetcher.close()
+
+        fetch.assert_not_called()
+
+    def test_nothing_is_sent_after_submit(self):
+        fetch = AsyncMock()
+        prefetcher = Prefetcher(fetch, debounce_seconds=0.05)
+        prefetcher.update("list files")
+
+        assert prefetcher.take("list files") is None
+        time.sleep(0.1)
+        fetch.assert_not_called()
+
+    def test_failed_request_returns_none(self):
+        prefetcher = Prefetcher(AsyncMock(side_effect=RuntimeError("boom")), debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: prefetcher._request is not None)
+
+        assert prefetcher.take("list files").result() is None
+
+    def test_reports_of_speculative_requests_are_dropped(self, capsys):
+        async def fetch(text):
+            report("Error: provider unavailable")
+            await asyncio.to_thread(report, "Error: from a worker thread")
+            return None
+
+        prefetcher = Prefetcher(fetch, debounce_seconds=0)
+        prefetcher.update("list files")
+        wait_for(lambda: prefetcher._request is not None)
+        prefetcher.take("list files").result()
+        report("shown")
+
+        assert capsys.readouterr().out == "shown\n"
@@ -0,0 +1,109 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from zev import profiling
+
+
+@pytest.fixture(autouse=True)
+def reset_profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "_enabled", False)
+    monkeypatch.setattr(profiling, "_spans", [])
+    monkeypatch.setattr(profiling, "_ready_at", None)
+    with patch("zev.profiling.Path.home", return_value=tmp_path):
+        yield
+
+
+class TestSpans:
+    def test_spans_are_not_recorded_unless_enabled(self):
+        with profiling.span("request"):
+            pass
+
+        assert profiling.phase_totals() == {}
+
+    def test_records_nested_and_repeated_spans(self):
+        profiling.enable()
+        with profiling.span("fetch"):
+            for _ in range(2):
+                with profiling.span("request"):
+                    time.sleep(0.01)
+
+        phases = profiling.phase_totals()
+        assert list(phases) == ["fetch", "request"]
+        fetch_seconds, fetch_count, fetch_depth = phases["fetch"]
+        request_seconds, request_count, request_depth = phases["request"]
+        assert (fetch_count, fetch_depth) == (1, 0)
+        assert (request_count, request_depth) == (2, 1)
+        assert fetch_seconds >= request_seconds >= 0.02
+
+    def test_started_span_only_counts_first_stop(self):
+        profiling.enable()
+        render = profiling.start("menu render")
+        render.stop()
+        render.stop()
+
+        assert profiling.phase_totals()["menu render"][1] == 1
+
+    def test_enable_records_startup(self):
+        profiling.mark_ready()
+        profiling.enable()
+
+        assert "startup" in profiling.phase_totals()
+
+    def test_report_totals_top_level_phases(self):
+        profiling.enable()
+        profiling.record("config", 0.010)
+        profiling.record("request", 0.030)
+        profiling.record("parse", 0.005, depth=1)
+
+        report = profiling.format_report()
+
+        assert "request" in report and "75%" in report
+        assert report.splitlines()[-1].split() == ["total", "40.0"]
+
+
+class TestStatsLog:
+    def test_percentiles_across_logged_runs(self):
+        profiling.enable()
+        for ms in range(1, 101):
+            profiling._spans.clear()
+            profiling.record("request", ms / 1000)
+            profiling.append_to_log()
+
+        with open(profiling.get_log_path(), "a") as f:
+            f.write("not json\n")
+
+        runs, p50, p95 = profiling.summarize_log()["request"]
+        assert (runs, p50, p95) == (100, 50, 95)
+
+    def test_no_log_yet(self):
+        assert profiling.summarize_log() == {}
+
+
+class TestProfileFlag:
+    @patch("zev.main.get_options")
+    @patch("zev.main.load_config_into_environ")
+    def test_profile_flag_prints_report(self, mock_load, mock_get_options, tmp_path, capsys):
+        (tmp_path / ".zevrc").write_text("LLM_PROVIDER=openai\n")
+
+        def get_options(query, use_cache=True):
+            with profiling.span("request"):
+                pass
+
+        mock_get_options.side_effect = get_options
+
+        from zev.main import app
+
+        with (
+            patch("sys.argv", ["zev", "--profile", "list", "files"]),
+            patch("zev.main.Path.home", return_value=tmp_path),
+            patch("zev.main.config") as mock_config,
+        ):
+            mock_config.profile_log = False
+            app()
+
+        mock_get_options.assert_called_once_with("list files", use_cache=True)
+        output = capsys.readouterr().out
+        assert "Phase" in output and "request" in output and "config" in output
@@ -0,0 +1,33 @@
+import asyncio
+
+from zev.reporting import report, reports_to
+
+
+class TestReport:
+    def test_prints_by_default(self, capsys):
+        report("Error: API key not valid")
+        assert capsys.readouterr().out == "Error: API key not valid\n"
+
+    def test_reports_to_handler_instead_of_printing(self, capsys):
+        reports = []
+        with reports_to(reports.append):
+            report("Error: API key not valid")
+        report("after")
+        assert reports == ["Error: API key not valid"]
+        assert capsys.readouterr().out == "after\n"
+
+    def test_handler_carries_over_into_tasks_and_worker_threads(self):
+        async def query(name, reports):
+            with reports_to(reports.append):
+                await asyncio.to_thread(report, f"{name} from a worker thread")
+                await asyncio.sleep(0)
+                report(f"{name} from the task")
+
+        async def main():
+            first, second = [], []
+            await asyncio.gather(query("first", first), query("second", second))
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first == ["first from a worker thread", "first from the task"]
+        assert second == ["second from a worker thread", "second from the task"]
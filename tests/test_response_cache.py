@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zev.llms.types import Command, OptionsResponse
+from zev.response_cache import ResponseCache, make_cache_key, normalize_query
+
+
+def make_response(command_str: str = "ls") -> OptionsResponse:
+    return OptionsResponse(
+        commands=[Command(command=command_str, short_explanation="Test", is_dangerous=False)],
+        is_valid=True,
+    )
+
+
+class TestCacheKey:
+    def test_normalizes_case_whitespace_and_question_marks(self):
+        assert normalize_query("  List   FILES?? ") == "list files"
+        assert make_cache_key("list files", "OS: Linux", "openai", "gpt-4o") == make_cache_key(
+            "List  files?", "OS: Linux", "openai", "gpt-4o"
+        )
+
+    def test_differs_by_context_provider_and_model(self):
+        key = make_cache_key("list files", "OS: Linux", "openai", "gpt-4o")
+        assert key != make_cache_key("list files", "OS: Darwin", "openai", "gpt-4o")
+        assert key != make_cache_key("list files", "OS: Linux", "gemini", "gpt-4o")
+        assert key != make_cache_key("list files", "OS: Linux", "openai", "gpt-4o-mini")
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        with patch.object(Path, "home", return_value=tmp_path):
+            yield ResponseCache(ttl_seconds=60, max_entries=3)
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("key") is None
+
+        cache.set("key", make_response("pwd"))
+        cached = cache.get("key")
+
+        assert cached.commands[0].command == "pwd"
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_expired_entries_are_misses(self, cache):
+        with patch("zev.response_cache.time.time", return_value=1000):
+            cache.set("key", make_response())
+        with patch("zev.response_cache.time.time", return_value=1061):
+            assert cache.get("key") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        for i, key in enumerate(["a", "b", "c"]):
+            with patch("zev.response_cache.time.time", return_value=1000 + i):
+                cache.set(key, make_response(key))
+        with patch("zev.response_cache.time.time", return_value=1010):
+            cache.get("a")
+        with patch("zev.response_cache.time.time", return_value=1011):
+            cache.set("d", make_response("d"))
+
+        with patch("zev.response_cache.time.time", return_value=1012):
+            assert cache.get("b") is None
+            assert cache.get("a") is not None
+            assert cache.get("d") is not None
+
+    def test_recovers_from_corrupt_file(self, cache):
+        cache.path.write_text("{not json")
+        assert cache.get("key") is None
+        cache.set("key", make_response())
+        assert cache.get("key") is not None
+
+    def test_read_only_home_only_skips_caching(self, cache):
+        with patch("zev.response_cache.tempfile.mkstemp", side_effect=PermissionError("read-only")):
+            cache.set("key", make_response())
+
+        assert cache.get("key") is None
+
+    def test_lookups_do_not_rewrite_the_cache(self, cache):
+        cache.set("key", make_response())
+
+        with patch.object(ResponseCache, "_write") as mock_write:
+            assert cache.get("key") is not None
+            assert cache.get("other") is None
+
+        mock_write.assert_not_called()
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_logged_lookups_are_folded_in_on_the_next_write(self, cache):
+        assert cache.get("key") is None
+        cache.set("key", make_response())
+
+        assert not cache.log_path.exists()
+        assert json.loads(cache.path.read_text())["misses"] == 1
+
+    def test_log_is_folded_in_after_max_entries_lookups(self, cache):
+        cache.set("key", make_response())
+        for _ in range(3):
+            cache.get("key")
+
+        assert not cache.log_path.exists()
+        assert json.loads(cache.path.read_text())["hits"] == 3
+
+    def test_invalid_entry_is_a_miss_and_evicted(self, cache):
+        cache.set("key", make_response())
+        data = json.loads(cache.path.read_text())
+        data["entries"]["key"]["response"] = {"commands": "not a list"}
+        cache.path.write_text(json.dumps(data))
+
+        assert cache.get("key") is None
+        assert "key" not in json.loads(cache.path.read_text())["entries"]
+        assert cache.stats() == {"hits": 0, "misses": 1, "entries": 0}
@@ -0,0 +1,109 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zev.command_history import CommandHistory
+from zev.llms.types import Command, OptionsResponse
+from zev.sqlite_history import SQLiteCommandHistory
+
+
+def make_response(command_str: str = "ls") -> OptionsResponse:
+    return OptionsResponse(
+        commands=[Command(command=command_str, short_explanation="Test", is_dangerous=False)],
+        is_valid=True,
+    )
+
+
+class TestSQLiteCommandHistory:
+    @pytest.fixture
+    def home(self, tmp_path):
+        with patch.object(Path, "home", return_value=tmp_path):
+            yield tmp_path
+
+    def test_save_and_retrieve_options(self, home):
+        history = SQLiteCommandHistory()
+        history.save_options("first", make_response("cmd1"))
+        history.save_options("second", make_response("cmd2"))
+
+        entries = history.get_history()
+
+        assert [e.query for e in entries] == ["first", "second"]
+        assert entries[1].response.commands[0].command == "cmd2"
+
+    def test_enforces_max_entries_limit(self, home):
+        history = SQLiteCommandHistory()
+        history.max_entries = 3
+        for i in range(10):
+            history.save_options(f"query {i}", make_response())
+
+        assert [e.query for e in history.get_history()] == ["query 7", "query 8", "query 9"]
+        assert history.conn.execute("SELECT COUNT(*) FROM history").fetchone() == (3,)
+
+    def test_iter_history_reverse_is_newest_first(self, home):
+        history = SQLiteCommandHistory()
+        for i in range(3):
+            history.save_options(f"query {i}", make_response(f"cmd {i}"))
+
+        records = list(history.iter_history_reverse())
+
+        assert [r.query for r in records] == ["query 2", "query 1", "query 0"]
+        assert records[0].response.commands[0].command == "cmd 2"
+
+    def test_search_matches_queries_and_commands(self, home):
+        history = SQLiteCommandHistory()
+        history.save_options("show running containers", make_response("docker ps"))
+        history.save_options("list files", make_response("ls -la"))
+        history.save_options("remove stopped containers", make_response("docker container prune"))
+
+        assert [e.query for e in history.search("docker")] == ["show running containers", "remove stopped containers"]
+        assert [e.query for e in history.search("contain prune")] == ["remove stopped containers"]
+        assert history.search("kubectl") is None
+
+    def test_search_treats_fts_syntax_literally(self, home):
+        history = SQLiteCommandHistory()
+        history.save_options("list files", make_response("ls"))
+
+        assert history.search('"list OR -') is None
+
+    def test_search_returns_the_newest_matches(self, home):
+        history = SQLiteCommandHistory()
+        for i in range(5):
+            history.save_options(f"query {i}", make_response())
+        history.max_entries = 2
+
+        assert [e.query for e in history.search("query")] == ["query 3", "query 4"]
+        history.has_fts = False
+        assert [e.query for e in history.search("query")] == ["query 3", "query 4"]
+
+    def test_migration_skips_corrupt_lines(self, home):
+        jsonl_history = CommandHistory()
+        jsonl_history.save_options("old query", make_response("git status"))
+        with open(jsonl_history.path, "a", encoding="utf-8") as f:
+            f.write('{"query": "cut short", "response": {"comm\n')
+
+        history = SQLiteCommandHistory()
+
+        assert [e.query for e in history.get_history()] == ["old query"]
+        assert history.conn.execute("PRAGMA user_version").fetchone() == (1,)
+
+    def test_migrates_existing_jsonl_history_once(self, home):
+        jsonl_history = CommandHistory()
+        jsonl_history.save_options("old query", make_response("git status"))
+
+        history = SQLiteCommandHistory()
+        assert [e.query for e in history.get_history()] == ["old query"]
+        history.conn.close()
+
+        assert [e.query for e in SQLiteCommandHistory().get_history()] == ["old query"]
+
+
+class TestSearchJsonlHistory:
+    def test_search_matches_all_terms(self, tmp_path):
+        with patch.object(Path, "home", return_value=tmp_path):
+            history = CommandHistory()
+        history.save_options("show running containers", make_response("docker ps"))
+        history.save_options("list files", make_response("ls -la"))
+
+        assert [e.query for e in history.search("docker running")] == ["show running containers"]
+        assert history.search("docker files") is None